@@ -1,8 +1,25 @@
 import os
-import json
+import shutil
+from bisect import bisect_left
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, jsonify, send_file, stream_with_context
 from modules.main import check_plant_name
+from modules import codec, http_client, pump_commands, telemetry
+from modules.records import SensorReading, WateringEvent
+from modules.storage import load_json, save_json, append_json_log
+from modules.archive import archive_dir_for, query_range
+from modules.store_version import bump_version
+from modules.log_reader import get_reader
+from modules.view_cache import cached
+from modules.anomaly import device_health, ingest_reading, ingest_readings, state_path_for
+from modules.drying import predict_next_check
+from modules.export import CONTENT_TYPES, export_stream
+from modules.forecast_store import FORECAST_STORE_FILE, get_features, get_forecast
+from modules.frame_hash import CHANGE_THRESHOLD, FRAME_HASH_FILE, FRAME_STATE_FILE, record_frame
+from modules.health_summary import get_health_summary, summary_path_for
+from modules.pot_config import DEFAULT_POT, get_registry, pot_form, save_pot_config
+from modules.image_store import IMAGE_CACHE_DIR, VARIANTS, dedupe_frames, list_frames, select_frames, variant_path
+from modules.watering_index import GROUP_BYS, get_index, parse_bound, query_events, query_groups
 
 app = Flask(__name__)
 
@@ -16,33 +33,21 @@ SENSOR_LOG_FILE = os.path.join(BASE_DIR, "sensor_log.json")
 POT_INFO_FILE = os.path.join(BASE_DIR, "pot_info.json")
 HEALTH_LOG_FILE = os.path.join(BASE_DIR, "plant_health_log.json")
 SCI_NAME_FILE = os.path.join(BASE_DIR, "sci_name.txt")
-
-# ========== 工具函数 ==========
-
-def load_json(path, default):
-    if not os.path.exists(path):
-        return default
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        print("[load_json] 读取失败:", path, "error:", e)
-        return default
-
-
-def save_json(path, data):
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"[save_json] 已写入: {path}，当前记录数: {len(data)}")
-    except Exception as e:
-        print("[save_json] 写入失败:", path, "error:", e)
+HEALTH_SUMMARY_FILE = summary_path_for(HEALTH_LOG_FILE)
+SENSOR_STATE_FILE = state_path_for(SENSOR_LOG_FILE)
+FORECAST_FILE = os.path.join(BASE_DIR, FORECAST_STORE_FILE)
+FRAME_HASHES_FILE = os.path.join(BASE_DIR, FRAME_HASH_FILE)
+FRAME_STATE_PATH = os.path.join(BASE_DIR, FRAME_STATE_FILE)
+IMAGE_CACHE_PATH = os.path.join(BASE_DIR, IMAGE_CACHE_DIR)
+PUMP_COMMANDS_PATH = os.path.join(BASE_DIR, pump_commands.PUMP_COMMANDS_FILE)
+IMAGE_MAX_AGE = 24 * 3600   # 照片上传后不会再改，浏览器缓存一天，之后靠 ETag 校验
 
 
 # ========== 主面板信息：完全从 watering_log.json 里算 ==========
 def get_today_panel_info():
     today = datetime.now().date().isoformat()
-    watering_log = load_json(WATERING_LOG_FILE, default=[])
+    # 只解码今天 0 点以后的记录（mmap 偏移索引，不再 json.load 整个文件）
+    watering_log = get_reader(WATERING_LOG_FILE).range(start=datetime.fromisoformat(today))
 
     today_records = []
     for r in watering_log:
@@ -102,61 +107,29 @@ def get_today_panel_info():
 
 
 # ========== 读取最新的植物健康评估结果 ==========
-def get_latest_health_panel():
-    """
-    从 plant_health_log.json 中读取最新一条健康评估结果。
-    日志格式示例：
-    [
-      {
-        "timestamp": "2025-12-06T12:30:05",
-        "image_path": "./plant.jpg",
-        "health_level": 4,
-        "reasons": ["overwatered", "need more light"],
-        "suggestions": [...]
-      },
-      ...
-    ]
-    """
-    health_log = load_json(HEALTH_LOG_FILE, default=[])
-
-    if not isinstance(health_log, list) or not health_log:
-        return None
-
-    # 按时间排序，取最新一条
-    try:
-        health_log_sorted = sorted(
-            health_log, key=lambda x: x.get("timestamp", "")
-        )
-        last = health_log_sorted[-1]
-    except Exception as e:
-        print("[get_latest_health_panel] 排序失败:", e)
-        return None
-
-    health_level = last.get("health_level")
-    try:
-        health_level = int(health_level)
-    except Exception:
-        health_level = None
-
-    reasons = last.get("reasons") or []
-    if not isinstance(reasons, list):
-        reasons = [str(reasons)]
-
-    # 颜色映射：从绿到红
-    color_map = {
-        5: "#4CAF50",  # 绿色
-        4: "#8BC34A",  # 黄绿
-        3: "#FFC107",  # 琥珀
-        2: "#FF9800",  # 橙色
-        1: "#F44336",  # 红色
+def get_latest_health_panel(pot=None):
+    """
+    最新一条健康评估 + 7 / 30 天趋势，来自增量维护的 health_summary.json，
+    不再读 plant_health_log.json。返回示例：
+    {
+      "health_level": 4,
+      "reasons": ["need more light"],
+      "color": "#8BC34A",
+      "timestamp": "2025-12-06T12:30:05",
+      "windows": {"7d": {"assessments": 3, "mean_health_level": 3.67, "tags": {...}}, "30d": {...}}
     }
-    color = color_map.get(health_level, "#9E9E9E")  # 默认灰色
+    """
+    summary = get_health_summary(HEALTH_LOG_FILE, pot=pot)
+    if not summary or not summary["latest"]:
+        return None
 
+    last = summary["latest"]
     return {
-        "health_level": health_level,
-        "reasons": reasons,
-        "color": color,
+        "health_level": last.get("health_level"),
+        "reasons": last.get("reasons") or [],
+        "color": last.get("color"),
         "timestamp": last.get("timestamp"),
+        "windows": summary["windows"],
     }
 
 def reset_all():
@@ -175,66 +148,70 @@ def reset_all():
     
     os.remove("image.jpg")
 
-    # 2. 清空 JSON 文件
+    # 2. 清空 JSON 文件（连同冷归档）
     save_json(HEALTH_LOG_FILE, [])   # 植物健康评估记录
+    save_json(HEALTH_SUMMARY_FILE, {})     # 健康趋势摘要
     save_json(POT_INFO_FILE, {})           # 花盆信息
     save_json(SENSOR_LOG_FILE, [])         # 传感器数据
+    save_json(SENSOR_STATE_FILE, {})       # 传感器设备状态（异常检测）
     save_json(WATERING_LOG_FILE, [])       # 浇水记录
+    save_json(FRAME_HASHES_FILE, {})       # 照片感知哈希
+    save_json(FRAME_STATE_PATH, {})        # 每盆上次评估用的照片
+    save_json(PUMP_COMMANDS_PATH, {})      # 水泵命令队列
+    for log_file in (HEALTH_LOG_FILE, SENSOR_LOG_FILE, WATERING_LOG_FILE):
+        shutil.rmtree(archive_dir_for(log_file), ignore_errors=True)
+    shutil.rmtree(IMAGE_CACHE_PATH, ignore_errors=True)   # 缩略图缓存
 
     # 3. 清空 sci_name.txt（植物学名）
     try:
         with open(SCI_NAME_FILE, "w", encoding="utf-8") as f:
             f.write("")
+        bump_version(SCI_NAME_FILE)
     except Exception as e:
         print("清空 sci_name.txt 失败:", e)
 
 
 
 # ========== 首页：主面板 + 近期浇水记录 ==========
+def get_index_view_model():
+    """
+    首页需要的数据（今日面板、健康面板、花盆信息、植物名）。
+    按数据文件版本号缓存：两次写入之间刷新首页不读任何文件。
+    """
+    today = datetime.now().date().isoformat()
+    return {
+        # 今日面板依赖“今天”的日期，跨天自动重算
+        "panel": cached("index.panel", [WATERING_LOG_FILE], get_today_panel_info, extra_key=today),
+        # 7 / 30 天窗口按“今天”计算，跨天自动重算
+        "health_panel": cached("index.health", [HEALTH_SUMMARY_FILE, HEALTH_LOG_FILE], get_latest_health_panel, extra_key=today),
+        "pot_info": pot_form(path=POT_INFO_FILE),
+        "plant_name": cached("plant_name", [SCI_NAME_FILE], check_plant_name),
+    }
+
+
 @app.route("/")
 def index():
     today = datetime.now().date().isoformat()
+    vm = get_index_view_model()
 
     # 1）主面板信息
-    panel = get_today_panel_info()
+    panel = vm["panel"]
     today_flag = panel.get("status")         # "watered" / "no_water"
     today_total_ml = panel.get("today_total_ml", 0)
     today_note = panel.get("note")
     last_watering_time = panel.get("last_watering_time")
 
-    # 2）近期浇水记录（最近15天）
-    watering_log = load_json(WATERING_LOG_FILE, default=[])
-    watering_log = [x for x in watering_log if x.get("water_ml", 0) > 0]
-
-    now = datetime.now()
-    cutoff = now - timedelta(days=15)
-
-    filtered = []
-    for entry in watering_log:
-        ts = entry.get("timestamp")
-        if not ts:
-            continue
-
-        try:
-            dt = datetime.fromisoformat(ts)
-        except Exception:
-            continue
-
-        if dt >= cutoff:
-            filtered.append(entry)
-
-    recent_records = sorted(
-        filtered, key=lambda x: x.get("timestamp", ""), reverse=True
-    )
+    # 2）近期浇水记录（最近15天），从浇水索引里直接取，不再每次全量扫描
+    cutoff = (datetime.now() - timedelta(days=15)).isoformat()
+    recent_records, _ = query_events(get_index(WATERING_LOG_FILE), start=cutoff)
 
     # 3）花盆信息
-    pot_info = load_json(POT_INFO_FILE, default={})
+    pot_info = vm["pot_info"]
 
     # 4）植物健康信息（来自 plant_health_log.json）
-    health_panel = get_latest_health_panel()
+    health_panel = vm["health_panel"]
 
-
-    plant_name = check_plant_name()
+    plant_name = vm["plant_name"]
 
     return render_template(
         "index.html",
@@ -264,26 +241,135 @@ def report_watering():
 
     try:
         water_ml = float(data["water_ml"])
-    except ValueError:
+    except (TypeError, ValueError):
         return jsonify({"status": "error", "msg": "water_ml must be number"}), 400
 
     now = datetime.now()
-    record = {
-        "timestamp": now.isoformat(timespec="seconds"),
-        "date": now.date().isoformat(),
-        "water_ml": water_ml,
-        "reason": data.get("reason"),
-        "soil_moisture_before": data.get("soil_moisture_before"),
-        "soil_moisture_after": data.get("soil_moisture_after"),
-        "source": "auto",
-    }
-
-    log = load_json(WATERING_LOG_FILE, default=[])
-    log.append(record)
-    save_json(WATERING_LOG_FILE, log)
+    command_id = data.get("command_id")
+    try:
+        record = WateringEvent.from_dict({
+            "timestamp": now.isoformat(timespec="seconds"),
+            "date": now.date().isoformat(),
+            "pot": data.get("pot"),
+            "water_ml": water_ml,
+            "reason": data.get("reason"),
+            "soil_moisture_before": data.get("soil_moisture_before"),
+            "soil_moisture_after": data.get("soil_moisture_after"),
+            "source": "pump" if command_id else "auto",
+            "command_id": command_id,
+        }).to_dict()
+    except ValueError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 400
+
+    append_json_log(record, WATERING_LOG_FILE)
+    # 水泵命令执行完的回报：关掉这条命令（决策 -> 出水的闭环）
+    if command_id:
+        pump_commands.acknowledge(command_id, "done", device=data.get("device"), water_ml=water_ml,
+                                  path=PUMP_COMMANDS_PATH)
 
     return jsonify({"status": "ok"})
 
+# ========== API：浇水历史查询（范围 + 分组 + 分页） ==========
+@app.route("/api/watering")
+def api_watering():
+    """
+    GET /api/watering?from=2025-12-01&to=2025-12-07&pot=default&group_by=day&limit=100&offset=0
+
+    - from / to：日期或 ISO 时间，区间左闭右开（只写日期的 to 包含当天）
+    - pot：不填表示所有花盆
+    - group_by：hour / day / week，不填则返回浇水事件明细（最新的在前）
+    """
+    group_by = request.args.get("group_by") or None
+    if group_by is not None and group_by not in GROUP_BYS:
+        return jsonify({"status": "error", "msg": f"group_by must be one of {list(GROUP_BYS)}"}), 400
+
+    try:
+        start = parse_bound(request.args.get("from"))
+        end = parse_bound(request.args.get("to"), is_end=True)
+        limit = min(max(request.args.get("limit", 100, type=int), 1), 1000)
+        offset = max(request.args.get("offset", 0, type=int), 0)
+    except ValueError:
+        return jsonify({"status": "error", "msg": "invalid from/to"}), 400
+
+    idx = get_index(WATERING_LOG_FILE, pot=request.args.get("pot"))
+
+    if group_by:
+        groups = query_groups(idx, group_by, start=start, end=end)
+        total = len(groups)
+        items = groups[offset:offset + limit]
+    else:
+        items, total = query_events(idx, start=start, end=end, offset=offset, limit=limit)
+
+    next_offset = offset + len(items)
+    return jsonify({
+        "status": "ok",
+        "from": start,
+        "to": end,
+        "pot": request.args.get("pot"),
+        "group_by": group_by,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "next_offset": next_offset if next_offset < total else None,
+        "items": items,
+    })
+
+
+# ========== API：预测下一次需要检查的时间 ==========
+@app.route("/api/next_check")
+def api_next_check():
+    """
+    GET /api/next_check?pot=default&threshold=35
+    按上次浇水后的湿度下降速度，预测何时降到下限（threshold 不填则用这盆配置的 moisture_min，
+    再没有就用最近一次 AI 给出的下限）。
+    """
+    threshold = request.args.get("threshold")
+    try:
+        threshold = float(threshold) if threshold is not None else None
+    except ValueError:
+        return jsonify({"status": "error", "msg": "invalid threshold"}), 400
+
+    pot = request.args.get("pot") or None
+    config = get_registry(POT_INFO_FILE).get(pot)
+    if threshold is None and config is not None:
+        threshold = config.get("moisture_min")
+    device = config.get("device") if config is not None else None
+    # 拟合结果只和日志内容有关，按分钟重算“距离现在多久”
+    prediction = cached(f"drying.{pot}.{threshold}.{device}", [SENSOR_LOG_FILE, WATERING_LOG_FILE],
+                        lambda: predict_next_check(SENSOR_LOG_FILE, WATERING_LOG_FILE, pot=pot, threshold=threshold,
+                                                   device=device),
+                        extra_key=datetime.now().strftime("%Y-%m-%dT%H:%M"))
+    return jsonify({"status": "ok", **prediction})
+
+
+# ========== API：天气预报特征（只读缓存，不请求天气接口） ==========
+@app.route("/api/forecast")
+def api_forecast():
+    """
+    GET /api/forecast?lat=31.23&lon=121.47&hourly=1
+    lat / lon 不填则用花盆（?pot=，默认 default）配置里的位置；hourly=1 时附带逐小时数据和每日 ET0。
+    预报由 scheduler 的后台线程刷新，这里没有就返回 404。
+    """
+    pot_info = pot_form(request.args.get("pot"), POT_INFO_FILE)
+    lat = request.args.get("lat", pot_info.get("latitude"))
+    lon = request.args.get("lon", pot_info.get("longitude"))
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "msg": "lat/lon required"}), 400
+
+    features = get_features(lat, lon, store_path=FORECAST_FILE)
+    if features is None:
+        return jsonify({"status": "error", "msg": "no fresh forecast for this location"}), 404
+
+    result = {"status": "ok", "lat": lat, "lon": lon, "features": features}
+    if request.args.get("hourly"):
+        entry = get_forecast(lat, lon, store_path=FORECAST_FILE)
+        result["hourly"] = entry["hourly"]
+        result["daily_et0_mm"] = entry["daily_et0_mm"]
+    return jsonify(result)
+
+
 # ========== 重置植物 ==========
 # @app.route("/reset", methods=["POST"])
 # def reset_route():
@@ -313,28 +399,26 @@ def setup():
             file.save("image.jpg")
 
 
-        # 2. 读取表单的花盆信息和位置信息
-        pot_diameter = request.form.get("pot_diameter", type=float)
-        pot_height = request.form.get("pot_height", type=float)
-        latitude = request.form.get("latitude", "")
-        longitude = request.form.get("longitude", "")
-
+        # 2. 读取表单的花盆信息和位置信息（数字校验 / 转换在 pot_config 里统一做）
         pot_info = {
-            "pot_diameter": pot_diameter,
-            "pot_height": pot_height,
-            "latitude": latitude,
-            "longitude": longitude,
+            "pot_diameter": request.form.get("pot_diameter"),
+            "pot_height": request.form.get("pot_height"),
+            "latitude": request.form.get("latitude", ""),
+            "longitude": request.form.get("longitude", ""),
+            "updated_at": datetime.now().isoformat(timespec="seconds"),
         }
-        
 
-        save_json(POT_INFO_FILE, pot_info)
+        try:
+            save_pot_config(pot_info, request.form.get("pot"), POT_INFO_FILE)
+        except ValueError as e:
+            return jsonify({"status": "error", "msg": str(e)}), 400
 
         # 这里以后也可以顺便触发一次健康评估等逻辑
 
         return redirect(url_for("index"))
 
     # GET 请求：展示表单（如果已经有 pot_info，就当作默认值）
-    pot_info = load_json(POT_INFO_FILE, default={})
+    pot_info = pot_form(request.args.get("pot"), POT_INFO_FILE)
     return render_template("setup.html", pot_info=pot_info)
 
 
@@ -349,7 +433,7 @@ def upload_sensor():
     print("\n[/upload] 收到请求，remote_addr =", request.remote_addr)
 
     try:
-        data = request.get_json(force=True, silent=False)
+        data = codec.loads(request.get_data(cache=False))
     except Exception as e:
         print("[/upload] get_json error:", e)
         return jsonify({"status": "error", "msg": "invalid json"}), 400
@@ -360,23 +444,69 @@ def upload_sensor():
         print("[/upload] JSON 不是对象，丢弃")
         return jsonify({"status": "error", "msg": "json must be object"}), 400
 
-    now = datetime.now()
-    record = {
+    try:
+        total, anomalies = ingest_sensor_payload(data)
+    except ValueError as e:
+        print("[/upload] 数据校验失败:", e)
+        return jsonify({"status": "error", "msg": str(e)}), 400
+
+    print("[/upload] 已追加一条记录，目前总条数:", total)
+    return jsonify({"status": "ok", "anomalies": anomalies}), 200
+
+
+def sensor_record(data, now=None):
+    """
+    /upload、/upload_bin 共用：只保留 SensorReading 定义的字段并校验类型，时间和来源地址以服务器为准。
+    数据不合法抛 ValueError。
+    """
+    now = now or datetime.now()
+    return SensorReading.from_dict({
+        **data,
         "timestamp": now.isoformat(timespec="seconds"),
         "date": now.date().isoformat(),
         "remote_addr": request.remote_addr,
-    }
-    record.update(data)
+    }).to_dict()
+
+
+def ingest_sensor_payload(data):
+    """校验一条读数并入库，返回 (日志总条数, anomalies)，数据不合法抛 ValueError。"""
+    # 流式异常检测：标记写进记录，设备状态 / 最后有效值写进 sensor_state.json
+    return ingest_reading(sensor_record(data), SENSOR_LOG_FILE)
 
-    sensor_log = load_json(SENSOR_LOG_FILE, default=[])
-    sensor_log.append(record)
-    save_json(SENSOR_LOG_FILE, sensor_log)
 
-    print("[/upload] 已追加一条记录，目前总条数:", len(sensor_log))
-    return jsonify({"status": "ok"}), 200
+# ========== 接收二进制格式的传感器信息 ==========
+@app.route("/upload_bin", methods=["POST"])
+def upload_sensor_bin():
+    """
+    和 /upload 一样入库，但请求体是 telemetry.py 定义的 16 字节二进制帧（可以多条首尾相连）。
+    整个请求先全部校验，再一次异常检测 + 一次日志追加（和 MQTT bridge 一样用 ingest_readings）。
+    """
+    try:
+        now = datetime.now()
+        records = [sensor_record(r, now) for r in telemetry.decode(request.get_data(cache=False))]
+    except ValueError as e:
+        print("[/upload_bin] 数据校验失败:", e)
+        return jsonify({"status": "error", "msg": str(e)}), 400
+
+    anomalies = []
+    if records:
+        total, anomalies = ingest_readings(records, SENSOR_LOG_FILE)
+        print(f"[/upload_bin] 已追加 {len(records)} 条记录，目前总条数:", total)
+    return jsonify({"status": "ok", "count": len(records), "anomalies": anomalies}), 200
 
 
 # ========== 接收摄像头照片，保存图片 ==========
+def new_frame_path():
+    """
+    为新上传的摄像头照片生成文件名和保存路径。
+    文件先写到 "<路径>.part"，写完再改名，scheduler 不会读到半张图。
+    """
+    # 文件名：20251207_142205.jpg
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{ts}.jpg"
+    return filename, os.path.join(IMAGES_DIR, filename)
+
+
 @app.route("/esp32_upload", methods=["POST"])
 def esp32_upload():
 
@@ -385,99 +515,283 @@ def esp32_upload():
     if not img_bytes:
         return jsonify({"status": "error", "msg": "empty body"}), 400
 
-    # 文件名：20251207_142205.jpg
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{ts}.jpg"
-    save_path = os.path.join(IMAGES_DIR, filename)
+    filename, save_path = new_frame_path()
 
     try:
-        with open(save_path, "wb") as f:
+        with open(save_path + ".part", "wb") as f:
             f.write(img_bytes)
+        os.replace(save_path + ".part", save_path)
     except Exception as e:
         print("[/esp32_upload] 保存失败:", e)
         return jsonify({"status": "error", "msg": "failed to save file"}), 500
 
     print(f"[/esp32_upload] ✅Image Saved: {save_path}")
 
+    # 感知哈希：scheduler 据此判断植物外观有没有变化（没装 Pillow 时为 None）
+    dhash = record_frame(filename, save_path, FRAME_HASHES_FILE)
+
     return jsonify({
         "status": "ok",
         "filename": filename,
+        "dhash": dhash,
     }), 200
 
 
+# ========== 照片读取：原图 / 缩略图 + 延时摄影 ==========
+@app.route("/images/<filename>")
+def serve_image(filename):
+    """
+    GET /images/20251207_154348.jpg[?size=thumb|medium]
+    强 ETag（内容哈希）+ Cache-Control；If-None-Match 命中返回 304，支持 Range；
+    文件通过 wsgi.file_wrapper 发送（gunicorn 下走 sendfile，不经过 Python 拷贝）。
+    """
+    path = os.path.join(IMAGES_DIR, os.path.basename(filename))
+    if os.path.basename(filename) != filename or not filename.endswith(".jpg") or not os.path.isfile(path):
+        return jsonify({"status": "error", "msg": "image not found"}), 404
+
+    try:
+        path, etag = variant_path(path, request.args.get("size"), IMAGE_CACHE_PATH)
+    except ValueError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 400
+    except OSError as e:
+        print("[/images] 生成缩略图失败:", filename, e)
+        return jsonify({"status": "error", "msg": "failed to read image"}), 500
+
+    return send_file(path, mimetype="image/jpeg", conditional=True, etag=etag, max_age=IMAGE_MAX_AGE)
+
+
+@app.route("/api/timelapse")
+def api_timelapse():
+    """
+    GET /api/timelapse?from=2025-12-07&to=2025-12-08&frames=24&size=thumb&dedupe=1
+    时间段内均匀抽 frames 帧，返回每帧的时间和图片 URL。只看文件名里的时间戳，不解码图片；
+    dedupe=1 时先用上传时算好的感知哈希去掉几乎不变的帧。
+    """
+    try:
+        start = parse_bound(request.args.get("from"))
+        end = parse_bound(request.args.get("to"), is_end=True)
+    except ValueError:
+        return jsonify({"status": "error", "msg": "invalid from/to"}), 400
+    count = min(max(request.args.get("frames", 24, type=int), 1), 500)
+    size = request.args.get("size", "thumb")
+    if size not in ("original", *VARIANTS):
+        return jsonify({"status": "error", "msg": f"size must be one of {['original', *VARIANTS]}"}), 400
+
+    frames = list_frames(IMAGES_DIR)
+    if request.args.get("dedupe") == "1":
+        frames = dedupe_frames(select_frames(frames, start, end, count=0),
+                               load_json(FRAME_HASHES_FILE, default={}), CHANGE_THRESHOLD)
+    selected = select_frames(frames, start, end, count)
+    return jsonify({
+        "status": "ok",
+        "count": len(selected),
+        "frames": [
+            {"timestamp": t, "filename": name, "url": url_for("serve_image", filename=name, size=size)}
+            for t, name in selected
+        ],
+    })
+
+
 # ========== 可视化页面 ==========
+def get_recent_sensor_data(hours=24):
+    """
+    最近 hours 小时的传感器记录（按时间排序）。
+    缓存的是“从前天 0 点起”的记录，key 是 sensor_log 的版本号 + 日期，
+    每次请求只用 bisect 切出 24 小时窗口，不读文件也不排序。
+    """
+    today = datetime.now().date()
+    since = datetime.combine(today - timedelta(days=2), datetime.min.time())
+
+    def build():
+        records = query_range(SENSOR_LOG_FILE, start=since)
+        return [r.get("timestamp", "") for r in records], records
+
+    timestamps, records = cached("sensor.window", [SENSOR_LOG_FILE], build, extra_key=today)
+    cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
+    return records[bisect_left(timestamps, cutoff):]
+
+
 @app.route("/dashboard")
 def dashboard():
-    sensor_log = load_json(SENSOR_LOG_FILE, default=[])
-    pot_info = load_json(POT_INFO_FILE, default={})  # 给 base.html 的花盆弹窗用
+    pot_info = pot_form(path=POT_INFO_FILE)  # 给 base.html 的花盆弹窗用
 
-    now = datetime.now()
-    cutoff = now - timedelta(hours=24)
-
-    def in_last_24h(rec):
-        ts = rec.get("timestamp")
-        if not ts:
-            return False
-        try:
-            dt = datetime.fromisoformat(ts)
-            return dt >= cutoff
-        except Exception:
-            return False
+    recent_sensor_data = get_recent_sensor_data(hours=24)
 
-    recent_sensor_data = [r for r in sensor_log if in_last_24h(r)]
-    recent_sensor_data.sort(key=lambda x: x.get("timestamp", ""))
+    today = datetime.now().date().isoformat()
+    health_panel = cached("index.health", [HEALTH_SUMMARY_FILE, HEALTH_LOG_FILE], get_latest_health_panel, extra_key=today)
 
     return render_template(
         "dashboard.html",
         sensor_data=recent_sensor_data,
+        health_panel=health_panel,
         pot_info=pot_info,   # 🔴 关键：传给 base.html
     )
 
 
 
+# ========== 植物健康趋势（API） ==========
+@app.route("/api/health_summary")
+def api_health_summary():
+    """
+    GET /api/health_summary?pot=default
+    最新评估 + 最近 7 / 30 天的平均 health_level 和标签频次，直接读增量摘要。
+    """
+    pot = request.args.get("pot") or None
+    summary = get_health_summary(HEALTH_LOG_FILE, pot=pot)
+    if summary is None:
+        return jsonify({"status": "error", "msg": "no health assessment for this pot"}), 404
+    return jsonify({"status": "ok", "pot": pot or DEFAULT_POT, **summary})
+
+
+# ========== 传感器设备健康状态（API） ==========
+@app.route("/api/sensor_health")
+def api_sensor_health():
+    """
+    GET /api/sensor_health
+    每个设备的状态（ok / degraded / faulty / stale）、最近一条的异常标记和各字段最后有效值。
+    """
+    health = cached("sensor.health", [SENSOR_STATE_FILE], lambda: device_health(SENSOR_LOG_FILE),
+                    extra_key=datetime.now().strftime("%Y-%m-%dT%H:%M"))
+    return jsonify({"status": "ok", "devices": health})
+
+
+@app.route("/api/outbound_stats")
+def api_outbound_stats():
+    """
+    GET /api/outbound_stats
+    本进程对外 HTTP 调用（PlantNet / OpenWeather / OpenAI）的请求、重试、失败、熔断次数和延迟。
+    """
+    return jsonify({"status": "ok", "providers": http_client.stats()})
+
+
+# ========== 水泵命令通道（服务器 -> 设备） ==========
+@app.route("/api/pump/commands", methods=["POST"])
+def api_pump_enqueue():
+    """
+    POST /api/pump/commands  {"water_ml": 200, "pot": "default", "device": "feather-esp32-v2", "reason": "manual"}
+    手动浇水：命令进入设备队列，设备的长轮询马上拿到。device 缺省时用这盆配置里的 device。
+    这盆已经有没结束的命令时返回那一条，不会再排一条。
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    pot = data.get("pot")
+    config = get_registry(POT_INFO_FILE).get(pot)
+    device = data.get("device") or (config.get("device") if config else None) or pump_commands.DEFAULT_DEVICE
+    try:
+        command = pump_commands.enqueue(device, data.get("water_ml"), pot=pot, reason=data.get("reason") or "manual",
+                                        path=PUMP_COMMANDS_PATH)
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "msg": f"water_ml must be a number > 0 ({e})"}), 400
+    return jsonify({"status": "ok", "command": command})
+
+
+@app.route("/api/pump/commands/<device>")
+def api_pump_poll(device):
+    """
+    GET /api/pump/commands/<device>?wait=25
+    设备长轮询：有命令立即返回，没有就挂着直到有命令入队或 wait 秒后返回空列表。
+    wait=0 只查一次。（用 asgi.py 部署时这个路由在事件循环里等，不占线程。）
+    """
+    try:
+        wait = max(0.0, float(request.args.get("wait", pump_commands.MAX_WAIT_S)))
+    except ValueError:
+        return jsonify({"status": "error", "msg": "wait must be a number"}), 400
+    commands = pump_commands.wait_for_commands(device, wait, PUMP_COMMANDS_PATH)
+    return jsonify({"status": "ok", "commands": commands})
+
+
+@app.route("/api/pump/ack", methods=["POST"])
+def api_pump_ack():
+    """
+    POST /api/pump/ack  {"device": "...", "id": "3f9c...", "status": "started" | "failed", "error": "..."}
+    设备开泵时确认（started）；浇完通过 /api/report_watering 带 command_id 回报。
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    if not data.get("id"):
+        return jsonify({"status": "error", "msg": "id required"}), 400
+    try:
+        command = pump_commands.acknowledge(data["id"], data.get("status", "started"), device=data.get("device"),
+                                            error=data.get("error"), path=PUMP_COMMANDS_PATH)
+    except ValueError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 400
+    if command is None:
+        return jsonify({"status": "error", "msg": "unknown command"}), 404
+    return jsonify({"status": "ok", "command_status": command["status"]})
+
+
+@app.route("/api/pump/latency")
+def api_pump_latency():
+    """
+    GET /api/pump/latency?device=...
+    最近命令从决策到发出 / 开泵 / 浇完的延迟分布（秒），以及还没结束的命令数。
+    """
+    device = request.args.get("device") or None
+    return jsonify({"status": "ok", **pump_commands.latency_stats(device, PUMP_COMMANDS_PATH),
+                    "commands": pump_commands.list_commands(device, PUMP_COMMANDS_PATH)[-20:]})
+
+
+# ========== 历史数据导出（流式） ==========
+@app.route("/api/export/<dataset>")
+def api_export(dataset):
+    """
+    GET /api/export/sensor?format=csv|ndjson|parquet&from=2025-12-01&to=2025-12-07&pot=default
+    dataset: sensor / watering / health。边读边发（chunked），导出多大内存都不涨。
+    """
+    fmt = request.args.get("format", "csv")
+    logs = {"sensor": SENSOR_LOG_FILE, "watering": WATERING_LOG_FILE, "health": HEALTH_LOG_FILE}
+    if dataset not in logs:
+        return jsonify({"status": "error", "msg": f"dataset must be one of {list(logs)}"}), 404
+    try:
+        stream = export_stream(dataset, fmt, logs[dataset], request.args.get("from") or None,
+                               request.args.get("to") or None, request.args.get("pot") or None)
+    except ValueError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 501
+
+    filename = f"{dataset}.{fmt}"
+    return Response(stream_with_context(stream), mimetype=CONTENT_TYPES[fmt],
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
+
+
 # ========== 读取sensor历史信息（API） ==========
 @app.route("/api/sensor_24h")
 def api_sensor_24h():
-    sensor_log = load_json(SENSOR_LOG_FILE, default=[])
-    now = datetime.now()
-    cutoff = now - timedelta(hours=24)
-
-    result = []
-    for rec in sensor_log:
-        ts = rec.get("timestamp")
-        if not ts:
-            continue
-        try:
-            dt = datetime.fromisoformat(ts)
-        except Exception:
-            continue
-        if dt >= cutoff:
-            result.append(rec)
-
-    result.sort(key=lambda x: x.get("timestamp", ""))
-    return jsonify(result)
+    return jsonify(get_recent_sensor_data(hours=24))
 
 
 # ========== 花盆信息设置 ==========
 @app.route("/save_pot", methods=["POST"])
 def save_pot():
-    pot_diameter = request.form.get("pot_diameter")
-    pot_height = request.form.get("pot_height")
-    latitude = request.form.get("latitude")
-    longitude = request.form.get("longitude")
-
+    # 表单里没有的字段（比如手工配置的 device）保留原值
+    existing = get_registry(POT_INFO_FILE).get(request.form.get("pot"))
     pot_info = {
-        "pot_diameter": pot_diameter,
-        "pot_height": pot_height,
-        "latitude": latitude,
-        "longitude": longitude,
+        "pot_diameter": request.form.get("pot_diameter"),
+        "pot_height": request.form.get("pot_height"),
+        "latitude": request.form.get("latitude"),
+        "longitude": request.form.get("longitude"),
+        "plant_name": existing.get("plant_name") if existing else None,
+        "device": request.form.get("device") or (existing.get("device") if existing else None),
+        "moisture_min": request.form.get("moisture_min") or (existing.get("moisture_min") if existing else None),
         "updated_at": datetime.now().isoformat(timespec="seconds"),
     }
-    save_json(POT_INFO_FILE, pot_info)
+    try:
+        save_pot_config(pot_info, request.form.get("pot"), POT_INFO_FILE)
+    except ValueError as e:
+        return jsonify({"status": "error", "msg": str(e)}), 400
 
     return redirect(url_for("index"))
 
 
+@app.route("/api/pots")
+def api_pots():
+    """
+    GET /api/pots
+    所有花盆的配置（数值已转成 float）。
+    """
+    pots = get_registry(POT_INFO_FILE).all()
+    return jsonify({"status": "ok", "pots": {name: pot.to_dict() for name, pot in pots.items()}})
+
+
 if __name__ == "__main__":
     print("[INFO] BASE_DIR =", BASE_DIR)
     print("[INFO] SENSOR_LOG_FILE =", SENSOR_LOG_FILE)
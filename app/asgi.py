@@ -0,0 +1,132 @@
+"""
+ASGI 入口：
+
+    cd app
+    uvicorn asgi:application --workers 4
+    # 或者用 gunicorn 管理进程（kill -HUP 平滑重载，见 gunicorn.conf.py）：
+    WATERING_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py asgi:application
+
+摄像头上传（/esp32_upload）在事件循环里按块接收、边收边写，
+水泵命令的长轮询（GET /api/pump/commands/<device>）在事件循环里等，
+慢速 / 长时间挂着的 ESP32 连接都不会占用一个线程；其余路由交给 Flask（WsgiToAsgi 线程池）。
+"""
+import os
+import asyncio
+import contextvars
+import json
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import FRAME_HASHES_FILE, PUMP_COMMANDS_PATH, app as flask_app, new_frame_path
+from modules.frame_hash import record_frame
+from modules.pump_commands import MAX_WAIT_S, wait_for_commands_async
+
+PUMP_POLL_PREFIX = "/api/pump/commands/"
+
+_wsgi = WsgiToAsgi(flask_app)
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def esp32_upload(scope, receive, send):
+    """与 app.esp32_upload 行为一致的原生 ASGI 版本。"""
+    filename, save_path = new_frame_path()
+    part_path = save_path + ".part"
+    loop = asyncio.get_running_loop()
+
+    size = 0
+    f = open(part_path, "wb")
+    try:
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                raise ConnectionError("client disconnected")
+            chunk = message.get("body", b"")
+            if chunk:
+                size += len(chunk)
+                # 磁盘写放到线程池，避免阻塞事件循环
+                await loop.run_in_executor(None, f.write, chunk)
+            if not message.get("more_body", False):
+                break
+        f.close()
+    except Exception as e:
+        f.close()
+        os.remove(part_path)
+        print("[/esp32_upload] 保存失败:", e)
+        if isinstance(e, ConnectionError):
+            return
+        await _send_json(send, 500, {"status": "error", "msg": "failed to save file"})
+        return
+
+    if size == 0:
+        os.remove(part_path)
+        await _send_json(send, 400, {"status": "error", "msg": "empty body"})
+        return
+
+    os.replace(part_path, save_path)
+    print(f"[/esp32_upload] ✅Image Saved: {save_path}")
+    # 解码 + 缩小算哈希放到线程池，不阻塞事件循环
+    dhash = await loop.run_in_executor(None, record_frame, filename, save_path, FRAME_HASHES_FILE)
+    await _send_json(send, 200, {"status": "ok", "filename": filename, "dhash": dhash})
+
+
+async def pump_poll(scope, receive, send):
+    """与 app.api_pump_poll 行为一致的原生 ASGI 版本。"""
+    device = scope["path"][len(PUMP_POLL_PREFIX):]
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    try:
+        wait = max(0.0, float(query.get("wait", [MAX_WAIT_S])[0]))
+    except ValueError:
+        await _send_json(send, 400, {"status": "error", "msg": "wait must be a number"})
+        return
+    commands = await wait_for_commands_async(device, wait, PUMP_COMMANDS_PATH)
+    await _send_json(send, 200, {"status": "ok", "commands": commands})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if (
+        scope["type"] == "http"
+        and scope["path"] == "/esp32_upload"
+        and scope["method"] == "POST"
+    ):
+        await esp32_upload(scope, receive, send)
+        return
+    if (
+        scope["type"] == "http"
+        and scope["method"] == "GET"
+        and scope["path"].startswith(PUMP_POLL_PREFIX)
+        and len(scope["path"]) > len(PUMP_POLL_PREFIX)
+        and "/" not in scope["path"][len(PUMP_POLL_PREFIX):]
+    ):
+        await pump_poll(scope, receive, send)
+        return
+    # 每个请求在新的 context 里跑 WsgiToAsgi：uvicorn 在上一个请求的 task 里创建同一个 keep-alive 连接的
+    # 下一个请求，asgiref 设在 context 里的线程池状态会漏过去，下一个请求就 500
+    # （"CurrentThreadExecutor already quit" / "Single thread executor already being used"）
+    loop = asyncio.get_running_loop()
+    await contextvars.Context().run(loop.create_task, _wsgi(scope, receive, send))
@@ -0,0 +1,143 @@
+"""
+批量评估（modules/batch_assess.py）对着本地假模型服务器跑：不花钱、不联网，看每次请求能评估几盆、
+坏回复是否只影响那一盆。
+
+假服务器实现 POST /v1/chat/completions：从 user 消息里找出 "pot_id: ..."，为每盆生成合法结果，
+每次请求固定延迟 --latency 秒（模拟模型响应时间）；--bad-every N 让批量回复里每第 N 盆的结果缺字段，
+触发单盆重试。
+
+装了 openai SDK 时通过 OPENAI_BASE_URL 走真实的 SDK 路径，否则用 urllib 发同样的请求。
+
+    python benchmarks/bench_assess.py --pots 16 --latency 0.3 --bad-every 5
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import ai_test, batch_assess  # noqa: E402
+
+IMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "image.jpg")
+POT_ID = re.compile(r"^pot_id: (\S+)$", re.M)
+
+
+def fake_result(moisture):
+    water = moisture < 35
+    return {
+        "health": {"health_level": 4, "reasons": ["healthy"],
+                   "suggestions": ["Keep the current routine.", "Check leaves weekly."]},
+        "irrigation": {"should_water": water, "water_ml": 150 if water else 0,
+                       "target_soil_moisture_percent_min": 35, "target_soil_moisture_percent_max": 60,
+                       "note": "Fake model reply."},
+    }
+
+
+class FakeModel(BaseHTTPRequestHandler):
+    latency = 0.3
+    bad_every = 0
+    calls = 0
+    served = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = [part["text"] for msg in body["messages"] if msg["role"] == "user"
+                 for part in msg["content"] if part["type"] == "text"]
+        pot_ids = [m for t in texts for m in POT_ID.findall(t)]
+        moisture = [float(re.search(r"soil_moisture_percent: (\S+)", t).group(1)) for t in texts]
+
+        with FakeModel.lock:
+            FakeModel.calls += 1
+        time.sleep(FakeModel.latency)
+
+        if pot_ids:
+            pots = {}
+            for pot, m in zip(pot_ids, moisture):
+                with FakeModel.lock:
+                    FakeModel.served += 1
+                    n = FakeModel.served
+                result = fake_result(m)
+                if FakeModel.bad_every and n % FakeModel.bad_every == 0:
+                    del result["irrigation"]  # 坏的一盆
+                pots[pot] = result
+            content = json.dumps({"pots": pots})
+        else:
+            content = json.dumps(fake_result(moisture[0]))
+
+        reply = json.dumps({
+            "id": "fake", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+def urllib_complete(base_url):
+    def complete(messages, model):
+        req = urllib.request.Request(base_url + "/chat/completions",
+                                     data=json.dumps({"model": model, "messages": messages}).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=30) as resp:
+            return json.loads(resp.read())["choices"][0]["message"]["content"]
+    return complete
+
+
+def make_inputs(n):
+    return [{
+        "pot": f"pot{i:02d}", "image_path": IMAGE, "plant_name": "Monstera deliciosa",
+        "pot_diameter": 18, "pot_height": 20, "soil_moisture_percent": 20 + i * 3,
+        "will_rain_next_24h": False, "rain_mm_next_24h": 0.0, "max_temp_next_24h_c": 27.0,
+        "light_lux": 300.0, "soil_temperature_c": 21.0, "air_temperature_c": 24.0, "air_humidity_percent": 45.0,
+    } for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pots", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--bad-every", type=int, default=5)
+    args = parser.parse_args()
+
+    FakeModel.latency = args.latency
+    FakeModel.bad_every = args.bad_every
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeModel)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    try:
+        import openai  # noqa: F401
+        ai_test.OPENAI_BASE_URL, ai_test.OPENAI_API_KEY = base_url, "test"
+        complete, via = None, "openai SDK"
+    except ImportError:
+        complete, via = urllib_complete(base_url), "urllib (openai SDK not installed)"
+    print(f"{args.pots} pots, {args.latency}s per call, every {args.bad_every}th pot result malformed, via {via}")
+    print(f"{'batch':>6}{'calls':>7}{'pots/call':>11}{'ok':>5}{'failed':>8}{'seconds':>9}")
+
+    inputs = make_inputs(args.pots)
+    for batch_size in (1, 4, 8):
+        FakeModel.served = 0
+        t0 = time.perf_counter()
+        out = batch_assess.assess_batch(inputs, batch_size=batch_size, complete=complete, write_logs=False)
+        seconds = time.perf_counter() - t0
+        print(f"{batch_size:>6}{out['calls']:>7}{len(out['results']) / out['calls']:>11.2f}"
+              f"{len(out['results']):>5}{len(out['errors']):>8}{seconds:>9.2f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+记录模型 + 编解码层的测试：
+
+- 编码 / 解码耗时：旧写法 json.dump(indent=2) vs codec（orjson 或紧凑 stdlib json）
+- 文件大小：带缩进 vs 紧凑
+- 每条记录的内存：dict vs SensorReading（__slots__）
+
+    python benchmarks/bench_codec.py --records 50000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import codec  # noqa: E402
+from modules.records import SensorReading  # noqa: E402
+
+
+def make_records(n):
+    return [
+        {
+            "timestamp": f"2025-12-{1 + i // 17280 % 28:02d}T{i // 720 % 24:02d}:{i // 12 % 60:02d}:{i * 5 % 60:02d}",
+            "date": f"2025-12-{1 + i // 17280 % 28:02d}",
+            "remote_addr": "10.206.182.57",
+            "device": "feather-esp32-v2",
+            "light_lux": 300.0 + i % 97,
+            "soil_moisture_percent": 40.0 + (i % 300) / 10,
+            "soil_temperature_c": 21.0 + (i % 40) / 10,
+            "air_temperature_c": 24.0 + (i % 50) / 10,
+            "air_humidity_percent": 35.0 + (i % 200) / 10,
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def memory_per_record(build, n):
+    tracemalloc.start()
+    objs = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objs
+    return current / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=50000)
+    args = parser.parse_args()
+    n = args.records
+
+    records = make_records(n)
+
+    t_old_enc, old_text = timed(lambda: json.dumps(records, ensure_ascii=False, indent=2).encode("utf-8"))
+    t_new_enc, new_bytes = timed(lambda: codec.dumps(records))
+    t_old_dec, _ = timed(lambda: json.loads(old_text))
+    t_new_dec, _ = timed(lambda: codec.loads(new_bytes))
+
+    print(f"codec backend: {codec.BACKEND}, {n} sensor records")
+    print(f"{'':<24}{'indent=2 json':>16}{'codec':>12}")
+    print(f"{'encode (ms)':<24}{t_old_enc * 1000:>16.1f}{t_new_enc * 1000:>12.1f}")
+    print(f"{'decode (ms)':<24}{t_old_dec * 1000:>16.1f}{t_new_dec * 1000:>12.1f}")
+    print(f"{'file size (KiB)':<24}{len(old_text) / 1024:>16.0f}{len(new_bytes) / 1024:>12.0f}")
+
+    mem_dict = memory_per_record(lambda: codec.loads(new_bytes), n)
+    mem_slots = memory_per_record(lambda: [SensorReading.from_dict(r) for r in codec.loads(new_bytes)], n)
+    t_validate, _ = timed(lambda: [SensorReading.from_dict(r) for r in records])
+    print(f"{'bytes / record in RAM':<24}{'dict':>16}{'__slots__':>12}")
+    print(f"{'':<24}{mem_dict:>16.0f}{mem_slots:>12.0f}")
+    print(f"validation at ingest: {t_validate / n * 1e6:.2f} µs / record")
+
+
+if __name__ == "__main__":
+    main()
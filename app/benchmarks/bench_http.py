@@ -0,0 +1,111 @@
+"""
+HTTP 吞吐量测试：对一个正在运行的服务（开发服务器 / gunicorn / uvicorn）
+跑几个固定场景，输出 req/s 和延迟分位数。
+
+    python benchmarks/bench_http.py --url http://127.0.0.1:5000 --concurrency 16 --seconds 10
+
+场景：
+- index       GET  /
+- dashboard   GET  /dashboard
+- sensor_24h  GET  /api/sensor_24h
+- upload      POST /upload（模拟 ESP32 上报一条传感器数据）
+"""
+import time
+import json
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+
+UPLOAD_PAYLOAD = json.dumps({
+    "light_lux": 312.5,
+    "soil_moisture_percent": 41.7,
+    "soil_temperature_c": 21.3,
+    "air_temperature_c": 24.8,
+    "air_humidity_percent": 38.0,
+    "device": "feather-esp32-v2",
+}).encode("utf-8")
+
+SCENARIOS = {
+    "index": ("GET", "/", None),
+    "dashboard": ("GET", "/dashboard", None),
+    "sensor_24h": ("GET", "/api/sensor_24h", None),
+    "upload": ("POST", "/upload", UPLOAD_PAYLOAD),
+}
+
+
+def _worker(host, port, method, path, body, deadline, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {"Content-Type": "application/json"} if body else {}
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                errors.append(resp.status)
+        except Exception as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+
+def run_scenario(url, name, concurrency, seconds):
+    parsed = urlparse(url)
+    method, path, body = SCENARIOS[name]
+    latencies, errors = [], []
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(parsed.hostname, parsed.port or 80, method, path, body,
+                  deadline, latencies, errors),
+        )
+        for _ in range(concurrency)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+
+    def pct(p):
+        if not latencies:
+            return float("nan")
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "req_per_s": len(latencies) / elapsed,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="可重复指定；默认跑全部场景")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<12}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name in args.scenario or list(SCENARIOS):
+        r = run_scenario(args.url, name, args.concurrency, args.seconds)
+        print(f"{r['scenario']:<12}{r['req_per_s']:>10.1f}{r['p50_ms']:>10.1f}"
+              f"{r['p99_ms']:>10.1f}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+批量导入（modules/bulk_import.py）的吞吐量：生成 N 条模拟传感器读数（CSV 或 NDJSON，
+时间跨度 --days 天，几台设备每 5 秒一条），导入到临时目录里的空日志，再导入一次看去重开销。
+
+对照：逐条 append_json_log（/upload 的写法，每条整文件重写）只跑 --naive 条，按比例外推。
+
+    python benchmarks/bench_import.py --rows 2000000 --format csv --workers 8
+"""
+import os
+import sys
+import csv
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import codec  # noqa: E402
+from modules.archive import archived_days  # noqa: E402
+from modules.bulk_import import import_files  # noqa: E402
+from modules.export import fields_for  # noqa: E402
+from modules.log_reader import get_reader  # noqa: E402
+from modules.storage import append_json_log  # noqa: E402
+
+
+def make_rows(n, days, devices=4):
+    start = datetime.now().replace(microsecond=0) - timedelta(days=days)
+    step = days * 86400 / max(n, 1)
+    for i in range(n):
+        t = start + timedelta(seconds=int(i * step))
+        yield {
+            "timestamp": t.isoformat(),
+            "device": f"device-{i % devices}",
+            "light_lux": 300.0 + i % 97,
+            "soil_moisture_percent": 40.0 + i % 13,
+            "soil_temperature_c": 20.0 + i % 7 / 10,
+            "air_temperature_c": 22.0 + i % 11 / 10,
+            "air_humidity_percent": 55.0 + i % 17,
+        }
+
+
+def write_input(path, fmt, n, days):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            fields = [k for k in fields_for("sensor") if k not in ("date", "remote_addr", "pot", "anomalies")]
+            writer = csv.DictWriter(f, fields)
+            writer.writeheader()
+            writer.writerows(make_rows(n, days))
+        else:
+            for row in make_rows(n, days):
+                f.write(codec.dumps_text(row) + "\n")
+
+
+def naive(workdir, rows):
+    log = os.path.join(workdir, "naive_log.json")
+    t0 = time.perf_counter()
+    for row in make_rows(rows, 1):
+        append_json_log(row, log)
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bulk import throughput")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--naive", type=int, default=2000, help="rows for the append_json_log baseline (0: skip)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_import_")
+    try:
+        source = os.path.join(workdir, f"input.{args.format}")
+        t0 = time.perf_counter()
+        write_input(source, args.format, args.rows, args.days)
+        print(f"generated {args.rows:,} rows ({os.path.getsize(source) / 1e6:.0f} MB) in {time.perf_counter() - t0:.1f}s")
+
+        log = os.path.join(workdir, "sensor_log.json")
+        for label in ("import", "re-import"):
+            stats = import_files("sensor", [source], log, workers=args.workers)
+            print(f"{label:>9}: {stats['elapsed_s']:.1f}s ({stats['rows'] / stats['elapsed_s']:,.0f} rows/s, parse "
+                  f"{stats['parse_s']:.1f}s)  archived +{stats['archived']:,}  hot +{stats['hot']:,}  "
+                  f"duplicates {stats['duplicates']:,}  invalid {stats['invalid']:,}")
+        print(f"storage: {len(archived_days(log))} archive days, {sum(1 for _ in get_reader(log).range()):,} hot records")
+
+        if args.naive:
+            seconds = naive(workdir, args.naive)
+            print(f"append_json_log x{args.naive:,}: {seconds:.1f}s ({args.naive / seconds:,.0f} rows/s, "
+                  f"and it slows down as the file grows)")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
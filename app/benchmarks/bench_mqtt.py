@@ -0,0 +1,126 @@
+"""
+传感器入库吞吐：HTTP /upload（每条一次请求、一次加锁重写日志） vs MQTT bridge（批量写）。
+
+两条路径都写到临时目录里的 sensor_log.json，不会动真实数据：
+
+- http   ：Flask test client 逐条 POST /upload（包含完整的 Flask 请求处理，不含网络）
+- single ：不经过 Flask，逐条调用 /upload 的入库函数（anomaly.ingest_reading），即 HTTP 路径的存储部分
+- mqtt   ：进程内 LocalBroker 发布到 plants/<pot>/sensor，MqttBridge 按 batch 写入
+- mqtt-bin：同上，payload 为 telemetry 二进制帧
+
+    python benchmarks/bench_mqtt.py --readings 2000 --batch-size 200
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import telemetry  # noqa: E402
+from modules.anomaly import ingest_reading  # noqa: E402
+from modules.mqtt_bridge import LocalBroker, MqttBridge  # noqa: E402
+from modules.storage import load_json  # noqa: E402
+
+READING = {
+    "light_lux": 312.5,
+    "soil_moisture_percent": 41.7,
+    "soil_temperature_c": 21.3,
+    "air_temperature_c": 24.8,
+    "air_humidity_percent": 38.0,
+    "device": "feather-esp32-v2",
+}
+
+
+def quiet(fn):
+    """入库路径每条都会 print，压测时关掉输出。"""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        return fn()
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def bench_http(n, directory):
+    try:
+        import app as webapp
+    except ImportError as e:
+        print(f"http: skipped ({e})")
+        return None
+    webapp.SENSOR_LOG_FILE = os.path.join(directory, "sensor_log.json")
+    client = webapp.app.test_client()
+    body = json.dumps(READING)
+
+    def run():
+        for _ in range(n):
+            client.post("/upload", data=body, content_type="application/json")
+
+    t0 = time.perf_counter()
+    quiet(run)
+    return time.perf_counter() - t0, webapp.SENSOR_LOG_FILE
+
+
+def bench_single(n, directory):
+    log_path = os.path.join(directory, "sensor_log.json")
+
+    def run():
+        for _ in range(n):
+            ingest_reading(dict(READING, timestamp=datetime.now().isoformat(timespec="seconds")), log_path)
+
+    t0 = time.perf_counter()
+    quiet(run)
+    return time.perf_counter() - t0, log_path
+
+
+def bench_mqtt(n, directory, batch_size, binary=False):
+    log_path = os.path.join(directory, "sensor_log.json")
+    broker = LocalBroker()
+    bridge = MqttBridge(log_path, batch_size=batch_size, flush_interval=0.5)
+    if binary:
+        topic, payload = "plants/default/sensor/bin", telemetry.encode(READING, 1)
+    else:
+        topic, payload = "plants/default/sensor", json.dumps(READING).encode("utf-8")
+
+    def run():
+        bridge.start(broker)
+        for _ in range(n):
+            broker.publish(topic, payload)
+        bridge.stop()
+
+    t0 = time.perf_counter()
+    quiet(run)
+    return time.perf_counter() - t0, log_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readings", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    n = args.readings
+
+    print(f"{n} readings, batch size {args.batch_size}")
+    print(f"{'path':<10}{'seconds':>10}{'readings/s':>12}{'stored':>8}")
+    cases = [
+        ("http", lambda d: bench_http(n, d)),
+        ("single", lambda d: bench_single(n, d)),
+        ("mqtt", lambda d: bench_mqtt(n, d, args.batch_size)),
+        ("mqtt-bin", lambda d: bench_mqtt(n, d, args.batch_size, binary=True)),
+    ]
+    for name, fn in cases:
+        with tempfile.TemporaryDirectory() as directory:
+            result = fn(directory)
+            if result is None:
+                continue
+            seconds, log_path = result
+            stored = len(load_json(log_path, default=[]))
+            print(f"{name:<10}{seconds:>10.2f}{n / seconds:>12.0f}{stored:>8}")
+
+
+if __name__ == "__main__":
+    main()
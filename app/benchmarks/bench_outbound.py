@@ -0,0 +1,107 @@
+"""
+对外 HTTP 调用层（modules/http_client.py）的本地测试：起一个本地替身服务器，不访问真实的 PlantNet / OpenWeather。
+
+场景：
+- fresh   ：每次 requests.get（新连接），即改造前 fetch_forecast 的做法
+- pooled  ：http_client.request，同一个 Session 复用连接
+- flaky   ：服务器每 3 次请求有 2 次返回 503，看重试次数和最终成功率
+- hung    ：服务器不回应（sleep 超过读超时），看熔断器打开后调用多快失败
+
+    python benchmarks/bench_outbound.py --requests 200
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import http_client  # noqa: E402
+
+BODY = b'{"cod": "200", "list": []}'
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive，才能看出连接复用的差别
+    counter = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with StandIn.lock:
+            StandIn.counter += 1
+            n = StandIn.counter
+        if self.path.startswith("/flaky") and n % 3 != 0:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/hung"):
+            time.sleep(2)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def timed(fn, n):
+    ok = 0
+    t0 = time.perf_counter()
+    for _ in range(n):
+        try:
+            fn()
+            ok += 1
+        except Exception:
+            pass
+    return time.perf_counter() - t0, ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    n = args.requests
+
+    import requests
+
+    server, base = start_server()
+    http_client.configure("standin", timeout=(1, 0.5), retries=3, backoff_base=0.01, backoff_max=0.05,
+                          failure_threshold=3, reset_timeout=30.0)
+
+    print(f"{'case':<8}{'calls':>7}{'ok':>6}{'seconds':>10}{'ms/call':>10}")
+    cases = [
+        ("fresh", lambda: requests.get(base + "/forecast", timeout=5).raise_for_status(), n),
+        ("pooled", lambda: http_client.request("standin", "GET", base + "/forecast").raise_for_status(), n),
+        ("flaky", lambda: http_client.request("standin", "GET", base + "/flaky").raise_for_status(), n // 4),
+        ("hung", lambda: http_client.request("standin", "GET", base + "/hung").raise_for_status(), 10),
+    ]
+    stdout = sys.stdout
+    for name, fn, calls in cases:
+        sys.stdout = open(os.devnull, "w")  # 重试 / 熔断日志太多，压测时关掉
+        try:
+            seconds, ok = timed(fn, calls)
+        finally:
+            sys.stdout.close()
+            sys.stdout = stdout
+        print(f"{name:<8}{calls:>7}{ok:>6}{seconds:>10.2f}{seconds / calls * 1000:>10.2f}")
+
+    print()
+    for key, value in http_client.stats()["standin"].items():
+        print(f"  {key:<18}{value}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
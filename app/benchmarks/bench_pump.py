@@ -0,0 +1,82 @@
+"""
+水泵命令通道（modules/pump_commands.py）：决策 -> 开泵的延迟，长轮询 vs 固定间隔轮询。
+
+和生产环境一样跨进程：一个子进程扮演 scheduler，隔随机时间给各设备入队命令；
+主进程里每台模拟设备一个线程，扮演“web worker 里挂着的长轮询 + 收到就开泵 ack 的设备”：
+- longpoll：wait_for_commands（等版本号变化），拿到命令立即 acknowledge(started)；
+- poll：每 --poll-interval 秒 take_commands 一次（设备按采样周期问一次的老办法）。
+延迟 = started_at - decided_at（都是入队 / ack 时的 time.time()）。网络往返不在内，见 hardware/mock_board.py --pump。
+
+    python benchmarks/bench_pump.py --devices 4 --commands 40 --poll-interval 5
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import pump_commands  # noqa: E402
+
+
+def scheduler_process(path, devices, commands, gap_s, seed):
+    random.seed(seed)
+    for i in range(commands):
+        time.sleep(random.uniform(0.5, 1.5) * gap_s)
+        pump_commands.enqueue(random.choice(devices), 100 + i, pot=f"pot{i}", reason="bench", path=path)
+
+
+def device_thread(path, device, mode, poll_interval, stop):
+    while not stop.is_set():
+        if mode == "longpoll":
+            commands = pump_commands.wait_for_commands(device, 1.0, path)
+        else:
+            stop.wait(poll_interval)
+            commands = pump_commands.take_commands(device, path)
+        for command in commands:
+            pump_commands.acknowledge(command["id"], "started", device=device, path=path)
+
+
+def run(mode, devices, commands, gap_s, poll_interval, seed=1):
+    workdir = tempfile.mkdtemp(prefix="bench_pump_")
+    path = os.path.join(workdir, pump_commands.PUMP_COMMANDS_FILE)
+    names = [f"device-{i}" for i in range(devices)]
+    stop = threading.Event()
+    threads = [threading.Thread(target=device_thread, args=(path, name, mode, poll_interval, stop), daemon=True)
+               for name in names]
+    for t in threads:
+        t.start()
+
+    proc = multiprocessing.Process(target=scheduler_process, args=(path, names, commands, gap_s, seed))
+    t0 = time.process_time()
+    proc.start()
+    proc.join()
+    deadline = time.time() + poll_interval + 2
+    while pump_commands.latency_stats(path=path)["open"] and time.time() < deadline:
+        time.sleep(0.05)
+    stop.set()
+    for t in threads:
+        t.join()
+    cpu = time.process_time() - t0
+
+    stats = pump_commands.latency_stats(path=path)["to_actuation"]
+    print(f"{mode:>9}: {stats['n']:3d} commands  p50 {stats['p50'] * 1000:7.1f} ms  "
+          f"p95 {stats['p95'] * 1000:7.1f} ms  max {stats['max'] * 1000:7.1f} ms  "
+          f"(device threads CPU {cpu:.2f} s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pump command latency: long-poll vs polling")
+    parser.add_argument("--devices", type=int, default=4)
+    parser.add_argument("--commands", type=int, default=40)
+    parser.add_argument("--gap-s", type=float, default=0.3, help="mean time between two decisions")
+    parser.add_argument("--poll-interval", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"{args.devices} devices, {args.commands} commands, one every ~{args.gap_s}s")
+    for mode in ("longpoll", "poll"):
+        run(mode, args.devices, args.commands, args.gap_s, args.poll_interval)
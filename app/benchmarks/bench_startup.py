@@ -0,0 +1,59 @@
+"""
+冷启动测试：在全新的解释器里 import app（web 进程入口），
+测量耗时，并检查重依赖（openai / requests）没有被提前加载。
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import sys, time, json
+t0 = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - t0
+heavy = [m for m in ("openai", "requests") if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+# web worker 冷启动的目标上限（秒）
+BUDGET_SECONDS = 1.0
+
+
+def measure(module, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            cwd=APP_DIR, capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="app", help="要测的入口模块，默认 app")
+    args = parser.parse_args()
+
+    results = measure(args.module, args.runs)
+    times = sorted(r["seconds"] for r in results)
+    heavy = sorted({m for r in results for m in r["heavy"]})
+
+    print(f"import {args.module}: min {times[0] * 1000:.1f} ms, "
+          f"median {times[len(times) // 2] * 1000:.1f} ms, max {times[-1] * 1000:.1f} ms")
+    print("heavy modules loaded at import:", heavy or "none")
+
+    ok = times[len(times) // 2] < BUDGET_SECONDS and not heavy
+    print("OK" if ok else f"FAIL (budget {BUDGET_SECONDS}s, no heavy imports)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
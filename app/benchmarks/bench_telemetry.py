@@ -0,0 +1,83 @@
+"""
+JSON vs 二进制遥测（telemetry.py）的对比：
+
+- 每条读数的字节数（请求体）
+- 编码耗时（设备端 CPU 的近似：固件里就是 json.dumps vs struct.pack）
+- 服务器解析耗时：codec.loads + 校验 vs telemetry.decode + 校验
+
+    python benchmarks/bench_telemetry.py --readings 20000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import codec, telemetry  # noqa: E402
+from modules.records import SensorReading  # noqa: E402
+
+
+def make_readings(n):
+    return [
+        {
+            "light_lux": 300.0 + i % 97 + 0.5,
+            "soil_moisture_percent": 40.0 + (i % 300) / 10,
+            "soil_temperature_c": 21.0 + (i % 40) / 10,
+            "air_temperature_c": 24.0 + (i % 50) / 10,
+            "air_humidity_percent": 35.0 + (i % 200) / 10,
+            "device": "feather-esp32-v2",
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--readings", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.readings
+
+    readings = make_readings(n)
+
+    t_json_enc, json_bodies = timed(lambda: [json.dumps(r).encode() for r in readings])
+    t_bin_enc, bin_bodies = timed(lambda: [telemetry.encode(r, 1) for r in readings])
+    t_stdlib_parse, _ = timed(lambda: [json.loads(b) for b in json_bodies])
+    t_json_parse, _ = timed(lambda: [codec.loads(b) for b in json_bodies])
+    t_bin_parse, _ = timed(lambda: [telemetry.decode(b) for b in bin_bodies])
+    t_json_dec, _ = timed(lambda: [SensorReading.from_dict(codec.loads(b)) for b in json_bodies])
+    t_bin_dec, _ = timed(lambda: [SensorReading.from_dict(r) for b in bin_bodies for r in telemetry.decode(b)])
+
+    json_bytes = sum(map(len, json_bodies)) / n
+    bin_bytes = sum(map(len, bin_bodies)) / n
+
+    print(f"{n} readings, codec backend: {codec.BACKEND}")
+    print(f"{'':<28}{'JSON':>10}{'binary':>10}")
+    print(f"{'bytes / reading':<28}{json_bytes:>10.0f}{bin_bytes:>10.0f}")
+    print(f"{'encode (µs / reading)':<28}{t_json_enc / n * 1e6:>10.2f}{t_bin_enc / n * 1e6:>10.2f}")
+    print(f"{'parse (µs / reading)':<28}{t_json_parse / n * 1e6:>10.2f}{t_bin_parse / n * 1e6:>10.2f}")
+    print(f"{'parse + validate (µs)':<28}{t_json_dec / n * 1e6:>10.2f}{t_bin_dec / n * 1e6:>10.2f}")
+    print(f"(stdlib json.loads without orjson: {t_stdlib_parse / n * 1e6:.2f} µs / reading)")
+
+    # 精度：定点数往返误差
+    worst = max(
+        abs(a[k] - b[k])
+        for a, body in zip(readings, bin_bodies)
+        for b in telemetry.decode(body)
+        for k, _ in telemetry.FIELDS
+    )
+    print(f"max fixed-point round-trip error: {worst:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# gunicorn 配置：pre-fork 多 worker 部署
+#
+#   cd app && gunicorn -c gunicorn.conf.py wsgi:application
+#
+# 平滑重载（部署新代码后）：kill -HUP <master pid>，master 拉起重新 import 应用的新 worker，
+# 旧 worker 处理完手上的请求再退出。开了 WATERING_PRELOAD=1 时 HUP 只会从 master 里已经 import 好的
+# 旧代码 fork，加载不到新代码，这时要换 master：kill -USR2 <旧 master>（起新 master + 新 worker），
+# 再 kill -WINCH <旧 master>（旧 worker 退出），确认没问题后 kill -QUIT <旧 master>。
+# ASGI 版本见 asgi.py（uvicorn worker）。
+import os
+import multiprocessing
+
+# 所有模块里的相对路径（sci_name.txt、pot_info.json 等）都以 app/ 为当前目录
+chdir = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.environ.get("WATERING_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("WATERING_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+# 默认 gthread：每个 worker 若干线程，慢请求（摄像头上传）不会卡住整个进程；
+# 设置 WATERING_WORKER_CLASS=uvicorn.workers.UvicornWorker 并把 app 换成 asgi:application 即为 ASGI 模式
+worker_class = os.environ.get("WATERING_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("WATERING_THREADS", 4))
+
+# 默认每个 worker 自己 import 应用，这样 HUP 能加载新代码；
+# WATERING_PRELOAD=1：master 里先 import 一次，worker 共享只读内存页、启动更快，但代码重载要用 USR2 + WINCH（见上）
+preload_app = os.environ.get("WATERING_PRELOAD") == "1"
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# 定期回收 worker，防止长期运行的内存增长
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
@@ -4,16 +4,33 @@ import datetime
 import base64
 from typing import Dict, Any, Tuple
 
-from openai import OpenAI
-
 # 如果在包里，用相对导入
 from .plant_recognition_module import identify_plant_plantnet, extract_scientific_name
+from .storage import append_json_log
+from .health_summary import append_health_assessment
+from .store_version import bump_version
+from .log_reader import get_reader
+from .anomaly import last_valid_reading
+from .records import HealthAssessment, WateringEvent
+from . import http_client
+from .assessment_schema import parse_single
 
 # ========= 配置 =========
 OPENAI_API_KEY = ""
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL")  # 指向本地假模型服务器做测试时设置
 PLANTNET_API_KEY = ""
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+_client = None
+
+
+def get_client():
+    """第一次真正调用 GPT 时才 import openai 并创建 client（import openai 很慢）。"""
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        # 超时 / 重试交给 SDK 自己（它有连接池），熔断和统计走 http_client.call
+        _client = OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, timeout=120.0, max_retries=2)
+    return _client
 
 
 # ========= 工具函数 =========
@@ -24,27 +41,6 @@ def encode_image_to_base64(image_path: str) -> str:
         return base64.b64encode(f.read()).decode("utf-8")
 
 
-def append_json_log(entry: dict, log_path: str):
-    """
-    追加一条记录到 JSON log 文件（数组形式存储）。
-    """
-    if os.path.exists(log_path):
-        try:
-            with open(log_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
-            data = []
-    else:
-        data = []
-
-    data.append(entry)
-
-    with open(log_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-
-    print(f"[LOG] Saved record to {log_path}")
-
-
 def check_plant_name(image_path: str = "image.jpg") -> str:
     """
     优先从 sci_name.txt 读取植物学名；如果没有，则调用 PlantNet 识别并写入文件。
@@ -62,33 +58,46 @@ def check_plant_name(image_path: str = "image.jpg") -> str:
         plant_name = extract_scientific_name(plantnet_result)
         with open(sci_file, "w", encoding="utf-8") as f:
             f.write(plant_name)
+        bump_version(sci_file)
 
     return plant_name
 
 
-def get_sensor_data(sensor_log_path: str = "sensor_log.json") -> Tuple[float, float, float, float, float]:
+def get_sensor_data(sensor_log_path: str = "sensor_log.json",
+                    device: str = None) -> Tuple[float, float, float, float, float]:
     """
-    从传感器日志中取最后一条数据：
+    取每个传感器字段最后一次“有效”的值（入库异常检测维护，见 anomaly.py），
+    DS18B20 的 85 / -127、读取失败的 None 等不会进到 prompt 里。
+    device 指定是哪块板子的读数（多盆时每盆一块，见 PotConfig.device），None 表示最近上报的那块。
     返回：
         soil_temperature_c, soil_moisture_percent, light_lux,
         air_temperature_c, air_humidity_percent
     """
-    with open(sensor_log_path, "r", encoding="utf-8") as f:
-        sensor_log = json.load(f)
-    last = sensor_log[-1]
-
-    soil_moisture_percent = last["soil_moisture_percent"]
-    light_lux = last["light_lux"]
-    soil_temperature_c = last["soil_temperature_c"]
-    air_temperature_c = last["air_temperature_c"]
-    air_humidity_percent = last["air_humidity_percent"]
+    last = last_valid_reading(sensor_log_path, device)
+    if not last:
+        # 还没有检测状态（老数据）：退回到日志最后一条（指定了 device 就是这块板子的最后一条）
+        if device is None:
+            last = get_reader(sensor_log_path).last()
+        else:
+            for rec in get_reader(sensor_log_path).range():
+                if rec.get("device") == device:
+                    last = rec
+    if not last:
+        raise ValueError(f"No sensor data in {sensor_log_path}" + (f" for device {device}" if device else ""))
+
+    soil_moisture_percent = last.get("soil_moisture_percent")
+    light_lux = last.get("light_lux")
+    soil_temperature_c = last.get("soil_temperature_c")
+    air_temperature_c = last.get("air_temperature_c")
+    air_humidity_percent = last.get("air_humidity_percent")
 
     return soil_temperature_c, soil_moisture_percent, light_lux, air_temperature_c, air_humidity_percent
 
 
 # ========= 合并后的 SYSTEM PROMPT =========
+# 任务说明和输出格式分开写：batch_assess 的多盆请求复用同一段任务说明，只换输出格式
 
-COMBINED_SYSTEM_PROMPT = """
+ASSESSMENT_TASKS_PROMPT = """
 You are an outdoor plant assistant with two tasks:
 
 (1) Plant Health Assessment
@@ -159,7 +168,9 @@ Your task:
 1. Decide whether the plant should be watered now.
 2. If watering is needed, estimate water_ml (milliliters).
 3. Suggest a target soil moisture range after watering.
+"""
 
+SINGLE_OUTPUT_FORMAT = """
 ========================
 OUTPUT FORMAT (VERY IMPORTANT)
 ========================
@@ -186,6 +197,8 @@ Rules:
 - DO NOT include any extra text outside the JSON.
 """
 
+COMBINED_SYSTEM_PROMPT = ASSESSMENT_TASKS_PROMPT + SINGLE_OUTPUT_FORMAT
+
 
 def build_combined_text_block(
     plant_name: str,
@@ -221,6 +234,59 @@ def build_combined_text_block(
     return text
 
 
+# ========= 写日志 =========
+
+def record_assessment(result: Dict[str, Any], image_path: str, pot: str = None, source: str = None,
+                      health_log_path: str = "plant_health_log.json",
+                      watering_log_path: str = "watering_log.json", **inputs) -> None:
+    """
+    把一盆的评估结果（已经过 assessment_schema 校验）连同输入写进两个 log：
+    - plant_health_log.json：健康评估 + 传感器数据
+    - watering_log.json：浇水决策 + 花盆 / 天气 / 传感器上下文。决策只是计划：要浇的量记在 planned_ml，
+      water_ml 记 0，实际出水由设备执行水泵命令后回报（source "pump"），这样一次浇水不会被统计两遍
+    inputs 是 build_combined_text_block 的那些字段；pot 为 None 时不写 pot 字段（单盆老格式），
+    source 写进浇水记录（比如本地模型给出的结果记 "local_model"）。
+    """
+    timestamp = datetime.datetime.now().isoformat()
+    sensors = {key: inputs.get(key) for key in (
+        "soil_temperature_c", "soil_moisture_percent", "light_lux",
+        "air_temperature_c", "air_humidity_percent",
+    )}
+
+    health_entry = {
+        "timestamp": timestamp,
+        "image_path": image_path,
+        "plant_name": inputs.get("plant_name"),
+        **sensors,
+        **result["health"],
+    }
+
+    irrigation_entry = {
+        "timestamp": timestamp,
+        "plant_name": inputs.get("plant_name"),
+        "pot_diameter": inputs.get("pot_diameter"),
+        "pot_height": inputs.get("pot_height"),
+        "will_rain_next_24h": inputs.get("will_rain_next_24h"),
+        "rain_mm_next_24h": inputs.get("rain_mm_next_24h"),
+        "max_temp_next_24h_c": inputs.get("max_temp_next_24h_c"),
+        **sensors,
+        **result["irrigation"],
+    }
+    irrigation_entry["planned_ml"] = irrigation_entry["water_ml"]
+    irrigation_entry["water_ml"] = 0
+    if pot is not None:
+        health_entry["pot"] = irrigation_entry["pot"] = pot
+    if source is not None:
+        irrigation_entry["source"] = source
+
+    # 入库前按记录类型校验（字段、类型、health_level 范围、reasons 标签）
+    health_entry = HealthAssessment.from_dict(health_entry).to_dict()
+    irrigation_entry = WateringEvent.from_dict(irrigation_entry).to_dict()
+
+    append_health_assessment(health_entry, health_log_path)
+    append_json_log(irrigation_entry, watering_log_path)
+
+
 # ========= 主函数：一次 GPT 调用，返回两个结果 =========
 
 def assess_health_and_irrigation(
@@ -295,90 +361,34 @@ def assess_health_and_irrigation(
     ]
 
     # 6. 调用 GPT
-    response = client.chat.completions.create(
+    response = http_client.call(
+        "openai",
+        get_client().chat.completions.create,
         model=model,
         messages=messages,
         temperature=0.2,
+        response_format={"type": "json_object"},
     )
 
-    content = response.choices[0].message.content or ""
-    content = content.strip()
-
-    # 7. 处理可能出现的 ```json 包裹
-    if content.startswith("```"):
-        lines = content.splitlines()
-        cleaned_lines = []
-        for line in lines:
-            if line.strip().startswith("```"):
-                continue
-            cleaned_lines.append(line)
-        content = "\n".join(cleaned_lines).strip()
-
-    # 8. 只取第一个 { 和最后一个 } 之间
-    start = content.find("{")
-    end = content.rfind("}")
-    if start != -1 and end != -1 and start < end:
-        content = content[start : end + 1].strip()
-
-    try:
-        result = json.loads(content)
-    except json.JSONDecodeError:
-        raise ValueError(f"Model output is not valid JSON even after cleaning: {content}")
-
-    # 9. 校验结构
-    if "health" not in result or "irrigation" not in result:
-        raise ValueError(f"Missing 'health' or 'irrigation' key: {result}")
-
-    health = result["health"]
-    irrigation = result["irrigation"]
-
-    for key in ["health_level", "reasons", "suggestions"]:
-        if key not in health:
-            raise ValueError(f"Missing key in health: {key}")
-
-    for key in [
-        "should_water",
-        "water_ml",
-        "target_soil_moisture_percent_min",
-        "target_soil_moisture_percent_max",
-        "note",
-    ]:
-        if key not in irrigation:
-            raise ValueError(f"Missing key in irrigation: {key}")
-
-    # 10. 分别写入两个 log
-    timestamp = datetime.datetime.now().isoformat()
+    # 7. 严格解析：必须是约定结构的 JSON，否则抛 AssessmentError（ValueError 的子类）
+    result = parse_single(response.choices[0].message.content)
 
-    health_entry = {
-        "timestamp": timestamp,
-        "image_path": image_path,
-        "plant_name": plant_name,
-        "soil_temperature_c": soil_temperature_c,
-        "soil_moisture_percent": soil_moisture_percent,
-        "light_lux": light_lux,
-        "air_temperature_c": air_temperature_c,
-        "air_humidity_percent": air_humidity_percent,
-        **health,
-    }
-
-    irrigation_entry = {
-        "timestamp": timestamp,
-        "plant_name": plant_name,
-        "pot_diameter": pot_diameter,
-        "pot_height": pot_height,
-        "soil_moisture_percent": soil_moisture_percent,
-        "will_rain_next_24h": will_rain_next_24h,
-        "rain_mm_next_24h": rain_mm_next_24h,
-        "max_temp_next_24h_c": max_temp_next_24h_c,
-        "light_lux": light_lux,
-        "soil_temperature_c": soil_temperature_c,
-        "air_temperature_c": air_temperature_c,
-        "air_humidity_percent": air_humidity_percent,
-        **irrigation,
-    }
-
-    append_json_log(health_entry, "plant_health_log.json")
-    append_json_log(irrigation_entry, "watering_log.json")
+    # 8. 分别写入两个 log
+    record_assessment(
+        result,
+        image_path=image_path,
+        plant_name=plant_name,
+        pot_diameter=pot_diameter,
+        pot_height=pot_height,
+        soil_moisture_percent=soil_moisture_percent,
+        will_rain_next_24h=will_rain_next_24h,
+        rain_mm_next_24h=rain_mm_next_24h,
+        max_temp_next_24h_c=max_temp_next_24h_c,
+        light_lux=light_lux,
+        soil_temperature_c=soil_temperature_c,
+        air_temperature_c=air_temperature_c,
+        air_humidity_percent=air_humidity_percent,
+    )
 
     return result
 
@@ -0,0 +1,233 @@
+"""
+传感器数据入库前的流式异常检测。
+
+每个设备、每个字段维护一个固定大小的状态（指数滑动均值 / 方差、上一个值、重复次数……），
+每来一条读数只做 O(1) 的更新，检查：
+
+- missing      ：传感器读取失败（固件发 None）；设备从没报过有效值的字段（没接这个传感器）不算
+- error_value  ：传感器的错误码，例如 DS18B20 的 85 °C（上电未转换）和 -127 °C（断线）
+- out_of_range ：超出物理范围
+- rate         ：变化速率超过物理上可能的上限
+- zscore       ：和滑动均值相差超过 Z_THRESHOLD 个标准差
+- stuck        ：同一个值连续出现太多次（ADC 卡死 / 饱和）
+
+前三种是“故障”，该字段这次的值不可信，不更新“最后有效值”；后三种是“警告”，值照常使用。
+检测结果写进记录的 anomalies 字段（["soil_temperature_c:error_value", ...]），
+设备状态和每个字段的最后有效值保存在 sensor_state.json，消费者（AI 评估、页面）直接读它：
+
+    values = last_valid_reading(SENSOR_LOG_FILE)   # {"soil_moisture_percent": 41.2, ...}
+"""
+import os
+import math
+from datetime import datetime
+
+from .storage import append_json_logs, file_lock, load_json, load_json_for_update, write_json_atomic
+
+SENSOR_STATE_FILE = "sensor_state.json"
+UNKNOWN_DEVICE = "unknown"
+
+ALPHA = 0.05            # 滑动均值 / 方差的平滑系数（约 20 个样本的记忆）
+WARMUP = 10             # 样本数不够时不算 z-score
+Z_THRESHOLD = 4.0
+FAULTY_AFTER = 3        # 某字段连续故障这么多次，设备判为 faulty
+STALE_AFTER_S = 15 * 60  # 这么久没有上报，设备判为 stale
+SATURATED_STUCK = 5     # 停在量程端点（比如湿度 0 / 100，固件做了截断）时更快判为卡死
+
+FAULTS = ("missing", "error_value", "out_of_range")
+WARNINGS = ("rate", "zscore", "stuck")
+
+# 字段 -> 检测参数
+#   range：物理范围（闭区间）
+#   error_values：传感器错误码
+#   max_rate：每分钟最大变化量
+#   min_std：z-score 的标准差下限，避免很平稳的信号因为一点噪声就报警
+#   stuck：连续相同值多少次算卡死（None 表示不检查，比如夜里光照一直是 0）
+SENSOR_LIMITS = {
+    "soil_temperature_c": {
+        "range": (-55.0, 125.0), "error_values": (85.0, -127.0),
+        "max_rate": 2.0, "min_std": 0.3, "stuck": 120,
+    },
+    "soil_moisture_percent": {
+        # 浇水时湿度会在一分钟内大幅上升，速率上限放宽
+        "range": (0.0, 100.0), "error_values": (),
+        "max_rate": 60.0, "min_std": 1.0, "stuck": 120,
+    },
+    "light_lux": {
+        "range": (0.0, 120000.0), "error_values": (),
+        "max_rate": None, "min_std": 50.0, "stuck": None,
+    },
+    "air_temperature_c": {
+        "range": (-40.0, 80.0), "error_values": (),
+        "max_rate": 5.0, "min_std": 0.3, "stuck": 240,
+    },
+    "air_humidity_percent": {
+        "range": (0.0, 100.0), "error_values": (),
+        "max_rate": 20.0, "min_std": 1.0, "stuck": 240,
+    },
+}
+
+
+def state_path_for(log_path):
+    return os.path.join(os.path.dirname(os.path.abspath(log_path)), SENSOR_STATE_FILE)
+
+
+def _seconds(ts):
+    try:
+        return datetime.fromisoformat(ts).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+# ========== 单个字段 ==========
+
+def check_value(field, value, channel, t):
+    """
+    检查一个值并更新该字段的状态 channel（dict，原地修改），返回 flags 列表。
+    channel 只包含固定数量的数字，每次更新 O(1)。
+    """
+    limits = SENSOR_LIMITS[field]
+    flags = []
+
+    if value is None:
+        flags.append("missing")
+    elif value in limits["error_values"]:
+        flags.append("error_value")
+    elif not limits["range"][0] <= value <= limits["range"][1]:
+        flags.append("out_of_range")
+
+    if flags:
+        channel["consecutive_faults"] = channel.get("consecutive_faults", 0) + 1
+        return flags
+    channel["consecutive_faults"] = 0
+
+    # 变化速率：和上一个有效值比
+    last, last_t = channel.get("last_valid"), channel.get("last_valid_t")
+    if limits["max_rate"] is not None and last is not None and last_t is not None and t is not None and t > last_t:
+        per_minute = abs(value - last) / (t - last_t) * 60
+        if per_minute > limits["max_rate"]:
+            flags.append("rate")
+
+    # z-score：先用旧的均值 / 方差判断，再更新（指数加权，O(1)）
+    n = channel.get("n", 0)
+    mean, var = channel.get("mean", value), channel.get("var", 0.0)
+    if n >= WARMUP:
+        std = max(math.sqrt(var), limits["min_std"])
+        if abs(value - mean) / std > Z_THRESHOLD:
+            flags.append("zscore")
+    diff = value - mean
+    mean += ALPHA * diff
+    var = (1 - ALPHA) * (var + ALPHA * diff * diff)
+    channel["n"], channel["mean"], channel["var"] = n + 1, mean, var
+
+    # 卡死：连续相同值
+    channel["repeat"] = channel.get("repeat", 0) + 1 if value == last else 1
+    threshold = limits["stuck"]
+    if threshold is not None and value in limits["range"]:
+        threshold = min(threshold, SATURATED_STUCK)
+    if threshold is not None and channel["repeat"] >= threshold:
+        flags.append("stuck")
+
+    channel["last_valid"], channel["last_valid_t"] = value, t
+    return flags
+
+
+# ========== 一条读数 ==========
+
+def check_reading(record, device_state):
+    """
+    检查一条读数（dict），更新设备状态 device_state（原地修改），
+    返回 anomalies 列表，例如 ["soil_temperature_c:error_value"]。
+    """
+    ts = record.get("timestamp")
+    t = _seconds(ts)
+    fields = device_state.setdefault("fields", {})
+    latest = device_state.setdefault("last_valid", {})
+
+    anomalies, faulty = [], False
+    for field in SENSOR_LIMITS:
+        value = record.get(field)
+        channel = fields.get(field)
+        # 这块板子从没报过这个字段（比如没接光照传感器）：不算缺失，也不影响设备状态
+        if value is None and not (channel and (channel.get("seen") or channel.get("n"))):
+            continue
+        channel = fields.setdefault(field, {})
+        channel["seen"] = True
+        flags = check_value(field, value, channel, t)
+        channel["flags"] = flags
+        anomalies.extend(f"{field}:{flag}" for flag in flags)
+        if not any(f in FAULTS for f in flags):
+            latest[field] = record[field]
+            latest[field + "_at"] = ts
+        elif channel["consecutive_faults"] >= FAULTY_AFTER:
+            faulty = True
+
+    device_state["last_seen"] = ts
+    device_state["samples"] = device_state.get("samples", 0) + 1
+    device_state["status"] = "faulty" if faulty else ("degraded" if anomalies else "ok")
+    device_state["anomalies"] = anomalies
+    return anomalies
+
+
+def ingest_readings(records, log_path):
+    """
+    批量入库：逐条检测 -> 把 anomalies 写进记录 -> 一次追加到日志 -> 保存一次设备状态。
+    在状态文件的锁里完成，多个 worker / MQTT bridge 同时收到同一设备的数据时状态不会错乱。
+    返回 (日志总条数, [每条的 anomalies])。
+    """
+    path = state_path_for(log_path)
+    with file_lock(path):
+        state = load_json_for_update(path, default={})
+        out, all_anomalies = [], []
+        for record in records:
+            device = str(record.get("device") or record.get("remote_addr") or UNKNOWN_DEVICE)
+            anomalies = check_reading(record, state.setdefault(device, {}))
+            # anomalies 只能由服务器写，客户端带上来的一律覆盖
+            record = {k: v for k, v in record.items() if k != "anomalies"}
+            if anomalies:
+                record["anomalies"] = anomalies
+                print(f"[anomaly] {device}: {anomalies}")
+            out.append(record)
+            all_anomalies.append(anomalies)
+        total = append_json_logs(out, log_path)
+        write_json_atomic(path, state)
+    return total, all_anomalies
+
+
+def ingest_reading(record, log_path):
+    """单条入库，返回 (日志总条数, anomalies)。"""
+    total, (anomalies,) = ingest_readings([record], log_path)
+    print(f"[LOG] Saved record to {log_path}")
+    return total, anomalies
+
+
+# ========== 读取 ==========
+
+def device_health(log_path, now=None):
+    """所有设备的健康状态：status（ok / degraded / faulty / stale）、最近的 anomalies、最后有效值。"""
+    now = now or datetime.now()
+    result = {}
+    for device, st in load_json(state_path_for(log_path), default={}).items():
+        last_seen = _seconds(st.get("last_seen"))
+        stale = last_seen is None or now.timestamp() - last_seen > STALE_AFTER_S
+        result[device] = {
+            "status": "stale" if stale else st.get("status"),
+            "last_seen": st.get("last_seen"),
+            "samples": st.get("samples", 0),
+            "anomalies": st.get("anomalies", []),
+            "last_valid": st.get("last_valid", {}),
+        }
+    return result
+
+
+def last_valid_reading(log_path, device=None):
+    """
+    每个字段最后一次有效的值（{字段: 值, 字段_at: 时间}）。
+    device 为 None 时取最近上报的设备；没有任何状态返回 None。
+    """
+    state = load_json(state_path_for(log_path), default={})
+    if device is None:
+        if not state:
+            return None
+        device = max(state, key=lambda d: state[d].get("last_seen") or "")
+    st = state.get(device)
+    return dict(st.get("last_valid", {})) if st else None
@@ -0,0 +1,287 @@
+"""
+历史日志冷归档：超过 N 天的记录从热文件（sensor_log.json 等）移到按天压缩的归档里，
+
+    archive/<日志名>/<YYYY-MM-DD>.json.gz    （装了 zstandard 时可选 .json.zst）
+
+热文件只保留最近 N 天，读最近数据的开销不会随历史增长。
+query_range() 按时间范围同时读取归档和热文件，调用方不需要关心数据在哪里。
+
+命令行手动归档：
+
+    python -m modules.archive --days 30 sensor_log.json watering_log.json plant_health_log.json
+"""
+import os
+import gzip
+import argparse
+from datetime import datetime, timedelta, date
+
+from . import codec
+from .storage import file_lock, load_json_for_update, write_json_atomic
+from .log_reader import get_reader
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_RETENTION_DAYS = 30
+
+_EXT_GZIP = ".json.gz"
+_EXT_ZSTD = ".json.zst"
+
+
+# ========== 路径 & 日期 ==========
+
+def archive_dir_for(log_path):
+    """sensor_log.json -> <同目录>/archive/sensor_log"""
+    directory, name = os.path.split(os.path.abspath(log_path))
+    stem = name[:-5] if name.endswith(".json") else name
+    return os.path.join(directory, "archive", stem)
+
+
+def record_day(rec):
+    """记录所属日期（YYYY-MM-DD），优先用 date 字段，否则从 timestamp 推出；无法确定返回 None。"""
+    day = rec.get("date")
+    if not day:
+        ts = rec.get("timestamp")
+        day = ts[:10] if isinstance(ts, str) else None
+    try:
+        return date.fromisoformat(day).isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def record_key(rec):
+    """
+    按内容去重用的 key：键排序后的编码。整数值的 float 当成 int（80.0 和 80 是同一个读数），
+    值为 None 的字段当成没有（CSV 的空单元格分不出这两种），CSV 导入、NDJSON 导入、服务器写入的记录才能互相去重。
+    """
+    if isinstance(rec, dict):
+        rec = {k: int(v) if type(v) is float and v.is_integer() else v for k, v in rec.items() if v is not None}
+    return codec.dumps_sorted(rec)
+
+
+def archived_days(log_path):
+    """[(day, 文件路径), ...]，按日期排序。"""
+    directory = archive_dir_for(log_path)
+    if not os.path.isdir(directory):
+        return []
+    days = []
+    for name in os.listdir(directory):
+        for ext in (_EXT_GZIP, _EXT_ZSTD):
+            if name.endswith(ext):
+                days.append((name[: -len(ext)], os.path.join(directory, name)))
+    days.sort()
+    return days
+
+
+# ========== 单个归档文件的编码 ==========
+
+def _to_columnar(records):
+    """
+    按列存储。null 原样留在列里（传感器读数为 null 表示读取失败，不能丢）；
+    某条记录没有这个字段时记进 missing：{字段: [行号, ...]}，只有字段不齐的列才有。
+    """
+    fields = []
+    seen = set()
+    for rec in records:
+        for key in rec:
+            if key not in seen:
+                seen.add(key)
+                fields.append(key)
+    missing = {}
+    for key in fields:
+        rows = [i for i, rec in enumerate(records) if key not in rec]
+        if rows:
+            missing[key] = rows
+    return {
+        "format": "columnar",
+        "count": len(records),
+        "fields": fields,
+        "columns": [[rec.get(key) for rec in records] for key in fields],
+        "missing": missing,
+    }
+
+
+def _from_columnar(obj):
+    fields, columns = obj["fields"], obj["columns"]
+    n = obj.get("count", len(columns[0]) if columns else 0)
+    if "missing" not in obj:
+        # 旧格式没有记录缺失字段，缺失和 null 分不开，还原时都不写出来
+        return [{k: col[i] for k, col in zip(fields, columns) if col[i] is not None} for i in range(n)]
+    records = [{} for _ in range(n)]
+    for key, col in zip(fields, columns):
+        skip = set(obj["missing"].get(key, ()))
+        for i, value in enumerate(col):
+            if i not in skip:
+                records[i][key] = value
+    return records
+
+
+def read_archive_file(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    if path.endswith(_EXT_ZSTD):
+        if zstandard is None:
+            raise RuntimeError(f"读取 {path} 需要安装 zstandard")
+        raw = zstandard.ZstdDecompressor().decompress(raw)
+    else:
+        raw = gzip.decompress(raw)
+    obj = codec.loads(raw)
+    if isinstance(obj, dict) and obj.get("format") == "columnar":
+        return _from_columnar(obj)
+    return obj
+
+
+def _write_archive_file(path, records, compression="gzip", columnar=False):
+    payload = _to_columnar(records) if columnar else records
+    raw = codec.dumps(payload)
+    if compression == "zstd":
+        raw = zstandard.ZstdCompressor(level=10).compress(raw)
+    else:
+        raw = gzip.compress(raw, compresslevel=6)
+    tmp = path + f".{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ========== 归档（compaction） ==========
+
+def merge_archive_day(log_path, day, records, old_path=None, compression="gzip", columnar=False):
+    """
+    把 records 并进 day 那天的归档文件（old_path 是已有的归档，没有则为 None）：
+    按内容去重、按 timestamp 排序后整体重写，返回新增的条数。
+    调用方需要持有 file_lock(log_path)（compact_log、bulk_import 都是）。
+    """
+    ext = _EXT_ZSTD if compression == "zstd" else _EXT_GZIP
+    directory = archive_dir_for(log_path)
+    os.makedirs(directory, exist_ok=True)
+
+    merged = read_archive_file(old_path) if old_path else []
+    seen = {record_key(r) for r in merged}
+    before = len(merged)
+    for rec in records:
+        key = record_key(rec)
+        if key not in seen:
+            seen.add(key)
+            merged.append(rec)
+    merged.sort(key=lambda r: r.get("timestamp", ""))
+
+    new_path = os.path.join(directory, day + ext)
+    _write_archive_file(new_path, merged, compression=compression, columnar=columnar)
+    if old_path and old_path != new_path:
+        os.remove(old_path)
+    return len(merged) - before
+
+
+def compact_log(log_path, retain_days=DEFAULT_RETENTION_DAYS, now=None,
+                compression="gzip", columnar=False):
+    """
+    把 log_path 里早于 (今天 - retain_days) 的记录移到按天的压缩归档里，返回移动的条数。
+
+    顺序：先写归档，再重写热文件。中途崩溃只会造成“归档里有、热文件里也有”，
+    下次归档时按内容去重，不会丢数据也不会重复。
+    """
+    if compression == "zstd" and zstandard is None:
+        print("[archive] 未安装 zstandard，改用 gzip")
+        compression = "gzip"
+
+    now = now or datetime.now()
+    cutoff_day = (now.date() - timedelta(days=retain_days)).isoformat()
+
+    with file_lock(log_path):
+        data = load_json_for_update(log_path, default=[])
+        if not isinstance(data, list):
+            return 0
+
+        keep, by_day = [], {}
+        for rec in data:
+            day = record_day(rec) if isinstance(rec, dict) else None
+            if day is not None and day < cutoff_day:
+                by_day.setdefault(day, []).append(rec)
+            else:
+                keep.append(rec)
+
+        if not by_day:
+            return 0
+
+        existing = dict(archived_days(log_path))
+        for day, records in by_day.items():
+            merge_archive_day(log_path, day, records, existing.get(day),
+                              compression=compression, columnar=columnar)
+
+        write_json_atomic(log_path, keep)
+
+    moved = sum(len(v) for v in by_day.values())
+    print(f"[archive] {log_path}: 归档 {moved} 条（{len(by_day)} 天），热文件剩余 {len(keep)} 条")
+    return moved
+
+
+def compact_all(log_paths, retain_days=DEFAULT_RETENTION_DAYS, **kwargs):
+    total = 0
+    for path in log_paths:
+        try:
+            total += compact_log(path, retain_days=retain_days, **kwargs)
+        except Exception as e:
+            print("[archive] 归档失败:", path, "error:", e)
+    return total
+
+
+# ========== 范围查询（归档 + 热文件） ==========
+
+def in_range(rec, start, end):
+    ts = rec.get("timestamp")
+    if not ts:
+        return False
+    try:
+        dt = datetime.fromisoformat(ts)
+    except Exception:
+        return False
+    if start is not None and dt < start:
+        return False
+    if end is not None and dt >= end:
+        return False
+    return True
+
+
+def query_range(log_path, start=None, end=None):
+    """
+    返回 [start, end) 时间范围内的记录（按 timestamp 排序），透明地合并归档和热文件。
+    start / end 为 datetime，None 表示不限。只会解压落在范围内的那几天的归档。
+    """
+    start_day = start.date().isoformat() if start else None
+    end_day = end.date().isoformat() if end else None
+
+    result = []
+    for day, path in archived_days(log_path):
+        if start_day and day < start_day:
+            continue
+        if end_day and day > end_day:
+            break
+        try:
+            records = read_archive_file(path)
+        except Exception as e:
+            print("[archive] 读取归档失败:", path, "error:", e)
+            continue
+        result.extend(r for r in records if in_range(r, start, end))
+
+    # 热文件走 mmap 索引，只解码范围内的记录
+    result.extend(r for r in get_reader(log_path).range(start, end) if isinstance(r, dict))
+
+    result.sort(key=lambda x: x.get("timestamp", ""))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把超过 N 天的日志记录移到压缩归档")
+    parser.add_argument("logs", nargs="+", help="要归档的 JSON 日志文件")
+    parser.add_argument("--days", type=int, default=DEFAULT_RETENTION_DAYS, help="热文件保留天数")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default="gzip")
+    parser.add_argument("--columnar", action="store_true", help="归档按列存储（同类记录压缩率更高）")
+    args = parser.parse_args()
+
+    compact_all(args.logs, retain_days=args.days,
+                compression=args.compression, columnar=args.columnar)
@@ -0,0 +1,143 @@
+"""
+大模型评估结果的严格解析：回复必须是 JSON，结构和 ai_test 里 OUTPUT FORMAT 约定的完全一致，
+多一个 key、少一个 key、类型不对都抛 AssessmentError（不再用 find("{") / rfind("}") 去“抠” JSON）。
+
+单盆回复：
+    {"health": {...}, "irrigation": {...}}
+批量回复（batch_assess）：
+    {"pots": {"<pot_id>": {"health": {...}, "irrigation": {...}}, ...}}
+
+    result = parse_single(content)                       # 失败抛 AssessmentError
+    results, errors = parse_batch(content, ["a", "b"])   # 每盆单独校验，一盆坏了不影响其他盆
+"""
+import json
+import math
+
+from .records import health_tags, text, text_list
+
+HEALTH_KEYS = {"health_level", "reasons", "suggestions"}
+IRRIGATION_KEYS = {
+    "should_water",
+    "water_ml",
+    "target_soil_moisture_percent_min",
+    "target_soil_moisture_percent_max",
+    "note",
+}
+
+
+class AssessmentError(ValueError):
+    """模型回复不符合约定的结构。"""
+
+
+def _exact_keys(name, obj, keys):
+    if not isinstance(obj, dict):
+        raise AssessmentError(f"{name} must be a JSON object")
+    missing = keys - obj.keys()
+    extra = obj.keys() - keys
+    if missing or extra:
+        raise AssessmentError(f"{name}: missing {sorted(missing)}, unexpected {sorted(extra)}")
+
+
+def _integer(name, value, low, high):
+    # NaN / Infinity 是合法的 Python JSON，int() 会抛 ValueError / OverflowError，先挡掉
+    if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+            or value != int(value)):
+        raise AssessmentError(f"{name} must be an integer")
+    if not low <= value <= high:
+        raise AssessmentError(f"{name} must be in {low}-{high}")
+    return int(value)
+
+
+def validate(result):
+    """校验一盆的 {"health", "irrigation"}，返回规范化后的副本。"""
+    _exact_keys("result", result, {"health", "irrigation"})
+    health, irrigation = result["health"], result["irrigation"]
+    _exact_keys("health", health, HEALTH_KEYS)
+    _exact_keys("irrigation", irrigation, IRRIGATION_KEYS)
+
+    try:
+        reasons = health_tags("reasons", health["reasons"])
+        suggestions = text_list("suggestions", health["suggestions"], max_items=5)
+        note = text("note", irrigation["note"])
+    except ValueError as e:
+        raise AssessmentError(str(e)) from None
+    if not reasons:
+        raise AssessmentError("reasons must have 1-4 tags")
+    if not suggestions:
+        raise AssessmentError("suggestions must not be empty")
+    if note is None:
+        raise AssessmentError("note must be a string")
+
+    # records.health_level 会把 "4" 转成 4（读旧日志用）；模型回复这里要求必须是 JSON 整数
+    level = _integer("health_level", health["health_level"], 1, 5)
+    should_water = irrigation["should_water"]
+    if not isinstance(should_water, bool):
+        raise AssessmentError("should_water must be true or false")
+    water_ml = _integer("water_ml", irrigation["water_ml"], 0, 100000)
+    if not should_water and water_ml:
+        raise AssessmentError("water_ml must be 0 when should_water is false")
+    low = _integer("target_soil_moisture_percent_min", irrigation["target_soil_moisture_percent_min"], 0, 100)
+    high = _integer("target_soil_moisture_percent_max", irrigation["target_soil_moisture_percent_max"], 0, 100)
+    if low > high:
+        raise AssessmentError("target_soil_moisture_percent_min > target_soil_moisture_percent_max")
+
+    return {
+        "health": {"health_level": level, "reasons": reasons, "suggestions": suggestions},
+        "irrigation": {
+            "should_water": should_water,
+            "water_ml": water_ml,
+            "target_soil_moisture_percent_min": low,
+            "target_soil_moisture_percent_max": high,
+            "note": note,
+        },
+    }
+
+
+def loads_reply(content):
+    """
+    回复文本 -> JSON 对象。只容忍整段被 ```json ... ``` 包住这一种情况，
+    JSON 前后夹杂别的文字直接算失败。
+    """
+    content = (content or "").strip()
+    if content.startswith("```") and content.endswith("```"):
+        content = content[3:-3]
+        if content.startswith("json"):
+            content = content[4:]
+        content = content.strip()
+    try:
+        obj = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise AssessmentError(f"reply is not valid JSON: {e}") from None
+    if not isinstance(obj, dict):
+        raise AssessmentError("reply must be a JSON object")
+    return obj
+
+
+def parse_single(content):
+    return validate(loads_reply(content))
+
+
+def parse_batch(content, pot_ids):
+    """
+    -> (results, errors)：results = {pot_id: 校验后的结果}，errors = {pot_id: 错误信息}。
+    整段不是 JSON / 没有 "pots" 时所有盆都算失败；回复里多出来的 pot_id 忽略。
+    """
+    try:
+        obj = loads_reply(content)
+        _exact_keys("reply", obj, {"pots"})
+        pots = obj["pots"]
+        if not isinstance(pots, dict):
+            raise AssessmentError("pots must be a JSON object")
+    except AssessmentError as e:
+        return {}, {pot: str(e) for pot in pot_ids}
+
+    results, errors = {}, {}
+    for pot in pot_ids:
+        if pot not in pots:
+            errors[pot] = "missing from reply"
+            continue
+        try:
+            results[pot] = validate(pots[pot])
+        except AssessmentError as e:
+            errors[pot] = str(e)
+    return results, errors
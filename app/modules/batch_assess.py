@@ -0,0 +1,215 @@
+"""
+多盆批量评估：把几盆的输入（各自的文本 + 照片）打包进一次 chat 请求，
+回复按 pot_id 分开、每盆单独做严格校验（assessment_schema）。
+
+- 一盆的回复坏了（缺字段、标签不在列表里、漏掉这一盆……）只影响这一盆：
+  它会单独用单盆 prompt 重试（retries 次），其他盆照常入库；
+- 整个请求失败（网络、熔断、回复不是 JSON）时，这一批的每盆都单独重试；
+- 重试后仍失败的盆记在 errors 里返回，不抛异常，scheduler 不会因此退出。
+
+    inputs = [build_pot_input("balcony", "images/a.jpg", 18, 20, forecast), ...]
+    out = assess_batch(inputs, batch_size=4)
+    out["results"]["balcony"]["irrigation"]["water_ml"]; out["errors"]; out["calls"]
+
+测试时 complete 可以换成任意 (messages, model) -> 回复文本 的函数，
+或者设 OPENAI_BASE_URL 指向本地假模型服务器（见 benchmarks/bench_assess.py）。
+"""
+from typing import Any, Callable, Dict, List
+
+from . import http_client
+from .ai_test import (
+    ASSESSMENT_TASKS_PROMPT,
+    COMBINED_SYSTEM_PROMPT,
+    build_combined_text_block,
+    check_plant_name,
+    encode_image_to_base64,
+    get_client,
+    get_sensor_data,
+    record_assessment,
+)
+from .assessment_schema import parse_batch, parse_single
+from .pot_config import DEFAULT_POT, POT_INFO_FILE, get_registry
+
+DEFAULT_BATCH_SIZE = 4
+
+BATCH_OUTPUT_FORMAT = """
+========================
+BATCH INPUT
+========================
+
+The user message contains SEVERAL plants. Each plant starts with a line "pot_id: <id>",
+followed by its data fields and then its photo. Assess every plant independently,
+using only its own data and photo.
+
+========================
+OUTPUT FORMAT (VERY IMPORTANT)
+========================
+
+Respond ONLY with ONE JSON object with EXACTLY ONE top-level key "pots".
+"pots" maps every pot_id from the input to that plant's result:
+
+{
+  "pots": {
+    "<pot_id>": {
+      "health": {
+        "health_level": integer 1–5,
+        "reasons": array of 1–4 short tags (from the fixed list),
+        "suggestions": array of 2–5 short English sentences
+      },
+      "irrigation": {
+        "should_water": true or false,
+        "water_ml": integer (0 if no watering is needed),
+        "target_soil_moisture_percent_min": integer,
+        "target_soil_moisture_percent_max": integer,
+        "note": a very short English explanation (max 25 words)
+      }
+    }
+  }
+}
+
+Rules:
+- Include every pot_id exactly once.
+- DO NOT add any extra keys at any level.
+- DO NOT include any extra text outside the JSON.
+"""
+
+BATCH_SYSTEM_PROMPT = ASSESSMENT_TASKS_PROMPT + BATCH_OUTPUT_FORMAT
+
+TEXT_FIELDS = (
+    "plant_name", "pot_diameter", "pot_height", "soil_moisture_percent",
+    "will_rain_next_24h", "rain_mm_next_24h", "max_temp_next_24h_c",
+    "light_lux", "soil_temperature_c", "air_temperature_c", "air_humidity_percent",
+)
+
+
+# ========== 输入 ==========
+
+def build_pot_input(pot: str, image_path: str, pot_diameter, pot_height, forecast: Dict[str, Any] = None,
+                    sensor_log_path: str = "sensor_log.json", pot_info_path: str = POT_INFO_FILE) -> Dict[str, Any]:
+    """
+    一盆的输入：{"pot", "image_path", + TEXT_FIELDS}。
+    forecast 是 forecast_store.get_features 的结果（可以为 None / {}）。
+    传感器读数取这盆配置的 device（PotConfig.device）的，植物名优先用这盆配置的 plant_name；
+    没配 device 的盆用最近上报的那块板子、植物名用 sci_name.txt / PlantNet（单盆时的老行为）。
+    """
+    pot = pot or DEFAULT_POT
+    forecast = forecast or {}
+    config = get_registry(pot_info_path).get(pot)
+    device = config.get("device") if config is not None else None
+    plant_name = config.get("plant_name") if config is not None else None
+    soil_t, moisture, lux, air_t, humidity = get_sensor_data(sensor_log_path=sensor_log_path, device=device)
+    return {
+        "pot": pot,
+        "image_path": image_path,
+        "plant_name": plant_name or check_plant_name(image_path=image_path),
+        "pot_diameter": pot_diameter,
+        "pot_height": pot_height,
+        "soil_moisture_percent": moisture,
+        "will_rain_next_24h": forecast.get("will_rain_next_24h"),
+        "rain_mm_next_24h": forecast.get("rain_mm_next_24h"),
+        "max_temp_next_24h_c": forecast.get("max_temp_next_24h_c"),
+        "light_lux": lux,
+        "soil_temperature_c": soil_t,
+        "air_temperature_c": air_t,
+        "air_humidity_percent": humidity,
+    }
+
+
+def _pot_content(inp, with_id):
+    text = build_combined_text_block(**{key: inp.get(key) for key in TEXT_FIELDS})
+    if with_id:
+        text = f"pot_id: {inp['pot']}\n" + text
+    image_url = "data:image/jpeg;base64," + encode_image_to_base64(inp["image_path"])
+    return [
+        {"type": "text", "text": text},
+        {"type": "image_url", "image_url": {"url": image_url}},
+    ]
+
+
+def batch_messages(inputs: List[Dict[str, Any]]):
+    content = []
+    for inp in inputs:
+        content.extend(_pot_content(inp, with_id=True))
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": content},
+    ]
+
+
+def single_messages(inp: Dict[str, Any]):
+    return [
+        {"role": "system", "content": COMBINED_SYSTEM_PROMPT},
+        {"role": "user", "content": _pot_content(inp, with_id=False)},
+    ]
+
+
+# ========== 调用 ==========
+
+def complete_openai(messages, model: str) -> str:
+    """一次 chat 请求，返回回复文本（熔断 / 统计走 http_client 的 "openai" provider）。"""
+    response = http_client.call(
+        "openai",
+        get_client().chat.completions.create,
+        model=model,
+        messages=messages,
+        temperature=0.2,
+        response_format={"type": "json_object"},
+    )
+    return response.choices[0].message.content or ""
+
+
+def assess_batch(inputs: List[Dict[str, Any]], model: str = "gpt-4o-mini", batch_size: int = DEFAULT_BATCH_SIZE,
+                 retries: int = 1, complete: Callable = None, write_logs: bool = True) -> Dict[str, Any]:
+    """
+    评估多盆：每 batch_size 盆一次请求，失败的盆单独重试。
+    返回 {"results": {pot: result}, "errors": {pot: 错误信息}, "calls": 请求次数}；
+    write_logs=True 时每盆成功的结果马上写进两个 log（带 pot 字段）。
+    """
+    complete = complete or complete_openai
+    by_pot = {inp["pot"]: inp for inp in inputs}
+    if len(by_pot) != len(inputs):
+        raise ValueError("duplicate pot ids in batch")
+
+    results, errors = {}, {}
+    calls = 0
+
+    def done(pot, result):
+        results[pot] = result
+        errors.pop(pot, None)
+        if write_logs:
+            inp = by_pot[pot]
+            record_assessment(result, image_path=inp["image_path"], pot=pot,
+                              **{key: inp.get(key) for key in TEXT_FIELDS})
+
+    # 1. 按批请求
+    pots = list(by_pot)
+    for i in range(0, len(pots), max(batch_size, 1)):
+        chunk = pots[i:i + max(batch_size, 1)]
+        calls += 1
+        try:
+            if len(chunk) == 1:
+                chunk_results, chunk_errors = {chunk[0]: parse_single(
+                    complete(single_messages(by_pot[chunk[0]]), model))}, {}
+            else:
+                chunk_results, chunk_errors = parse_batch(
+                    complete(batch_messages([by_pot[p] for p in chunk]), model), chunk)
+        except Exception as e:
+            chunk_results, chunk_errors = {}, {pot: f"{type(e).__name__}: {e}" for pot in chunk}
+        for pot, result in chunk_results.items():
+            done(pot, result)
+        errors.update(chunk_errors)
+
+    # 2. 失败的盆单独重试
+    for pot in list(errors):
+        print(f"[batch_assess] {pot} 批量结果无效（{errors[pot]}），单独重试")
+        for _ in range(retries):
+            calls += 1
+            try:
+                done(pot, parse_single(complete(single_messages(by_pot[pot]), model)))
+                break
+            except Exception as e:
+                errors[pot] = f"{type(e).__name__}: {e}"
+
+    for pot, msg in errors.items():
+        print(f"[batch_assess] {pot} 评估失败:", msg)
+    return {"results": results, "errors": errors, "calls": calls}
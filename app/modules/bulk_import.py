@@ -0,0 +1,417 @@
+"""
+历史数据批量导入（新站点上线时一次性导入几个月的传感器 / 浇水 / 健康记录）。
+
+逐条 POST /upload 每条都要整文件重写一次，几千万条不可能导完。这里直接写存储：
+
+1. 切块（主进程）：CSV / NDJSON 按 CHUNK_BYTES 切在行边界上（CSV 的引号里可以有换行，
+   切点前的引号数必须是偶数），只把 (文件, 偏移, 长度) 发给进程池，不搬运数据；
+   JSON 数组文件整个作为一块（大文件请用 NDJSON / CSV）。
+2. 解析 + 校验（进程池）：每条按记录类型（records.py）校验，timestamp 统一成 ISO 格式、补上 date，
+   按天写进临时目录里的分片文件（.import-*/<日期>/<块号>.ndjson）。CSV 的单元格按字段类型转换，
+   列表字段是 JSON 字符串（和 export 导出的 CSV 一致，导出的文件可以原样导回）。
+3. 落盘：早于 (今天 - retain_days) 的天并行合并进按天归档（archive.merge_archive_day，去重 + 排序），
+   其余的和热文件合并、排序后一次性原子重写。
+4. 收尾：递增日志的版本号（各 web worker 的 mmap 索引、浇水索引、页面缓存随之重建），
+   健康记录重建 health_summary.json。sensor_state.json（异常检测的设备状态）只跟踪实时上报，导入不改动。
+
+重复导入同一个文件不会产生重复记录（合并时按内容去重）。无效行只计数并报告前 MAX_ERRORS 条，不中断导入。
+
+    python -m modules.bulk_import sensor readings.csv more.ndjson --workers 8
+    python -m modules.bulk_import watering old_watering.json --pot balcony --dry-run
+"""
+import io
+import os
+import csv
+import sys
+import time
+import json
+import shutil
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import codec
+from .archive import DEFAULT_RETENTION_DAYS, archived_days, merge_archive_day, record_day, record_key, zstandard
+from .export import DATASETS, LIST_FIELDS
+from .health_summary import rebuild_health_summary
+from .log_reader import get_reader
+from .records import flag, number, scalar
+from .storage import file_lock, load_json_for_update, write_json_atomic
+from .store_version import bump_version
+
+CHUNK_BYTES = 8 * 1024 * 1024
+MAX_ERRORS = 20
+PROGRESS_INTERVAL_S = 1.0
+FORMATS = ("csv", "ndjson", "json")
+_EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".json": "json"}
+
+
+def detect_format(path):
+    fmt = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"{path}: unknown format (expected {', '.join(_EXTENSIONS)})")
+    return fmt
+
+
+# ========== 切块（主进程） ==========
+
+def _csv_cut(block):
+    """block 里最后一个“不在引号里”的换行之后的位置；没有返回 -1。"""
+    quotes = block.count(b'"')
+    pos = len(block)
+    while True:
+        nl = block.rfind(b"\n", 0, pos)
+        if nl < 0:
+            return -1
+        quotes -= block.count(b'"', nl, pos)
+        if quotes % 2 == 0:
+            return nl + 1
+        pos = nl
+
+
+def plan_chunks(path, fmt, chunk_bytes=CHUNK_BYTES):
+    """
+    -> (header, [(offset, length, first_line), ...])。header 是 CSV 的列名（其他格式为 None）。
+    只顺序读一遍文件找切点（数换行 / 引号都是 memchr 级别的速度）。
+    """
+    size = os.path.getsize(path)
+    header, offset, line = None, 0, 1
+    if fmt == "json":
+        return header, [(0, size, 1)] if size else []
+
+    chunks = []
+    with open(path, "rb") as f:
+        if fmt == "csv":
+            first = f.readline()
+            header = next(csv.reader([first.decode("utf-8-sig")]), None)
+            if not header:
+                return header, []
+            offset, line = len(first), 2
+        want = chunk_bytes
+        while offset < size:
+            f.seek(offset)
+            block = f.read(want)
+            if offset + len(block) >= size:
+                cut = len(block)
+            else:
+                cut = _csv_cut(block) if fmt == "csv" else block.rfind(b"\n") + 1
+                if cut <= 0:
+                    want *= 2  # 一行比块还长：读大一点再切
+                    continue
+            chunks.append((offset, cut, line))
+            line += block.count(b"\n", 0, cut)
+            offset += cut
+            want = chunk_bytes
+    return header, chunks
+
+
+# ========== 解析 + 校验（进程池） ==========
+
+def _to_number(value):
+    """整数写法的单元格还原成 int（export 导出的 80 导回来还是 80，不是 80.0）。"""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value  # 交给校验函数报错
+
+
+def _to_flag(value):
+    lowered = value.strip().lower()
+    if lowered in ("true", "1", "yes"):
+        return True
+    if lowered in ("false", "0", "no"):
+        return False
+    return value
+
+
+def _to_list(value):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def csv_converters(record_class):
+    """字段名 -> CSV 字符串的转换函数（export.iter_csv 的逆过程）。"""
+    converters = {}
+    for name, check in record_class.FIELDS.items():
+        if name in LIST_FIELDS:
+            converters[name] = _to_list
+        elif check is number or check is scalar:
+            converters[name] = _to_number
+        elif check is flag:
+            converters[name] = _to_flag
+    return converters
+
+
+def normalize(rec, record_class, pot=None):
+    """
+    一条原始记录 -> (日期, 校验后的 dict)；无效抛 ValueError。
+    timestamp 必填，统一成 ISO 格式（带时区的换算成本地时间，和服务器写入的记录一致）。
+    """
+    if not isinstance(rec, dict):
+        raise ValueError("record must be a JSON object")
+    ts = rec.get("timestamp")
+    if not isinstance(ts, str) or not ts:
+        raise ValueError("timestamp required")
+    try:
+        dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"invalid timestamp {ts!r}") from None
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    rec["timestamp"] = dt.isoformat()
+    day = dt.date().isoformat()
+    if not rec.get("date"):
+        rec["date"] = day
+    if pot and not rec.get("pot"):
+        rec["pot"] = pot
+    return day, record_class.clean(rec)
+
+
+def _iter_raw(path, fmt, offset, length, header, converters):
+    """-> (行号偏移, 原始 dict 或解析异常)。"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    if fmt == "json":
+        try:
+            records = codec.loads(data)
+        except ValueError as e:
+            yield 0, ValueError(f"invalid JSON file: {e}")
+            return
+        if not isinstance(records, list):
+            yield 0, ValueError("JSON file must contain an array of records")
+            return
+        yield from enumerate(records)
+        return
+    if fmt == "ndjson":
+        for i, raw in enumerate(data.split(b"\n")):
+            if raw.strip():
+                try:
+                    yield i, codec.loads(raw)
+                except ValueError as e:
+                    yield i, ValueError(f"invalid JSON: {e}")
+        return
+    for i, row in enumerate(csv.reader(io.StringIO(data.decode("utf-8")))):
+        if not row:
+            continue
+        rec = {}
+        for key, value in zip(header, row):
+            if value == "":
+                continue  # 空单元格 = 没有这个字段
+            convert = converters.get(key)
+            rec[key] = convert(value) if convert else value
+        yield i, rec
+
+
+def parse_chunk(task):
+    """
+    进程池里跑：解析 + 校验一块，按天写分片文件，返回统计。
+    task = (dataset, path, fmt, offset, length, first_line, header, staging_dir, chunk_no, pot)；
+    staging_dir 为 None 时只校验不写（--dry-run）。
+    """
+    dataset, path, fmt, offset, length, first_line, header, staging_dir, chunk_no, pot = task
+    record_class = DATASETS[dataset][1]
+    converters = csv_converters(record_class) if fmt == "csv" else {}
+
+    by_day, errors, invalid, rows = {}, [], 0, 0
+    for i, rec in _iter_raw(path, fmt, offset, length, header, converters):
+        rows += 1
+        try:
+            if isinstance(rec, Exception):
+                raise rec
+            day, clean = normalize(rec, record_class, pot)
+        except ValueError as e:
+            invalid += 1
+            if len(errors) < MAX_ERRORS:
+                where = f"{path}:{first_line + i}" if fmt != "json" else f"{path}[{i}]"
+                errors.append(f"{where}: {e}")
+            continue
+        by_day.setdefault(day, []).append(codec.dumps(clean))
+
+    if staging_dir is not None:
+        for day, lines in by_day.items():
+            directory = os.path.join(staging_dir, day)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"{chunk_no:06d}.ndjson"), "wb") as f:
+                f.write(b"\n".join(lines))
+                f.write(b"\n")
+    return {
+        "rows": rows,
+        "invalid": invalid,
+        "errors": errors,
+        "days": {day: len(lines) for day, lines in by_day.items()},
+        "bytes": length,
+    }
+
+
+# ========== 落盘 ==========
+
+def _read_staged(staging_dir, day):
+    directory = os.path.join(staging_dir, day)
+    records = []
+    for name in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, name), "rb") as f:
+            records.extend(codec.loads(line) for line in f if line.strip())
+    return records
+
+
+def merge_day(task):
+    """
+    进程池里跑：一天的分片合并进这一天的归档，返回 (day, 新增条数)。
+    hot_keys 是热文件里这一天已有记录的 key（还没归档的旧记录），这些不再写进归档，否则 query_range 会读到两份。
+    """
+    log_path, staging_dir, day, old_path, compression, hot_keys = task
+    records = _read_staged(staging_dir, day)
+    if hot_keys:
+        records = [r for r in records if record_key(r) not in hot_keys]
+    if not records:
+        return day, 0
+    # 每天单独加锁：导入期间实时上报（追加热文件）只会在两天之间短暂等待
+    with file_lock(log_path):
+        added = merge_archive_day(log_path, day, records, old_path, compression=compression)
+    return day, added
+
+
+def merge_hot(log_path, staging_dir, days):
+    """近期的天：和热文件合并（去重 + 按 timestamp 排序）后一次性重写，返回新增条数。"""
+    records = []
+    for day in days:
+        records.extend(_read_staged(staging_dir, day))
+    if not records:
+        return 0
+    with file_lock(log_path):
+        data = load_json_for_update(log_path, default=[])
+        if not isinstance(data, list):
+            data = [data]
+        seen = {record_key(r) for r in data}
+        before = len(data)
+        for rec in records:
+            key = record_key(rec)
+            if key not in seen:
+                seen.add(key)
+                data.append(rec)
+        data.sort(key=lambda r: r.get("timestamp", "") if isinstance(r, dict) else "")
+        write_json_atomic(log_path, data)
+    return len(data) - before
+
+
+def _hot_keys(log_path, days):
+    """热文件里属于 days 这几天（早于保留期、还没归档）的记录：{day: {key, ...}}。"""
+    keys = {}
+    if not days:
+        return keys
+    for rec in get_reader(log_path).range(end=datetime.fromisoformat(max(days)) + timedelta(days=1)):
+        day = record_day(rec) if isinstance(rec, dict) else None
+        if day in days:
+            keys.setdefault(day, set()).add(record_key(rec))
+    return keys
+
+
+# ========== 入口 ==========
+
+def _progress(stats, total_bytes, started):
+    elapsed = max(time.monotonic() - started, 1e-9)
+    pct = 100 * stats["bytes"] / total_bytes if total_bytes else 100
+    print(f"[bulk_import] {stats['rows']:,} rows ({pct:.0f}%), {stats['invalid']:,} invalid,"
+          f" {stats['rows'] / elapsed:,.0f} rows/s, {stats['bytes'] / elapsed / 1e6:.1f} MB/s", file=sys.stderr)
+
+
+def import_files(dataset, paths, log_path=None, workers=None, retain_days=DEFAULT_RETENTION_DAYS,
+                 pot=None, dry_run=False, compression="gzip", chunk_bytes=CHUNK_BYTES, now=None):
+    """
+    导入 paths（格式按扩展名）到 dataset 对应的日志，返回统计 dict。
+    dataset / 文件格式不对抛 ValueError（开始导入之前）。
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"dataset must be one of {list(DATASETS)}")
+    formats = [detect_format(p) for p in paths]
+    if compression == "zstd" and zstandard is None:
+        print("[bulk_import] 未安装 zstandard，改用 gzip", file=sys.stderr)
+        compression = "gzip"
+    log_path = os.path.abspath(log_path or DATASETS[dataset][0])
+    workers = workers or os.cpu_count() or 1
+    stem = os.path.basename(log_path).rsplit(".", 1)[0]
+    staging_dir = None if dry_run else os.path.join(os.path.dirname(log_path), f".import-{stem}-{os.getpid()}")
+
+    started = time.monotonic()
+    stats = {"rows": 0, "invalid": 0, "bytes": 0, "errors": [], "days": {}}
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # 1 + 2：切块，解析 + 校验，按天写分片
+            futures, chunk_no = [], 0
+            for path, fmt in zip(paths, formats):
+                header, chunks = plan_chunks(path, fmt, chunk_bytes)
+                for offset, length, first_line in chunks:
+                    futures.append(pool.submit(parse_chunk, (dataset, path, fmt, offset, length, first_line,
+                                                             header, staging_dir, chunk_no, pot)))
+                    chunk_no += 1
+            last_report = time.monotonic()
+            for future in as_completed(futures):
+                result = future.result()
+                for key in ("rows", "invalid", "bytes"):
+                    stats[key] += result[key]
+                stats["errors"].extend(result["errors"][:MAX_ERRORS - len(stats["errors"])])
+                for day, n in result["days"].items():
+                    stats["days"][day] = stats["days"].get(day, 0) + n
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL_S:
+                    _progress(stats, total_bytes, started)
+                    last_report = time.monotonic()
+            _progress(stats, total_bytes, started)
+            stats["parse_s"] = round(time.monotonic() - started, 2)
+            if dry_run:
+                return stats
+
+            # 3：旧的天并行合并进归档，近期的天合并进热文件
+            now = now or datetime.now()
+            cutoff_day = (now.date() - timedelta(days=retain_days)).isoformat()
+            existing = dict(archived_days(log_path))
+            cold = sorted(day for day in stats["days"] if day < cutoff_day)
+            hot = sorted(day for day in stats["days"] if day >= cutoff_day)
+            hot_keys = _hot_keys(log_path, set(cold))
+            tasks = [(log_path, staging_dir, day, existing.get(day), compression, hot_keys.get(day))
+                     for day in cold]
+            stats["archived"] = sum(added for _, added in pool.map(merge_day, tasks))
+        stats["hot"] = merge_hot(log_path, staging_dir, hot)
+        stats["duplicates"] = stats["rows"] - stats["invalid"] - stats["archived"] - stats["hot"]
+    finally:
+        if staging_dir is not None:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    # 4：只写了归档时热文件的版本号没变，手动递增，让各进程的索引 / 缓存重建
+    bump_version(log_path)
+    if dataset == "health":
+        rebuild_health_summary(log_path)
+    stats["elapsed_s"] = round(time.monotonic() - started, 2)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量导入历史数据（CSV / JSON / NDJSON）")
+    parser.add_argument("dataset", choices=list(DATASETS))
+    parser.add_argument("files", nargs="+", help=".csv / .ndjson / .jsonl / .json 文件")
+    parser.add_argument("--log", help="目标日志文件（默认 <dataset> 对应的 app/ 下文件）")
+    parser.add_argument("--workers", type=int, help="进程数（默认 CPU 核数）")
+    parser.add_argument("--pot", help="没有 pot 字段的记录归到这一盆")
+    parser.add_argument("--retain-days", type=int, default=DEFAULT_RETENTION_DAYS,
+                        help="更早的记录直接写进归档（和 scheduler 的热文件保留天数一致）")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default="gzip")
+    parser.add_argument("--dry-run", action="store_true", help="只解析校验，不写入")
+    args = parser.parse_args()
+
+    try:
+        result = import_files(args.dataset, args.files, args.log, args.workers, args.retain_days,
+                              args.pot, args.dry_run, args.compression)
+    except ValueError as e:
+        parser.error(str(e))
+    for line in result["errors"]:
+        print("[bulk_import] invalid:", line, file=sys.stderr)
+    summary = {k: v for k, v in result.items() if k not in ("errors", "days")}
+    summary["days"] = len(result["days"])
+    print("[bulk_import]", json.dumps(summary), file=sys.stderr)
@@ -0,0 +1,43 @@
+"""
+JSON 编解码层：所有日志的读写都经过这里。
+
+装了 orjson 就用 orjson（编解码快好几倍），否则退回标准库 json。
+输出统一是紧凑格式（无缩进、无多余空格、UTF-8 原样输出中文），
+日志文件更小，mmap 索引扫描的字节也更少。读取兼容旧的带缩进格式。
+dumps_sorted 按键排序输出，内容相同的记录编码也相同，按内容去重时用它做 key。
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+if orjson is not None:
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def dumps_sorted(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    _sorted_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+    def dumps(obj) -> bytes:
+        return _encoder.encode(obj).encode("utf-8")
+
+    def dumps_sorted(obj) -> bytes:
+        return _sorted_encoder.encode(obj).encode("utf-8")
+
+    def loads(data):
+        return json.loads(data)
+
+
+def dumps_text(obj) -> str:
+    return dumps(obj).decode("utf-8")
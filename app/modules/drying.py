@@ -0,0 +1,194 @@
+"""
+土壤变干速度预测：用最近一段传感器数据拟合每个 pot 的湿度下降速度，
+预测什么时候会降到植物的下限（target_soil_moisture_percent_min），
+scheduler 据此决定下一次检查（拍照 + 调用大模型）的时间，而不是固定间隔。
+
+模型：上次浇水之后的湿度按时间做最小二乘直线拟合。
+湿度曲线前段下降更快，用最近窗口的斜率外推会偏早，正好是安全的方向。
+所有盆的日志各扫一遍、拟合一次算完（predict_next_checks）：装了 numpy 时按盆向量化求和，
+否则退回纯 Python 的一遍求和。scheduler 睡到最早需要检查的那一盆。
+"""
+from datetime import datetime, timedelta
+
+from .archive import query_range
+from .log_reader import to_seconds
+from .pot_config import DEFAULT_POT
+from .watering_index import get_index
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WINDOW_HOURS = 12            # 拟合用最近多少小时的数据
+MIN_SAMPLES = 6
+MIN_SPAN_S = 30 * 60         # 样本至少覆盖这么久，斜率才可信
+WATERING_JUMP = 5.0          # 相邻两点湿度上升超过这么多（%），视为浇过水，从这之后开始拟合
+DEFAULT_LOWER_TARGET = 30.0  # 没有 AI 给出的下限时使用
+CHECK_MARGIN_S = 30 * 60     # 在预测达到下限之前多久检查
+MIN_INTERVAL_S = 5 * 60
+DEFAULT_INTERVAL_S = 30 * 60  # 数据不够拟合时的检查间隔
+MAX_INTERVAL_S = 6 * 3600    # 再怎么不缺水，也至少这么久看一次（健康评估）
+
+
+def _fit_all(series):
+    """
+    {pot: ([秒], [湿度])} -> {pot: (a, b)}，每盆一条最小二乘直线 y = a + b·t。
+    所有盆的样本拼在一起一次算完：numpy 用 bincount 按盆求和，没有 numpy 时一遍纯 Python 求和。
+    t 先减去每盆的第一个时间，避免平方后丢精度。
+    """
+    names = list(series)
+    if not names:
+        return {}
+    if np is not None:
+        idx = np.concatenate([np.full(len(series[p][0]), i) for i, p in enumerate(names)])
+        t0 = np.array([series[p][0][0] for p in names], dtype=float)
+        t = np.concatenate([np.asarray(series[p][0], dtype=float) for p in names]) - t0[idx]
+        y = np.concatenate([np.asarray(series[p][1], dtype=float) for p in names])
+        k = len(names)
+        n = np.bincount(idx, minlength=k).astype(float)
+        st, sy = np.bincount(idx, t, k), np.bincount(idx, y, k)
+        stt, sty = np.bincount(idx, t * t, k), np.bincount(idx, t * y, k)
+        denom = n * stt - st * st
+        b = np.divide(n * sty - st * sy, denom, out=np.zeros(k), where=denom != 0)
+        a = (sy - b * st) / n - b * t0
+        return {p: (float(a[i]), float(b[i])) for i, p in enumerate(names)}
+    fits = {}
+    for pot in names:
+        ts, ys = series[pot]
+        n, t0 = len(ts), ts[0]
+        st = sy = stt = sty = 0.0
+        for t, y in zip(ts, ys):
+            t -= t0
+            st += t
+            sy += y
+            stt += t * t
+            sty += t * y
+        denom = n * stt - st * st
+        b = (n * sty - st * sy) / denom if denom else 0.0
+        fits[pot] = ((sy - b * st) / n - b * t0, b)
+    return fits
+
+
+def lower_targets(watering_log_path, pots, now=None):
+    """每盆最近一次 AI 决策给出的湿度下限（一遍扫描），没有则用 DEFAULT_LOWER_TARGET。"""
+    now = now or datetime.now()
+    targets = {}
+    for rec in query_range(watering_log_path, start=now - timedelta(days=7)):
+        pot = rec.get("pot") or DEFAULT_POT
+        value = rec.get("target_soil_moisture_percent_min")
+        if pot in pots and isinstance(value, (int, float)) and not isinstance(value, bool):
+            targets[pot] = float(value)
+    return {pot: targets.get(pot, DEFAULT_LOWER_TARGET) for pot in pots}
+
+
+def lower_target(watering_log_path, pot=None, now=None):
+    """最近一次 AI 决策给出的湿度下限，没有则用 DEFAULT_LOWER_TARGET。"""
+    pot = pot or DEFAULT_POT
+    return lower_targets(watering_log_path, [pot], now)[pot]
+
+
+def _drying_samples(sensor_log_path, watering_log_path, pots, devices, now):
+    """
+    每盆上次浇水之后、窗口之内的有效湿度样本：{pot: ([秒], [湿度])}，传感器日志只扫一遍。
+    没有 pot 字段的读数按 devices（板子 -> 盆）归属，都没有的归到 DEFAULT_POT。
+    """
+    window = now - timedelta(hours=WINDOW_HOURS)
+    starts = {}
+    for pot in pots:
+        idx = get_index(watering_log_path, pot=pot)
+        if idx.timestamps and idx.timestamps[-1] > window.isoformat():
+            starts[pot] = datetime.fromisoformat(idx.timestamps[-1])
+        else:
+            starts[pot] = window
+    start_s = {pot: to_seconds(start) for pot, start in starts.items()}
+
+    series = {pot: ([], []) for pot in pots}
+    for rec in query_range(sensor_log_path, start=min(starts.values()), end=now):
+        pot = rec.get("pot") or devices.get(rec.get("device")) or DEFAULT_POT
+        if pot not in series:
+            continue
+        value = rec.get("soil_moisture_percent")
+        anomalies = rec.get("anomalies") or ()
+        if not isinstance(value, (int, float)) or any(a.startswith("soil_moisture_percent:") for a in anomalies):
+            continue
+        t = to_seconds(rec.get("timestamp"))
+        if t != t or t < start_s[pot]:
+            continue
+        ts, ys = series[pot]
+        if ys and value - ys[-1] > WATERING_JUMP:
+            del ts[:], ys[:]  # 没有记录的浇水（手动 / 下雨）：从跳变之后重新开始
+        ts.append(t)
+        ys.append(float(value))
+    return series
+
+
+def predict_next_checks(sensor_log_path, watering_log_path, pots, devices=None, open_pots=(), now=None):
+    """
+    所有盆一起预测（日志各扫一遍、一次拟合）。pots = {pot: threshold 或 None（用 AI 给的下限）}，
+    devices = {板子: pot}（读数没带 pot 字段时用），open_pots = 还有没结束的水泵命令的盆。
+    返回 {pot: 和 predict_next_check 一样的 dict}。
+    """
+    now = now or datetime.now()
+    if not pots:
+        return {}
+    targets = lower_targets(watering_log_path, [p for p, v in pots.items() if v is None], now)
+    series = _drying_samples(sensor_log_path, watering_log_path, pots, devices or {}, now)
+    fits = _fit_all({p: s for p, s in series.items()
+                     if len(s[1]) >= MIN_SAMPLES and s[0][-1] - s[0][0] >= MIN_SPAN_S})
+    now_s = to_seconds(now)
+
+    results = {}
+    for pot, threshold in pots.items():
+        threshold = targets[pot] if threshold is None else float(threshold)
+        ts, ys = series[pot]
+        result = {
+            "pot": pot,
+            "threshold": threshold,
+            "samples": len(ys),
+            "moisture_now": ys[-1] if ys else None,
+            "slope_per_hour": None,
+            "predicted_at": None,
+            "hours_to_threshold": None,
+        }
+        if pot not in fits:
+            wait, reason = DEFAULT_INTERVAL_S, "insufficient data"
+            if ys and ys[-1] <= threshold:
+                wait, reason = 0, "below threshold"
+        else:
+            a, b = fits[pot]
+            result["slope_per_hour"] = round(b * 3600, 3)
+            current = a + b * now_s
+            if ys[-1] <= threshold or current <= threshold:
+                wait, reason = 0, "below threshold"
+            elif b >= 0:
+                wait, reason = MAX_INTERVAL_S, "not drying"
+            else:
+                hit = (threshold - a) / b
+                result["predicted_at"] = (now + timedelta(seconds=hit - now_s)).isoformat(timespec="seconds")
+                result["hours_to_threshold"] = round((hit - now_s) / 3600, 2)
+                wait, reason = hit - now_s - CHECK_MARGIN_S, "predicted"
+        if wait == 0 and pot in open_pots:
+            # 已经决定浇水、命令还没执行完：等设备浇完再看，不要每几秒重新评估一次
+            wait, reason = MIN_INTERVAL_S, "watering pending"
+
+        if wait > 0:
+            wait = min(max(wait, MIN_INTERVAL_S), MAX_INTERVAL_S)
+        result["next_check_at"] = (now + timedelta(seconds=wait)).isoformat(timespec="seconds")
+        result["seconds_until_check"] = int(wait)
+        result["reason"] = reason
+        results[pot] = result
+    return results
+
+
+def predict_next_check(sensor_log_path, watering_log_path, pot=None, threshold=None, now=None, device=None):
+    """
+    预测湿度降到下限的时间和建议的下一次检查时间。返回 dict：
+        moisture_now, slope_per_hour, threshold, samples,
+        predicted_at（None 表示不在下降 / 数据不够）, hours_to_threshold,
+        next_check_at, seconds_until_check, reason
+    device 是这盆的板子（没带 pot 字段的读数按它归属）。
+    """
+    pot = pot or DEFAULT_POT
+    devices = {device: pot} if device else None
+    return predict_next_checks(sensor_log_path, watering_log_path, {pot: threshold}, devices, now=now)[pot]
@@ -0,0 +1,248 @@
+"""
+历史数据批量导出（传感器 / 浇水 / 健康评估）：CSV、NDJSON、Parquet。
+
+全程是生成器，内存占用和导出的总量无关：
+- 记录来源：归档一次只解压一天（archive/<日志名>/<日期>.json.gz），热文件走 log_reader 的 mmap 索引逐条解码；
+- CSV / NDJSON 每攒够 CHUNK_BYTES 就吐出一块（Flask 里没有 Content-Length，自动走 chunked 传输）；
+- Parquet 每 ROW_GROUP_SIZE 行写一个 row group 并立即吐出已写好的字节，最后吐出文件尾。
+
+列固定取自记录类型的 FIELDS（records.py），所以 CSV 表头不用先扫一遍数据；
+列表字段（reasons、suggestions、anomalies）在 CSV 里写成 JSON 字符串。
+
+    python -m modules.export sensor --format csv --from 2025-12-01 --to 2025-12-07 > sensor.csv
+    python -m modules.export health --format parquet --pot balcony -o health.parquet
+"""
+import io
+import os
+import csv
+import sys
+import json
+import argparse
+from datetime import datetime
+
+from . import codec
+from .archive import archived_days, in_range, read_archive_file
+from .log_reader import get_reader
+from .pot_config import DEFAULT_POT
+from .records import HealthAssessment, SensorReading, WateringEvent, flag, health_level, number
+from .watering_index import parse_bound
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+CHUNK_BYTES = 64 * 1024
+ROW_GROUP_SIZE = 10000
+FORMATS = ("csv", "ndjson", "parquet")
+
+# 数据集 -> (默认日志文件, 记录类型)
+DATASETS = {
+    "sensor": ("sensor_log.json", SensorReading),
+    "watering": ("watering_log.json", WateringEvent),
+    "health": ("plant_health_log.json", HealthAssessment),
+}
+
+
+def fields_for(dataset):
+    return list(DATASETS[dataset][1].FIELDS)
+
+
+# ========== 记录流 ==========
+
+def iter_records(log_path, start=None, end=None, pot=None):
+    """
+    [start, end) 内的记录（start / end 为 datetime），先归档（按天）后热文件。
+    pot 不为 None 时只要这一盆的（没有 pot 字段的记录属于 DEFAULT_POT）。
+    """
+    start_day = start.date().isoformat() if start else None
+    end_day = end.date().isoformat() if end else None
+
+    def keep(rec):
+        return isinstance(rec, dict) and (pot is None or (rec.get("pot") or DEFAULT_POT) == pot)
+
+    for day, path in archived_days(log_path):
+        if start_day and day < start_day:
+            continue
+        if end_day and day > end_day:
+            break
+        try:
+            records = read_archive_file(path)
+        except Exception as e:
+            print("[export] 读取归档失败:", path, "error:", e, file=sys.stderr)
+            continue
+        records = [r for r in records if keep(r) and in_range(r, start, end)]
+        records.sort(key=lambda r: r.get("timestamp", ""))
+        yield from records
+        del records
+
+    for rec in get_reader(log_path).range(start, end):
+        if keep(rec):
+            yield rec
+
+
+# ========== CSV / NDJSON ==========
+
+LIST_FIELDS = ("reasons", "suggestions", "anomalies")
+
+
+def iter_csv(records, fields):
+    """-> bytes 块。第一块以表头开头。"""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(fields)
+    list_columns = [i for i, key in enumerate(fields) if key in LIST_FIELDS]
+    for rec in records:
+        row = [rec.get(key) for key in fields]
+        for i in list_columns:
+            if row[i] is not None:
+                row[i] = json.dumps(row[i], ensure_ascii=False)
+        writer.writerow(row)
+        if buf.tell() >= CHUNK_BYTES:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
+
+
+def iter_ndjson(records):
+    chunk = bytearray()
+    for rec in records:
+        chunk += codec.dumps(rec)
+        chunk += b"\n"
+        if len(chunk) >= CHUNK_BYTES:
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+# ========== Parquet ==========
+
+def arrow_schema(record_class):
+    """FIELDS 的校验函数 -> Arrow 类型；不认识的（scalar 等类型不统一的）一律存成字符串。"""
+    types = {number: pa.float64(), flag: pa.bool_(), health_level: pa.int64()}
+    columns = []
+    for name, check in record_class.FIELDS.items():
+        if name in LIST_FIELDS:
+            columns.append(pa.field(name, pa.list_(pa.string())))
+        else:
+            columns.append(pa.field(name, types.get(check, pa.string())))
+    return pa.schema(columns)
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter 写进来的字节先攒着，生成器每写完一个 row group 取走一次。"""
+
+    def __init__(self):
+        self._chunks = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def take(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(records, record_class, row_group_size=ROW_GROUP_SIZE):
+    if pa is None:
+        raise RuntimeError("Parquet export needs pyarrow")
+    schema = arrow_schema(record_class)
+    string_fields = {f.name for f in schema if pa.types.is_string(f.type)}
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    def flush(rows):
+        columns = {}
+        for f in schema:
+            values = [r.get(f.name) for r in rows]
+            if f.name in string_fields:
+                values = [None if v is None else str(v) for v in values]
+            columns[f.name] = values
+        writer.write_table(pa.table(columns, schema=schema), row_group_size=row_group_size)
+
+    rows = []
+    for rec in records:
+        rows.append(rec)
+        if len(rows) >= row_group_size:
+            flush(rows)
+            rows = []
+            data = sink.take()
+            if data:
+                yield data
+    if rows:
+        flush(rows)
+    writer.close()
+    yield sink.take()
+
+
+# ========== 入口 ==========
+
+def export_stream(dataset, fmt, log_path=None, start=None, end=None, pot=None):
+    """
+    -> bytes 块的生成器。start / end 可以是 datetime 或 "2025-12-01" / ISO 字符串（to 只给日期时包含当天）。
+    dataset / fmt 不对抛 ValueError，Parquet 缺 pyarrow 抛 RuntimeError（都在开始生成之前）。
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"dataset must be one of {list(DATASETS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {list(FORMATS)}")
+    if fmt == "parquet" and pa is None:
+        raise RuntimeError("Parquet export needs pyarrow")
+    if isinstance(start, str):
+        start = datetime.fromisoformat(parse_bound(start))
+    if isinstance(end, str):
+        end = datetime.fromisoformat(parse_bound(end, is_end=True))
+
+    default_path, record_class = DATASETS[dataset]
+    records = iter_records(log_path or default_path, start, end, pot)
+    if fmt == "csv":
+        return iter_csv(records, fields_for(dataset))
+    if fmt == "ndjson":
+        return iter_ndjson(records)
+    return iter_parquet(records, record_class)
+
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="流式导出历史数据")
+    parser.add_argument("dataset", choices=list(DATASETS))
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--from", dest="start", help="2025-12-01 或 2025-12-01T08:00:00")
+    parser.add_argument("--to", dest="end", help="只给日期时包含当天")
+    parser.add_argument("--pot")
+    parser.add_argument("--log", help="日志文件（默认 <dataset> 对应的 app/ 下文件）")
+    parser.add_argument("-o", "--output", help="输出文件，默认标准输出")
+    args = parser.parse_args()
+
+    try:
+        stream = export_stream(args.dataset, args.format, args.log, args.start, args.end, args.pot)
+    except (ValueError, RuntimeError) as e:
+        parser.error(str(e))
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in stream:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+            print(f"[export] 已写入 {args.output}（{os.path.getsize(args.output)} 字节）", file=sys.stderr)
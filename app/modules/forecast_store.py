@@ -0,0 +1,258 @@
+"""
+天气预报缓存：每个位置一份，后台定时刷新，浇水逻辑只读现成的特征，不再每轮都请求天气接口。
+
+forecast_store.json：
+    {
+      "31.23,121.47": {
+        "lat": .., "lon": .., "fetched_at": 1733560000,
+        "hourly": [{"dt": .., "time": "2025-12-07T14:00:00", "temp_c": .., "humidity": ..,
+                    "wind_ms": .., "pressure_hpa": .., "rain_mm": ..}, ...],   # 完整 5 天，逐小时插值
+        "daily_et0_mm": {"2025-12-07": 2.1, ...},
+        "features": {...}   # 见 compute_features
+      }
+    }
+
+- OpenWeather 的 5 天预报是 3 小时一步：温度 / 湿度 / 风速 / 气压线性插值到每小时，
+  3 小时降水量平均分到前 3 个小时；
+- 参考蒸散量 ET0 用 FAO-56 Penman-Monteith（日尺度），太阳辐射按 Hargreaves 公式由温差估算；
+- 特征（未来 6/12/24/48 小时累计降水、24 小时最高 / 最低温、平均湿度 / 风速、ET0 ……）
+  在刷新时算好，读的时候只是查表。
+"""
+import math
+import time
+import argparse
+import threading
+from datetime import datetime
+
+from .storage import file_lock, load_json, load_json_for_update, write_json_atomic
+
+FORECAST_STORE_FILE = "forecast_store.json"
+REFRESH_INTERVAL_S = 3600   # 多久刷新一次
+STALE_AFTER_S = 6 * 3600    # 超过这么久没刷新成功，读的时候当作没有预报
+RAIN_WINDOWS_H = (6, 12, 24, 48)
+
+
+def location_key(lat, lon):
+    return f"{float(lat):.2f},{float(lon):.2f}"
+
+
+# ========== 逐小时插值 ==========
+
+def parse_steps(raw):
+    """OpenWeather /forecast 的 list -> [(dt, temp, humidity, wind, pressure, rain_3h)]，按时间排序。"""
+    steps = []
+    for item in raw.get("list", []):
+        main = item.get("main", {})
+        steps.append((
+            int(item["dt"]),
+            float(main.get("temp", 0.0)),
+            float(main.get("humidity", 0.0)),
+            float(item.get("wind", {}).get("speed", 0.0)),
+            float(main.get("pressure", 1013.0)),
+            float((item.get("rain") or {}).get("3h", 0.0)),
+        ))
+    steps.sort()
+    return steps
+
+
+def interpolate_hourly(steps):
+    """3 小时一步 -> 每小时一条。降水是“过去 3 小时”的量，平均分给该步之前的 3 个小时。"""
+    if not steps:
+        return []
+    hourly = []
+    first, last = steps[0][0], steps[-1][0]
+    i = 0
+    for dt in range(first - 2 * 3600, last + 1, 3600):
+        while i + 1 < len(steps) and steps[i + 1][0] <= dt:
+            i += 1
+        a = steps[i]
+        b = steps[i + 1] if i + 1 < len(steps) else a
+        if dt <= a[0] or b[0] == a[0]:
+            w = 0.0
+        else:
+            w = (dt - a[0]) / (b[0] - a[0])
+        # 该小时属于哪一步的 3 小时降水：dt 之后最近的一步
+        j = i if dt <= a[0] else min(i + 1, len(steps) - 1)
+        hourly.append({
+            "dt": dt,
+            "time": datetime.fromtimestamp(dt).isoformat(timespec="seconds"),
+            "temp_c": round(a[1] + (b[1] - a[1]) * w, 2),
+            "humidity": round(a[2] + (b[2] - a[2]) * w, 1),
+            "wind_ms": round(a[3] + (b[3] - a[3]) * w, 2),
+            "pressure_hpa": round(a[4] + (b[4] - a[4]) * w, 1),
+            "rain_mm": round(steps[j][5] / 3, 3),
+        })
+    return hourly
+
+
+# ========== 参考蒸散量 ET0（FAO-56） ==========
+
+def _svp(t):
+    """饱和水汽压 e°(T)，kPa"""
+    return 0.6108 * math.exp(17.27 * t / (t + 237.3))
+
+
+def extraterrestrial_radiation(lat, day_of_year):
+    """天文辐射 Ra，MJ m-2 day-1（FAO-56 式 21）"""
+    phi = math.radians(lat)
+    dr = 1 + 0.033 * math.cos(2 * math.pi * day_of_year / 365)
+    delta = 0.409 * math.sin(2 * math.pi * day_of_year / 365 - 1.39)
+    ws = math.acos(max(-1.0, min(1.0, -math.tan(phi) * math.tan(delta))))
+    return 24 * 60 / math.pi * 0.0820 * dr * (
+        ws * math.sin(phi) * math.sin(delta) + math.cos(phi) * math.cos(delta) * math.sin(ws)
+    )
+
+
+def et0_penman_monteith(hours, lat, day_of_year):
+    """
+    一组逐小时数据（通常是一天 24 条）的 ET0，mm。
+    太阳辐射用 Hargreaves 式 Rs = 0.16·sqrt(Tmax - Tmin)·Ra 估算；风速按 10 m 高换算到 2 m。
+    """
+    temps = [h["temp_c"] for h in hours]
+    tmax, tmin = max(temps), min(temps)
+    tmean = (tmax + tmin) / 2
+    rh = sum(h["humidity"] for h in hours) / len(hours)
+    u2 = sum(h["wind_ms"] for h in hours) / len(hours) * 4.87 / math.log(67.8 * 10 - 5.42)
+    pressure_kpa = sum(h["pressure_hpa"] for h in hours) / len(hours) / 10
+
+    es = (_svp(tmax) + _svp(tmin)) / 2
+    ea = es * rh / 100
+    delta = 4098 * _svp(tmean) / (tmean + 237.3) ** 2
+    gamma = 0.665e-3 * pressure_kpa
+
+    ra = extraterrestrial_radiation(lat, day_of_year)
+    rs = 0.16 * math.sqrt(max(tmax - tmin, 0.0)) * ra
+    rso = 0.75 * ra
+    rns = (1 - 0.23) * rs
+    rnl = 4.903e-9 * ((tmax + 273.16) ** 4 + (tmin + 273.16) ** 4) / 2 \
+        * (0.34 - 0.14 * math.sqrt(ea)) * (1.35 * min(rs / rso, 1.0) - 0.35 if rso > 0 else 0.0)
+    rn = rns - rnl
+
+    et0 = (0.408 * delta * rn + gamma * 900 / (tmean + 273) * u2 * (es - ea)) / (delta + gamma * (1 + 0.34 * u2))
+    return max(et0, 0.0)
+
+
+def daily_et0(hourly, lat):
+    by_day = {}
+    for h in hourly:
+        by_day.setdefault(h["time"][:10], []).append(h)
+    result = {}
+    for day, hours in by_day.items():
+        if len(hours) >= 12:  # 太少（首尾不完整的天）不算
+            doy = datetime.fromisoformat(day).timetuple().tm_yday
+            result[day] = round(et0_penman_monteith(hours, lat, doy), 2)
+    return result
+
+
+# ========== 特征 ==========
+
+def compute_features(hourly, lat, now=None):
+    """从 now 开始的特征向量（dict）。"""
+    now = now or time.time()
+    upcoming = [h for h in hourly if h["dt"] + 3600 > now]
+    features = {"hours_available": len(upcoming)}
+    if not upcoming:
+        return features
+
+    for w in RAIN_WINDOWS_H:
+        window = upcoming[:w]
+        features[f"rain_mm_next_{w}h"] = round(sum(h["rain_mm"] for h in window), 2)
+    next_24h = upcoming[:24]
+    features["will_rain_next_24h"] = features["rain_mm_next_24h"] > 0
+    features["max_rain_mm_per_hour_next_24h"] = max(h["rain_mm"] for h in next_24h)
+    features["max_temp_next_24h_c"] = max(h["temp_c"] for h in next_24h)
+    features["min_temp_next_24h_c"] = min(h["temp_c"] for h in next_24h)
+    features["mean_humidity_next_24h"] = round(sum(h["humidity"] for h in next_24h) / len(next_24h), 1)
+    features["mean_wind_ms_next_24h"] = round(sum(h["wind_ms"] for h in next_24h) / len(next_24h), 2)
+    if len(next_24h) >= 12:
+        doy = datetime.fromtimestamp(next_24h[0]["dt"]).timetuple().tm_yday
+        features["et0_mm_next_24h"] = round(et0_penman_monteith(next_24h, lat, doy), 2)
+    return features
+
+
+# ========== 刷新 / 读取 ==========
+
+def refresh_location(lat, lon, store_path=FORECAST_STORE_FILE, raw=None):
+    """请求天气接口（raw 不为 None 时直接用它），把插值结果和特征写进缓存；失败返回 None。"""
+    if raw is None:
+        from .weather_module import fetch_forecast
+        raw = fetch_forecast(lat, lon)
+        if raw is None:
+            return None
+
+    hourly = interpolate_hourly(parse_steps(raw))
+    entry = {
+        "lat": float(lat),
+        "lon": float(lon),
+        "fetched_at": int(time.time()),
+        "hourly": hourly,
+        "daily_et0_mm": daily_et0(hourly, float(lat)),
+        "features": compute_features(hourly, float(lat)),
+    }
+    with file_lock(store_path):
+        store = load_json_for_update(store_path, default={})
+        store[location_key(lat, lon)] = entry
+        write_json_atomic(store_path, store)
+    print(f"[forecast] 已刷新 {location_key(lat, lon)}：{len(hourly)} 小时")
+    return entry
+
+
+def get_forecast(lat, lon, store_path=FORECAST_STORE_FILE):
+    """缓存里的预报（不请求网络）；没有或太旧返回 None。"""
+    entry = load_json(store_path, default={}).get(location_key(lat, lon))
+    if not entry or time.time() - entry.get("fetched_at", 0) > STALE_AFTER_S:
+        return None
+    return entry
+
+
+def get_features(lat, lon, store_path=FORECAST_STORE_FILE, now=None):
+    """
+    从现在起的特征向量。缓存里的 features 是刷新时刻算的，
+    这里按当前时间从逐小时数据重新切一次（纯内存计算，不请求网络）。
+    """
+    entry = get_forecast(lat, lon, store_path)
+    if entry is None:
+        return None
+    features = compute_features(entry["hourly"], entry["lat"], now=now)
+    features["fetched_at"] = entry["fetched_at"]
+    return features
+
+
+def refresh_due(locations, store_path=FORECAST_STORE_FILE):
+    """刷新 locations 里超过 REFRESH_INTERVAL_S 没更新的位置。"""
+    store = load_json(store_path, default={})
+    for lat, lon in locations:
+        entry = store.get(location_key(lat, lon))
+        if entry is None or time.time() - entry.get("fetched_at", 0) >= REFRESH_INTERVAL_S:
+            try:
+                refresh_location(lat, lon, store_path)
+            except Exception as e:
+                print("[forecast] 刷新失败:", location_key(lat, lon), "error:", e)
+
+
+def start_background_refresh(locations_fn, store_path=FORECAST_STORE_FILE, check_every_s=300):
+    """
+    后台线程：每 check_every_s 秒检查一次，刷新到期的位置。
+    locations_fn() 返回 [(lat, lon), ...]（每次都重新读，花盆位置改了也能跟上）。
+    """
+    def run():
+        while True:
+            try:
+                refresh_due(locations_fn(), store_path)
+            except Exception as e:
+                print("[forecast] 后台刷新出错:", e)
+            time.sleep(check_every_s)
+
+    thread = threading.Thread(target=run, name="forecast-refresh", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="刷新天气预报缓存并打印特征")
+    parser.add_argument("lat", type=float)
+    parser.add_argument("lon", type=float)
+    args = parser.parse_args()
+
+    if refresh_location(args.lat, args.lon):
+        print(get_features(args.lat, args.lon))
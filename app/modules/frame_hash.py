@@ -0,0 +1,104 @@
+"""
+摄像头照片的感知哈希（dHash），用来判断“植物看起来变了没有”。
+
+ESP32 大约每 15 秒传一张图，大部分和上一张几乎一样。上传时算好每张图的 64 位 dHash
+（灰度缩到 9x8，每行相邻像素比较亮度），存进 frame_hashes.json（只保留最近 MAX_FRAMES 张）；
+scheduler 评估前和“上次评估的那张图”比汉明距离，小于阈值就认为没变化，
+不再做 base64 编码、不调模型。
+
+    frame_hashes.json   {"20251207_154348.jpg": "f0e4c8...", ...}
+    frame_state.json    {"<pot>": {"filename": .., "dhash": .., "assessed_at": ..}}
+
+需要 Pillow；没装时算不出哈希，每张图都当作“新的”（和以前的行为一样）。
+"""
+import os
+import time
+
+from .storage import file_lock, load_json, load_json_for_update, write_json_atomic
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+FRAME_HASH_FILE = "frame_hashes.json"
+FRAME_STATE_FILE = "frame_state.json"
+MAX_FRAMES = 2000         # 15 秒一张，约 8 小时
+CHANGE_THRESHOLD = 6      # 64 位里超过这么多位不同才算“变了”（光照缓慢变化一般在 0-4 位）
+MAX_SKIP_S = 6 * 3600     # 再怎么没变化，也至少这么久重新评估一次
+
+
+def dhash(image_path, size=8):
+    """64 位 dHash，16 位十六进制字符串；没有 Pillow 或图片无法解码时返回 None。"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(image_path) as img:
+            img.draft("L", (size * 4, size * 4))  # JPEG 解码时直接缩小，只解很少的像素
+            pixels = list(img.convert("L").resize((size + 1, size), Image.BILINEAR).getdata())
+    except Exception as e:
+        print("[frame_hash] 无法计算哈希:", image_path, e)
+        return None
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return f"{value:0{size * size // 4}x}"
+
+
+def hamming(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+# ========== 上传时记录 ==========
+
+def record_frame(filename, image_path, hash_path=FRAME_HASH_FILE):
+    """算出 image_path 的哈希并记到 hash_path（上传接口在图片落盘后调用）。返回哈希或 None。"""
+    value = dhash(image_path)
+    if value is None:
+        return None
+    with file_lock(hash_path):
+        hashes = load_json_for_update(hash_path, default={})
+        hashes[filename] = value
+        if len(hashes) > MAX_FRAMES:
+            for old in list(hashes)[:len(hashes) - MAX_FRAMES]:
+                del hashes[old]
+        write_json_atomic(hash_path, hashes)
+    return value
+
+
+def frame_hash(image_path, hash_path=FRAME_HASH_FILE):
+    """上传时记下的哈希；没有（老图片、没装 Pillow 时上传的）就现算。"""
+    value = load_json(hash_path, default={}).get(os.path.basename(image_path))
+    return value or dhash(image_path)
+
+
+# ========== 评估前判断 ==========
+
+def frame_changed(image_path, pot, threshold=CHANGE_THRESHOLD, state_path=FRAME_STATE_FILE,
+                  hash_path=FRAME_HASH_FILE, now=None):
+    """
+    -> (changed, distance)。以下情况都算 changed（distance 为 None）：
+    算不出哈希、这个 pot 还没评估过、距离上次评估超过 MAX_SKIP_S。
+    """
+    now = now or time.time()
+    value = frame_hash(image_path, hash_path)
+    last = load_json(state_path, default={}).get(pot)
+    if value is None or not last or not last.get("dhash") or now - last.get("assessed_at", 0) >= MAX_SKIP_S:
+        return True, None
+    distance = hamming(value, last["dhash"])
+    return distance >= threshold, distance
+
+
+def mark_assessed(image_path, pot, state_path=FRAME_STATE_FILE, hash_path=FRAME_HASH_FILE):
+    """评估成功后调用：记下这次评估用的是哪张图。"""
+    value = frame_hash(image_path, hash_path)
+    with file_lock(state_path):
+        state = load_json_for_update(state_path, default={})
+        state[pot] = {
+            "filename": os.path.basename(image_path),
+            "dhash": value,
+            "assessed_at": int(time.time()),
+        }
+        write_json_atomic(state_path, state)
@@ -0,0 +1,227 @@
+"""
+植物健康趋势：每个 pot 增量维护一份摘要（health_summary.json），
+不再为了拿最新一条去排序整个 plant_health_log.json。
+
+摘要结构：
+    {
+      "log_version": 12,     # 摘要对应的日志版本号（store_version）
+      "pots": {
+        "default": {
+          "latest": {...最新一条评估...},
+          "days": {"2025-12-07": {"sum": 9, "count": 2, "tags": {"healthy": 1, ...}}, ...}
+        }, ...
+      }
+    }
+
+- 每写一条健康评估（append_health_assessment），在摘要锁内追加日志、更新对应 pot 的 latest 和当天的桶，
+  并记下追加后的日志版本号；
+- 只保留最近 MAX_DAYS 天的桶，所以读取 7 / 30 天均值和标签频次只需要合并固定数量的桶；
+- 读取时日志版本号和摘要里记的不一致（别的途径改过日志：批量导入、归档、重置、中途崩溃），
+  或者摘要不存在 / 是老格式，就从完整日志重建；
+- 读取结果按（摘要、日志）的版本号缓存在进程内，两次写入之间不再读文件。
+"""
+import os
+from datetime import datetime, timedelta
+
+from .archive import archived_days, query_range, read_archive_file
+from .log_reader import get_reader
+from .pot_config import DEFAULT_POT, POT_INFO_FILE, get_registry
+from .storage import file_lock, load_json, load_json_for_update, write_json_atomic
+from .store_version import get_version
+from .view_cache import cached
+
+HEALTH_SUMMARY_FILE = "health_summary.json"
+WINDOWS = (7, 30)
+MAX_DAYS = max(WINDOWS)
+
+# 颜色映射：从绿到红
+HEALTH_COLORS = {
+    5: "#4CAF50",  # 绿色
+    4: "#8BC34A",  # 黄绿
+    3: "#FFC107",  # 琥珀
+    2: "#FF9800",  # 橙色
+    1: "#F44336",  # 红色
+}
+
+
+def summary_path_for(log_path):
+    return os.path.join(os.path.dirname(os.path.abspath(log_path)), HEALTH_SUMMARY_FILE)
+
+
+def _apply(summary, entry, today=None):
+    """把一条评估并入摘要（原地修改），返回 summary。"""
+    ts = entry.get("timestamp")
+    if not isinstance(ts, str):
+        return summary
+    try:
+        level = int(entry.get("health_level"))
+    except (TypeError, ValueError):
+        level = None
+
+    pot = summary.setdefault(str(entry.get("pot") or DEFAULT_POT), {"latest": None, "days": {}})
+
+    latest = pot.get("latest")
+    if latest is None or ts >= latest.get("timestamp", ""):
+        pot["latest"] = {
+            "timestamp": ts,
+            "health_level": level,
+            "reasons": entry.get("reasons") or [],
+            "suggestions": entry.get("suggestions") or [],
+            "image_path": entry.get("image_path"),
+        }
+
+    day = ts[:10]
+    bucket = pot["days"].setdefault(day, {"sum": 0, "count": 0, "tags": {}})
+    if level is not None:
+        bucket["sum"] += level
+        bucket["count"] += 1
+    reasons = entry.get("reasons") or []
+    if not isinstance(reasons, list):
+        reasons = [str(reasons)]
+    for tag in reasons:
+        bucket["tags"][tag] = bucket["tags"].get(tag, 0) + 1
+
+    # 只保留最近 MAX_DAYS 天
+    today = today or datetime.now().date()
+    oldest = (today - timedelta(days=MAX_DAYS - 1)).isoformat()
+    for old_day in [d for d in pot["days"] if d < oldest]:
+        del pot["days"][old_day]
+    return summary
+
+
+def _is_current(summary, log_path):
+    return (isinstance(summary, dict) and isinstance(summary.get("pots"), dict)
+            and summary.get("log_version") == get_version(log_path))
+
+
+def append_health_assessment(entry, log_path):
+    """追加一条健康评估到日志，并增量更新健康摘要（两者在同一把摘要锁内完成）。"""
+    path = summary_path_for(log_path)
+    with file_lock(path):
+        summary = load_json_for_update(path, default=None)
+        # 追加前摘要就和日志对得上，才能只并入这一条；否则追加后从完整历史重建
+        incremental = _is_current(summary, log_path)
+        with file_lock(log_path):
+            data = load_json_for_update(log_path, default=[])
+            if not isinstance(data, list):
+                data = [data]
+            data.append(entry)
+            write_json_atomic(log_path, data)
+            log_version = get_version(log_path)
+        print(f"[LOG] Saved record to {log_path}")
+        if incremental:
+            _apply(summary["pots"], entry)
+            summary["log_version"] = log_version
+        else:
+            summary = _build(log_path)
+        write_json_atomic(path, summary)
+    return len(data)
+
+
+def _stale_latest(log_path, pots, since, today):
+    """
+    窗口内没有记录的 pot 用它自己最新的一条（窗口外的）记录补上 latest。
+    先看热文件里窗口外的部分，再从最新的归档往前翻，直到注册过的 pot 都找到了
+    （没有注册表时找到任意一盆就停）。
+    """
+    found = {}
+
+    def take(records):
+        for entry in records:
+            if not isinstance(entry, dict) or not isinstance(entry.get("timestamp"), str):
+                continue
+            name = str(entry.get("pot") or DEFAULT_POT)
+            if name not in pots and entry["timestamp"] >= found.get(name, {}).get("timestamp", ""):
+                found[name] = entry
+
+    registry = get_registry(os.path.join(os.path.dirname(os.path.abspath(log_path)), POT_INFO_FILE))
+    wanted = set(registry.names()) - set(pots)
+    take(get_reader(log_path).range(end=since))
+    since_day = since.date().isoformat()
+    for day, path in reversed(archived_days(log_path)):
+        if (found or pots) and wanted <= set(found):
+            break
+        if day >= since_day:
+            continue  # 窗口内的归档 query_range 已经读过
+        take(read_archive_file(path))
+    for entry in found.values():
+        _apply(pots, entry, today=today)
+
+
+def _build(log_path):
+    # 先取版本号再读日志：读的过程中又有写入，记下的版本号偏旧，下次读取会再重建一次
+    log_version = get_version(log_path)
+    pots = {}
+    today = datetime.now().date()
+    since = datetime.combine(today - timedelta(days=MAX_DAYS - 1), datetime.min.time())
+    for entry in query_range(log_path, start=since):
+        if isinstance(entry, dict):
+            _apply(pots, entry, today=today)
+    # 窗口外的记录只影响 latest：每个窗口内没有记录的 pot 各自补上最新的一条
+    _stale_latest(log_path, pots, since, today)
+    return {"log_version": log_version, "pots": pots}
+
+
+def rebuild_health_summary(log_path):
+    """从日志重建摘要（批量导入、手动改日志之后调用）。"""
+    path = summary_path_for(log_path)
+    with file_lock(path):
+        summary = _build(log_path)
+        write_json_atomic(path, summary)
+    return summary
+
+
+def _load(log_path):
+    path = summary_path_for(log_path)
+    summary = load_json(path, default=None)
+    if _is_current(summary, log_path):
+        return summary
+    with file_lock(path):
+        # 拿到锁之后再看一次：可能别的进程刚重建完
+        summary = load_json_for_update(path, default=None)
+        if not _is_current(summary, log_path):
+            summary = _build(log_path)
+            write_json_atomic(path, summary)
+    return summary
+
+
+def load_health_summary(log_path):
+    """{pot: 状态}。按摘要和日志的版本号缓存，返回的 dict 是共享的，调用方不要修改。"""
+    path = summary_path_for(log_path)
+    return cached("health_summary:" + path, [path, log_path], lambda: _load(log_path)["pots"])
+
+
+# ========== 读取 ==========
+
+def summarize_pot(pot_state, today=None):
+    """把一个 pot 的状态整理成 API / 页面用的结构：最新评估、7/30 天均值、标签频次。"""
+    today = today or datetime.now().date()
+    latest = dict(pot_state.get("latest") or {})
+    if latest:
+        latest["color"] = HEALTH_COLORS.get(latest.get("health_level"), "#9E9E9E")  # 默认灰色
+
+    windows = {}
+    days = pot_state.get("days") or {}
+    for n in WINDOWS:
+        oldest = (today - timedelta(days=n - 1)).isoformat()
+        total, count, tags = 0, 0, {}
+        for day, bucket in days.items():
+            if day < oldest:
+                continue
+            total += bucket["sum"]
+            count += bucket["count"]
+            for tag, c in bucket["tags"].items():
+                tags[tag] = tags.get(tag, 0) + c
+        windows[f"{n}d"] = {
+            "assessments": count,
+            "mean_health_level": round(total / count, 2) if count else None,
+            "tags": dict(sorted(tags.items(), key=lambda kv: (-kv[1], kv[0]))),
+        }
+    return {"latest": latest or None, "windows": windows}
+
+
+def get_health_summary(log_path, pot=None):
+    """单个 pot（默认 "default"）的健康摘要；没有记录返回 None。"""
+    summary = load_health_summary(log_path)
+    state = summary.get(pot or DEFAULT_POT)
+    return summarize_pot(state) if state else None
@@ -0,0 +1,254 @@
+"""
+对外 HTTP 调用的公共层（PlantNet、OpenWeather、OpenAI ……）：
+
+- 每个 provider 一个 requests.Session，连接池按 host 复用（省掉每次的 DNS + TCP + TLS 握手）；
+- 每次请求都有超时（连接 / 读取）；
+- 连接错误、超时、429 / 5xx 有限次重试，指数退避 + 随机抖动（full jitter）；
+- 每个 provider 一个熔断器：连续失败 failure_threshold 次后打开，reset_timeout 秒内直接失败
+  （CircuitOpenError），不再让一个卡住的服务拖住整个 scheduler；之后放一个试探请求，成功就恢复；
+- stats() 返回每个 provider 的请求数、重试数、失败数、熔断次数、延迟。
+
+    resp = request("openweather", "GET", url, params=params)
+    resp.raise_for_status()
+
+requests 在第一次真正发请求时才 import（web 进程启动时不加载，见 benchmarks/bench_startup.py）。
+"""
+import time
+import random
+import threading
+
+DEFAULT_TIMEOUT = (5, 30)      # (连接, 读取) 秒
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """熔断器打开时直接抛出，不发请求。"""
+
+
+class Provider:
+    def __init__(self, name, timeout=DEFAULT_TIMEOUT, retries=2, backoff_base=0.5, backoff_max=8.0,
+                 failure_threshold=5, reset_timeout=60.0, pool_size=4):
+        self.name = name
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.pool_size = pool_size
+
+
+# 已知的 provider；没登记的名字用默认参数
+PROVIDERS = {
+    "plantnet": Provider("plantnet", timeout=(5, 60), retries=2),
+    "openweather": Provider("openweather", timeout=(5, 15), retries=3),
+    "openai": Provider("openai", timeout=(10, 120), retries=1, failure_threshold=3, reset_timeout=120.0),
+}
+
+
+# ========== 熔断器 ==========
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """能不能发请求；打开状态过了 reset_timeout 后只放行一个试探请求。"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        """记一次失败，返回这次是否导致熔断器打开。"""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                opened = self.state != self.OPEN
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                return opened
+            return False
+
+
+# ========== 每个 provider 的状态 ==========
+
+class _ProviderState:
+    def __init__(self, provider):
+        self.provider = provider
+        self.breaker = CircuitBreaker(provider.failure_threshold, provider.reset_timeout)
+        self.session = None
+        self.lock = threading.Lock()
+        self.stats = {
+            "requests": 0,        # 实际发出的 HTTP 请求（含重试）
+            "calls": 0,           # request() 调用次数
+            "retries": 0,
+            "failures": 0,        # 重试用完仍失败的调用
+            "short_circuited": 0,  # 熔断打开时直接拒绝的调用
+            "breaker_opens": 0,
+            "latency_ms_total": 0.0,
+            "latency_ms_max": 0.0,
+        }
+
+    def get_session(self):
+        if self.session is None:
+            with self.lock:
+                if self.session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=self.provider.pool_size,
+                                          pool_maxsize=self.provider.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self.session = session
+        return self.session
+
+    def count(self, key, value=1):
+        with self.lock:
+            self.stats[key] += value
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def _state(name):
+    st = _states.get(name)
+    if st is None:
+        with _states_lock:
+            st = _states.get(name)
+            if st is None:
+                st = _states[name] = _ProviderState(PROVIDERS.get(name) or Provider(name))
+    return st
+
+
+def configure(name, **kwargs):
+    """修改 / 登记 provider 参数（测试里把超时、退避调小）；会重置该 provider 的连接池和熔断器。"""
+    PROVIDERS[name] = Provider(name, **kwargs)
+    with _states_lock:
+        _states.pop(name, None)
+
+
+def backoff_delay(provider, attempt):
+    """第 attempt 次重试前等待的秒数：[0, min(max, base·2^attempt)) 里均匀随机（full jitter）。"""
+    return random.uniform(0, min(provider.backoff_max, provider.backoff_base * 2 ** attempt))
+
+
+# ========== 请求 ==========
+
+def request(name, method, url, **kwargs):
+    """
+    通过 provider name 的连接池发请求，返回 requests.Response（4xx 等不重试的错误照常返回，
+    由调用方 raise_for_status）。熔断打开时抛 CircuitOpenError，重试用完抛最后一次的异常。
+    注意：要重试的请求体必须能重复发送（bytes，而不是打开的文件对象）。
+    """
+    import requests
+
+    st = _state(name)
+    provider = st.provider
+    st.count("calls")
+    if not st.breaker.allow():
+        st.count("short_circuited")
+        raise CircuitOpenError(f"{name}: circuit open, failing fast")
+
+    kwargs.setdefault("timeout", provider.timeout)
+    session = st.get_session()
+    last_error = None
+    for attempt in range(provider.retries + 1):
+        if attempt:
+            st.count("retries")
+            time.sleep(backoff_delay(provider, attempt - 1))
+        t0 = time.perf_counter()
+        try:
+            st.count("requests")
+            resp = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            last_error = e
+            print(f"[http_client] {name} {method} 失败（第 {attempt + 1} 次）:", e)
+            continue
+        except Exception as e:
+            # 其他异常（InvalidURL、TooManyRedirects、请求体读不出 ……）不重试，但同样要记一次失败，
+            # 否则试探请求出这种错时熔断器会一直停在 half_open、不再放行任何请求
+            print(f"[http_client] {name} {method} 失败（不重试）:", e)
+            _record_failure(st)
+            raise
+        finally:
+            elapsed = (time.perf_counter() - t0) * 1000
+            with st.lock:
+                st.stats["latency_ms_total"] += elapsed
+                st.stats["latency_ms_max"] = max(st.stats["latency_ms_max"], elapsed)
+
+        if resp.status_code in RETRY_STATUS:
+            last_error = requests.HTTPError(f"{resp.status_code} from {url}", response=resp)
+            print(f"[http_client] {name} {method} 返回 {resp.status_code}（第 {attempt + 1} 次）")
+            resp.close()
+            continue
+
+        st.breaker.success()
+        return resp
+
+    _record_failure(st)
+    raise last_error
+
+
+def _record_failure(st):
+    st.count("failures")
+    if st.breaker.failure():
+        st.count("breaker_opens")
+        print(f"[http_client] {st.provider.name} 连续失败，熔断 {st.provider.reset_timeout:.0f}s")
+
+
+def call(name, fn, *args, **kwargs):
+    """
+    不走 requests 的客户端（比如 openai SDK）也用同一个熔断器和统计：
+    fn 抛异常算一次失败，熔断打开时直接抛 CircuitOpenError。
+    """
+    st = _state(name)
+    st.count("calls")
+    if not st.breaker.allow():
+        st.count("short_circuited")
+        raise CircuitOpenError(f"{name}: circuit open, failing fast")
+    t0 = time.perf_counter()
+    try:
+        st.count("requests")
+        result = fn(*args, **kwargs)
+    except Exception:
+        _record_failure(st)
+        raise
+    finally:
+        elapsed = (time.perf_counter() - t0) * 1000
+        with st.lock:
+            st.stats["latency_ms_total"] += elapsed
+            st.stats["latency_ms_max"] = max(st.stats["latency_ms_max"], elapsed)
+    st.breaker.success()
+    return result
+
+
+def stats():
+    """{provider: 计数 + 熔断器状态 + 平均延迟}"""
+    result = {}
+    for name, st in list(_states.items()):
+        with st.lock:
+            s = dict(st.stats)
+        s["breaker"] = st.breaker.state
+        s["latency_ms_avg"] = round(s["latency_ms_total"] / s["requests"], 2) if s["requests"] else None
+        result[name] = s
+    return result
@@ -0,0 +1,138 @@
+"""
+摄像头照片的读取侧：按时间列出照片、内容哈希（做 ETag 和缩略图缓存的 key）、
+按需生成缩小版本（thumb / medium），以及延时摄影用的均匀抽帧。
+
+- 照片上传后内容不再改变（.part 写完再改名），所以内容哈希按 (路径, 大小, mtime) 在进程内缓存，
+  每张图只读一遍；
+- 缩小版本存在 image_cache/<内容哈希>_<variant>.jpg，同样的内容只生成一次，
+  原图删掉 / 重新上传同名文件后哈希变了，自然不会拿到旧的缩略图；
+- 抽帧只看文件名里的时间戳（20251207_154348.jpg），不解码任何图片。
+
+生成缩小版本需要 Pillow；没装时 variant_path 返回原图路径。
+"""
+import os
+import hashlib
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_CACHE_DIR = "image_cache"
+VARIANTS = {"thumb": 160, "medium": 640}   # 长边像素
+VARIANT_QUALITY = 80
+FRAME_NAME_FORMAT = "%Y%m%d_%H%M%S.jpg"
+
+_hash_cache = {}
+_listing = {"key": None, "frames": []}
+_lock = threading.Lock()
+
+
+def frame_time(filename):
+    """"20251207_154348.jpg" -> datetime；不是摄像头照片的文件名返回 None。"""
+    try:
+        return datetime.strptime(filename, FRAME_NAME_FORMAT)
+    except ValueError:
+        return None
+
+
+def list_frames(images_dir):
+    """
+    [(ISO 时间, 文件名)]，按时间排序。目录的 mtime 不变（没有新增 / 删除文件）时直接用上次的结果。
+    上传中的 .part 文件不在列表里。
+    """
+    try:
+        key = (images_dir, os.stat(images_dir).st_mtime_ns)
+    except FileNotFoundError:
+        return []
+    if _listing["key"] == key:
+        return _listing["frames"]
+    frames = []
+    for name in os.listdir(images_dir):
+        t = frame_time(name)
+        if t is not None:
+            frames.append((t.isoformat(), name))
+    frames.sort()
+    with _lock:
+        _listing["key"], _listing["frames"] = key, frames
+    return frames
+
+
+def content_hash(path):
+    """文件内容的 sha256（前 32 位十六进制），按 (路径, 大小, mtime) 缓存。"""
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    value = _hash_cache.get(key)
+    if value is None:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        value = h.hexdigest()[:32]
+        with _lock:
+            if len(_hash_cache) > 10000:
+                _hash_cache.clear()
+            _hash_cache[key] = value
+    return value
+
+
+def variant_path(path, variant, cache_dir=IMAGE_CACHE_DIR):
+    """
+    -> (文件路径, 内容哈希)。variant 为 None / "original" 时就是原图；
+    否则返回（必要时先生成）缓存的缩小版本，哈希是缩小版本自己的 key（"<原图哈希>-<variant>"）。
+    """
+    if variant not in (None, "original", *VARIANTS):
+        raise ValueError(f"variant must be one of {['original', *VARIANTS]}")
+    digest = content_hash(path)
+    if variant in (None, "original") or Image is None:
+        return path, digest
+
+    out = os.path.join(cache_dir, f"{digest}_{variant}.jpg")
+    if not os.path.exists(out):
+        os.makedirs(cache_dir, exist_ok=True)
+        size = VARIANTS[variant]
+        tmp = f"{out}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with Image.open(path) as img:
+            img.draft("RGB", (size, size))  # JPEG 解码时直接缩小
+            img = img.convert("RGB")
+            img.thumbnail((size, size), Image.BILINEAR)
+            img.save(tmp, "JPEG", quality=VARIANT_QUALITY, optimize=True)
+        os.replace(tmp, out)
+    return out, f"{digest}-{variant}"
+
+
+def select_frames(frames, start=None, end=None, count=24):
+    """
+    [start, end) 内均匀抽 count 帧（含首尾）。frames 是 list_frames 的结果，start / end 是 ISO 字符串。
+    """
+    times = [t for t, _ in frames]
+    lo = bisect_left(times, start) if start else 0
+    hi = bisect_left(times, end) if end else len(frames)
+    window = frames[lo:hi]
+    if count <= 0 or len(window) <= count:
+        return window
+    if count == 1:
+        return [window[-1]]
+    step = (len(window) - 1) / (count - 1)
+    return [window[round(i * step)] for i in range(count)]
+
+
+def dedupe_frames(frames, hashes, threshold):
+    """
+    去掉和前一张保留帧几乎一样的帧（感知哈希汉明距离 < threshold，见 frame_hash），
+    只查 hashes（上传时算好的），没有哈希的帧一律保留。
+    """
+    from .frame_hash import hamming
+
+    kept, last = [], None
+    for t, name in frames:
+        value = hashes.get(name)
+        if value and last and hamming(value, last) < threshold:
+            continue
+        kept.append((t, name))
+        if value:
+            last = value
+    return kept
@@ -1,9 +1,10 @@
 # main.py
+import json
+
 from .plant_recognition_module import identify_plant_plantnet, extract_scientific_name
 from .weather_module import get_24h_forecast
 # from soil_moisture_module import TODO
 
-from .ai_module import call_irrigation_assistant
 from .ai_test import assess_health_and_irrigation
 
 PLANTNET_API_KEY = ""
@@ -22,9 +23,10 @@ def irrigation_plan(
         sensor_log["soil_moisture_percent"], sensor_log["light_lux"], sensor_log["soil_temperature_c"], sensor_log["air_temperature_c"], sensor_log["air_humidity_percent"] 
 
     # 2. Get Weather
+    forecast = get_24h_forecast() or {}
     will_rain_next_24h, rain_mm_next_24h, max_temp_next_24h_c = \
-        get_24h_forecast()["rain_expected"], get_24h_forecast()["max_rain"], get_24h_forecast()["max_temperature"]
-    print("🌧️ Weather Forecast: ", get_24h_forecast())
+        forecast.get("rain_expected"), forecast.get("max_rain"), forecast.get("max_temperature")
+    print("🌧️ Weather Forecast: ", forecast)
 
 
     # 3. Irrigation Plan
@@ -54,17 +56,16 @@ def irrigation_plan(
     return irrigation_plan
 
 
-import json
 if __name__ == "__main__":
     image_path = "image.jpg"
     plantnet_result = identify_plant_plantnet(image_path, PLANTNET_API_KEY)
     sci_name = extract_scientific_name(plantnet_result)
     print("✅ Plant Name:", sci_name)
 
-    pot_path = "pot_info.json"
-    with open(pot_path,"r") as f:
-        pot_info = json.load(f)
-    pot_diameter, pot_height = pot_info["pot_diameter"], pot_info["pot_height"]
+    from .pot_config import get_pot
+
+    pot_config = get_pot()
+    pot_diameter, pot_height = pot_config.pot_diameter, pot_config.pot_height
  
     irrigation_plan(
                     image_path=image_path,
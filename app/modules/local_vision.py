@@ -0,0 +1,239 @@
+"""
+本地视觉模型（CPU，ONNX）：照片 -> 健康等级 + reasons 标签，结果结构和大模型回复一样
+（{"health": {...}, "irrigation": {...}}，经 assessment_schema.validate 校验），
+置信度够高的盆直接用本地结果（毫秒级），不够的才交给 batch_assess 调远程模型。
+
+模型文件（不随仓库提供，自己训练 / 导出后放进来）：
+    models/plant_health.onnx    输入 float32 [N, 3, S, S]（RGB，按 mean / std 归一化）
+                                输出 health_logits [N, 5]（等级 1..5）、tag_logits [N, T]（多标签，sigmoid）
+    models/plant_health.json    {"input_size": 224, "mean": [..3], "std": [..3], "tags": [T 个标签]}
+                                tags 必须是 records.HEALTH_TAGS 里的标签
+
+依赖 numpy / Pillow / onnxruntime 都是可选的，缺任何一个或没有模型文件时 available() 为 False，
+一切照旧走远程模型。浇水建议不看图：按湿度和花盆容积用简单规则算（见 irrigation_rule）。
+
+    python -m modules.local_vision images/20251207_154348.jpg images/20251207_154457.jpg
+"""
+import os
+import sys
+import math
+import time
+
+from .assessment_schema import AssessmentError, validate
+from .records import HEALTH_TAGS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+MODEL_PATH = os.environ.get("PLANT_HEALTH_MODEL", "models/plant_health.onnx")
+MIN_CONFIDENCE = 0.75     # 健康等级 softmax 最大概率低于这个就交给远程模型
+TAG_THRESHOLD = 0.5
+SOIL_WATER_CAPACITY = 0.4  # 盆土体积里能存水的比例，估算浇水量用
+DEFAULT_BAND = (30, 60)
+
+# reasons 标签 -> 一句建议（本地模型不会写句子，schema 又要求 suggestions 非空）
+TAG_SUGGESTIONS = {
+    "need more light": "Move the pot to a brighter spot.",
+    "need less light": "Shade the plant during the midday sun.",
+    "light inconsistent": "Keep the pot in a place with steady light.",
+    "drainage issue": "Check that the drainage holes are not blocked.",
+    "temperature too high": "Protect the plant from heat in the afternoon.",
+    "temperature too low": "Move the plant somewhere warmer at night.",
+    "temperature fluctuating": "Avoid spots with strong temperature swings.",
+    "pest suspected": "Inspect the leaves for pests.",
+    "disease suspected": "Remove damaged leaves and watch for spread.",
+    "fungus suspected": "Improve air flow and avoid wetting the leaves.",
+    "need pruning": "Prune crowded or dead stems.",
+    "nutrient deficiency suspected": "Apply a balanced fertilizer.",
+    "overgrowth": "Trim back the fastest-growing stems.",
+    "weak growth": "Check light and nutrients.",
+    "environmental stress": "Keep conditions stable for a few days.",
+    "uncertain assessment": "Take a clearer photo for the next check.",
+    "healthy": "Keep the current care routine.",
+}
+
+
+# ========== 模型 ==========
+
+class LocalVisionModel:
+    def __init__(self, model_path=MODEL_PATH):
+        from .codec import loads
+
+        meta_path = os.path.splitext(model_path)[0] + ".json"
+        with open(meta_path, "rb") as f:
+            meta = loads(f.read())
+        self.size = int(meta.get("input_size", 224))
+        self.mean = np.asarray(meta.get("mean", [0.485, 0.456, 0.406]), dtype=np.float32).reshape(3, 1, 1)
+        self.std = np.asarray(meta.get("std", [0.229, 0.224, 0.225]), dtype=np.float32).reshape(3, 1, 1)
+        self.tags = list(meta["tags"])
+        unknown = [t for t in self.tags if t not in HEALTH_TAGS]
+        if unknown:
+            raise ValueError(f"model tags not in HEALTH_TAGS: {unknown}")
+
+        options = ort.SessionOptions()
+        threads = os.environ.get("PLANT_HEALTH_THREADS")
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def preprocess(self, image_path):
+        with Image.open(image_path) as img:
+            # JPEG 解码时直接按 1/2、1/4、1/8 缩小（DCT 缩放），比解完整图再缩快很多
+            img.draft("RGB", (self.size * 2, self.size * 2))
+            img = img.convert("RGB").resize((self.size, self.size), Image.BILINEAR)
+            arr = np.asarray(img, dtype=np.float32).transpose(2, 0, 1) / 255.0
+        return (arr - self.mean) / self.std
+
+    def predict(self, image_paths):
+        """
+        一次前向算完整批照片。返回与 image_paths 等长的
+        [{"health_level", "confidence", "reasons"}]。
+        """
+        if not image_paths:
+            return []
+        batch = np.stack([self.preprocess(p) for p in image_paths])
+        health_logits, tag_logits = self.session.run(None, {self.input_name: batch})[:2]
+
+        z = health_logits - health_logits.max(axis=1, keepdims=True)
+        probs = np.exp(z) / np.exp(z).sum(axis=1, keepdims=True)
+        tag_probs = 1 / (1 + np.exp(-tag_logits))
+
+        out = []
+        for p, tp in zip(probs, tag_probs):
+            order = [i for i in np.argsort(-tp) if tp[i] >= TAG_THRESHOLD][:4]
+            out.append({
+                "health_level": int(p.argmax()) + 1,
+                "confidence": float(p.max()),
+                "reasons": [self.tags[i] for i in order] or ["uncertain assessment"],
+            })
+        return out
+
+
+_models = {}
+
+
+def available(model_path=MODEL_PATH):
+    return None not in (np, Image, ort) and os.path.exists(model_path)
+
+
+def get_model(model_path=MODEL_PATH):
+    """每个进程加载一次（加载 + 第一次推理要几百毫秒，之后常驻内存）。"""
+    model = _models.get(model_path)
+    if model is None:
+        model = _models[model_path] = LocalVisionModel(model_path)
+    return model
+
+
+def warm_up(model_path=MODEL_PATH):
+    """进程启动时调用：加载模型并跑一次空输入，把第一次推理的开销提前付掉。不可用时返回 False。"""
+    if not available(model_path):
+        return False
+    model = get_model(model_path)
+    model.session.run(None, {model.input_name: np.zeros((1, 3, model.size, model.size), dtype=np.float32)})
+    print(f"[local_vision] 模型已加载: {model_path}")
+    return True
+
+
+# ========== 组装成和远程模型一样的结果 ==========
+
+def irrigation_rule(inp, band=DEFAULT_BAND):
+    """
+    不看图的浇水规则：湿度低于下限就浇到区间中点，
+    水量 = 花盆容积（π r² h，cm³ = ml） × SOIL_WATER_CAPACITY × 需要补的湿度百分比。
+    """
+    low, high = band
+    moisture = inp.get("soil_moisture_percent")
+    if moisture is None:
+        return {"should_water": False, "water_ml": 0, "target_soil_moisture_percent_min": low,
+                "target_soil_moisture_percent_max": high, "note": "No valid soil moisture reading."}
+    try:
+        volume = math.pi * (float(inp["pot_diameter"]) / 2) ** 2 * float(inp["pot_height"])
+    except (KeyError, TypeError, ValueError):
+        volume = 5000.0
+    if inp.get("will_rain_next_24h") and (inp.get("rain_mm_next_24h") or 0) >= 5:
+        low = max(low - 5, 0)  # 明天有明显降雨：下限放宽一点
+    if moisture >= low:
+        return {"should_water": False, "water_ml": 0, "target_soil_moisture_percent_min": low,
+                "target_soil_moisture_percent_max": high, "note": "Soil moisture is within the target range."}
+    water_ml = int(round(volume * SOIL_WATER_CAPACITY * ((low + high) / 2 - moisture) / 100, -1))
+    return {"should_water": water_ml > 0, "water_ml": water_ml, "target_soil_moisture_percent_min": low,
+            "target_soil_moisture_percent_max": high, "note": "Soil moisture is below the target range."}
+
+
+def to_result(prediction, inp, band=DEFAULT_BAND):
+    """本地预测 + 浇水规则 -> 经过 schema 校验的结果。"""
+    suggestions = [TAG_SUGGESTIONS[t] for t in prediction["reasons"]][:5]
+    return validate({
+        "health": {
+            "health_level": prediction["health_level"],
+            "reasons": prediction["reasons"],
+            "suggestions": suggestions,
+        },
+        "irrigation": irrigation_rule(inp, band),
+    })
+
+
+def assess_with_local_model(inputs, min_confidence=MIN_CONFIDENCE, model_path=MODEL_PATH,
+                            write_logs=True, **remote_kwargs):
+    """
+    先用本地模型一次推理所有盆；置信度 >= min_confidence 的直接用，其余交给 batch_assess.assess_batch。
+    返回和 assess_batch 一样的结构，另加 "local": 本地判定的盆数。
+    """
+    from .ai_test import record_assessment
+    from .batch_assess import TEXT_FIELDS, assess_batch
+
+    results, remote = {}, list(inputs)
+    if inputs and available(model_path):
+        try:
+            predictions = get_model(model_path).predict([inp["image_path"] for inp in inputs])
+        except Exception as e:
+            print("[local_vision] 推理失败，全部走远程模型:", e)
+            predictions = [None] * len(inputs)
+        remote = []
+        for inp, pred in zip(inputs, predictions):
+            if pred is None or pred["confidence"] < min_confidence:
+                remote.append(inp)
+                continue
+            try:
+                result = to_result(pred, inp)
+            except AssessmentError as e:
+                print(f"[local_vision] {inp['pot']} 结果无效:", e)
+                remote.append(inp)
+                continue
+            results[inp["pot"]] = result
+            if write_logs:
+                record_assessment(result, image_path=inp["image_path"], pot=inp["pot"], source="local_model",
+                                  **{key: inp.get(key) for key in TEXT_FIELDS})
+
+    outcome = assess_batch(remote, write_logs=write_logs, **remote_kwargs) if remote \
+        else {"results": {}, "errors": {}, "calls": 0}
+    outcome["results"].update(results)
+    outcome["local"] = len(results)
+    return outcome
+
+
+if __name__ == "__main__":
+    if not available():
+        print("local model not available (needs numpy, Pillow, onnxruntime and", MODEL_PATH + ")")
+        sys.exit(1)
+    warm_up()
+    paths = sys.argv[1:]
+    t0 = time.perf_counter()
+    predictions = get_model().predict(paths)
+    elapsed = (time.perf_counter() - t0) * 1000
+    for path, pred in zip(paths, predictions):
+        print(path, pred)
+    print(f"{len(paths)} images in {elapsed:.1f} ms ({elapsed / max(len(paths), 1):.1f} ms/image)")
@@ -0,0 +1,232 @@
+"""
+大日志文件的只读 mmap 读取器。
+
+json.load 会把整个日志变成 Python dict，每个请求、每个 worker 各一份。
+LogReader 改为：
+
+- mmap 映射日志文件（多个 worker 共享操作系统的 page cache，不额外占进程内存）；
+- 扫一遍建立紧凑的偏移索引：每条记录的起止位置 + 时间戳，存在 array 里（每条 24 字节）；
+- 查询时先在时间戳数组上过滤 / 二分，只有命中的记录才 json 解码。
+
+日志通过 storage 原子替换写入，版本号（store_version）变化时重新映射；
+如果只是在末尾追加了记录（首尾记录的字节都没变），只扫描新增部分。
+"""
+import os
+import re
+import mmap
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import datetime
+
+from . import codec
+from .store_version import get_version
+
+# 字符串（含转义）或者括号；字符串整体跳过，括号用来数嵌套层级
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]')
+_ARRAY_START = re.compile(rb'\s*\[')
+# 数组里下一个元素的开头：{ 或者数组结束的 ]
+_ELEMENT = re.compile(rb'[\s,]*([{\]])')
+_TIMESTAMP = re.compile(rb'"timestamp"\s*:\s*"([^"]*)"')
+_EPOCH = datetime(1970, 1, 1)
+_NAN = float("nan")
+
+# Windows 上被 mmap 的文件不能被 os.replace 覆盖，只能整块读进内存（仍然按需解码）
+_USE_MMAP = os.name != "nt"
+
+
+def to_seconds(value):
+    """datetime / ISO 字符串 -> 从 1970-01-01 起的秒数（不考虑时区），无法解析返回 NaN。"""
+    try:
+        dt = value if isinstance(value, datetime) else datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return _NAN
+    return (dt.replace(tzinfo=None) - _EPOCH).total_seconds()
+
+
+class LogReader:
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._version = None
+        self._buf = b""
+        self.starts = array("q")
+        self.ends = array("q")
+        self.times = array("d")
+        self.sorted = True
+
+    # ---------- 索引维护 ----------
+
+    def _open(self):
+        try:
+            with open(self.path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size == 0:
+                    return b""
+                if _USE_MMAP:
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                return f.read()
+        except FileNotFoundError:
+            return b""
+
+    def _can_extend(self, buf):
+        """新文件是不是旧文件在末尾追加的结果：首条、末条记录的字节和位置都没变。"""
+        n = len(self.starts)
+        if n == 0 or len(buf) < self.ends[-1]:
+            return False
+        for i in (0, n - 1):
+            s, e = self.starts[i], self.ends[i]
+            if buf[s:e] != self._buf[s:e]:
+                return False
+        return True
+
+    def _add(self, buf, start, end, raw=None):
+        raw = buf[start:end] if raw is None else raw
+        ts = _TIMESTAMP.search(raw)
+        t = to_seconds(ts.group(1).decode("utf-8", "replace")) if ts else _NAN
+        times = self.times
+        # 没有时间戳（NaN）或者时间倒退，都不能再用二分
+        if t != t or (times and t < times[-1]):
+            self.sorted = False
+        self.starts.append(start)
+        self.ends.append(end)
+        times.append(t)
+
+    def _scan_nested(self, buf, pos):
+        """慢路径：逐 token 扫描，直到下一个顶层对象结束；返回其后的位置，数组结束返回 None。"""
+        depth, start = 1, None
+        for m in _TOKEN.finditer(buf, pos):
+            c = m.group()[:1]
+            if c == b'"':
+                continue
+            if c in b"{[":
+                if depth == 1 and c == b"{":
+                    start = m.start()
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 1 and start is not None:
+                    self._add(buf, start, m.end())
+                    return m.end()
+                if depth == 0:
+                    return None
+        return None
+
+    def _scan(self, buf, pos, in_array):
+        if not in_array:
+            m = _ARRAY_START.match(buf, pos)
+            if not m:
+                return  # 顶层不是数组（比如 pot_info.json），没有记录
+            pos = m.end()
+        while True:
+            m = _ELEMENT.match(buf, pos)
+            if not m or m.group(1) == b"]":
+                return  # 数组结束（或文件被截断）
+            start = m.start(1)
+            # 快路径：到下一个 } 为止没有嵌套的 {、没有转义引号、引号成对，
+            # 说明这个 } 不在字符串里，就是记录的结尾（全部是 C 实现的 find / count）
+            end = buf.find(b"}", start) + 1
+            if end:
+                raw = buf[start:end]
+                if raw.find(b"{", 1) == -1 and raw.find(b'\\"') == -1 and raw.count(b'"') % 2 == 0:
+                    self._add(buf, start, end, raw)
+                    pos = end
+                    continue
+            pos = self._scan_nested(buf, start)
+            if pos is None:
+                return
+
+    def refresh(self):
+        version = get_version(self.path)
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            buf = self._open()
+            if self._can_extend(buf):
+                self._scan(buf, self.ends[-1], in_array=True)
+            else:
+                self.starts, self.ends, self.times = array("q"), array("q"), array("d")
+                self.sorted = True
+                self._scan(buf, 0, in_array=False)
+            self._buf = buf
+            self._version = version
+
+    def snapshot(self):
+        """
+        (buf, n, starts, ends, times, sorted) 的一致快照，只能访问前 n 条。
+        追加时数组原地扩展、旧下标对应的字节不变；重建时换成新对象，所以旧快照一直可用。
+        """
+        self.refresh()
+        with self._lock:
+            return self._buf, len(self.starts), self.starts, self.ends, self.times, self.sorted
+
+    # ---------- 读取 ----------
+
+    def __len__(self):
+        return self.snapshot()[1]
+
+    def last(self):
+        """文件里的最后一条记录，没有则返回 None。"""
+        buf, n, starts, ends, _, _ = self.snapshot()
+        return codec.loads(buf[starts[n - 1]:ends[n - 1]]) if n else None
+
+    def latest(self):
+        """时间戳最大的一条记录（时间戳乱序也正确），没有则返回 None。"""
+        buf, n, starts, ends, times, is_sorted = self.snapshot()
+        if not n:
+            return None
+        if is_sorted:
+            best = n - 1
+        else:
+            valid = [i for i in range(n) if times[i] == times[i]]
+            if not valid:
+                return None
+            best = max(valid, key=times.__getitem__)
+        return codec.loads(buf[starts[best]:ends[best]])
+
+    def tail(self, cursor=None):
+        """
+        增量读取：-> (新 cursor, 记录列表, appended)。cursor 传上一次返回的值（第一次传 None）。
+        文件只是在末尾追加了记录时只解码新增的部分（appended=True）；
+        第一次调用或文件被重写过（比如归档）时返回全部记录，appended=False。
+        """
+        buf, n, starts, ends, _, _ = self.snapshot()
+        if cursor is not None and cursor[0] is starts and cursor[1] <= n:
+            first, appended = cursor[1], True
+        else:
+            first, appended = 0, False
+        records = [codec.loads(buf[starts[k]:ends[k]]) for k in range(first, n)]
+        return (starts, n), records, appended
+
+    def range(self, start=None, end=None):
+        """
+        按文件顺序逐条解码 [start, end) 内的记录（没有时间戳的记录不返回）。
+        过滤只看时间戳数组；时间戳有序时直接二分。
+        """
+        buf, n, starts, ends, times, is_sorted = self.snapshot()
+        lo = to_seconds(start) if start is not None else float("-inf")
+        hi = to_seconds(end) if end is not None else float("inf")
+        if is_sorted:
+            i = bisect_left(times, lo, 0, n) if start is not None else 0
+            j = bisect_left(times, hi, 0, n) if end is not None else n
+            positions = range(i, j)
+        else:
+            positions = [k for k in range(n) if lo <= times[k] < hi]
+        for k in positions:
+            yield codec.loads(buf[starts[k]:ends[k]])
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_reader(path):
+    """每个进程每个文件一个 LogReader。"""
+    path = os.path.abspath(path)
+    reader = _readers.get(path)
+    if reader is None:
+        with _readers_lock:
+            reader = _readers.setdefault(path, LogReader(path))
+    return reader
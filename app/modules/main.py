@@ -1,7 +1,7 @@
-import json
-
-from .irrigation_plan import irrigation_plan
+# irrigation_plan 会连带 import ai_test（openai SDK），web 端只用 check_plant_name，
+# 所以放到 main() 里再导入，保证 app.py 冷启动不加载这些重依赖
 from .plant_recognition_module import identify_plant_plantnet, extract_scientific_name
+from .store_version import bump_version
 
 
 PLANTNET_API_KEY = ""
@@ -16,21 +16,26 @@ def check_plant_name():
                     plantnet_result = identify_plant_plantnet(image_path, PLANTNET_API_KEY)
                     plant_name = extract_scientific_name(plantnet_result)
                     f.write(plant_name)
+                bump_version("sci_name.txt")
     except FileNotFoundError:
         with open("sci_name.txt", "w") as f:
             image_path = "image.jpg"
             plantnet_result = identify_plant_plantnet(image_path, PLANTNET_API_KEY)
             plant_name = extract_scientific_name(plantnet_result)
             f.write(plant_name)
+        bump_version("sci_name.txt")
     return plant_name
 
-def get_pot_info():
-    with open("pot_info.json","r") as f:
-        pot_info = json.load(f)
-    pot_diameter, pot_height = pot_info["pot_diameter"], pot_info["pot_height"]
-    return pot_diameter, pot_height
+def get_pot_info(pot=None):
+    from .pot_config import DEFAULT_POT, get_pot
+
+    config = get_pot(pot)
+    if config is None:
+        raise ValueError("pot_info.json has no configuration for pot " + (pot or DEFAULT_POT))
+    return config.pot_diameter, config.pot_height
 
 def main():
+    from .irrigation_plan import irrigation_plan
 
     # Check if the plant is identified    
     plant_name = check_plant_name()
@@ -0,0 +1,212 @@
+"""
+MQTT 入库桥：设备把读数发布到按 pot 分的 topic，bridge 订阅后批量写进和 /upload 相同的存储。
+
+    plants/<pot>/sensor        JSON 读数（字段同 /upload）
+    plants/<pot>/sensor/bin    telemetry.py 定义的二进制帧（可多条首尾相连）
+
+收到的读数先校验（SensorReading）放进缓冲，攒够 batch_size 条或每隔 flush_interval 秒
+统一做一次异常检测 + 一次日志追加（anomaly.ingest_readings），
+而不是每条读数一次 HTTP 请求、一次加锁重写日志。
+
+运行（需要 paho-mqtt 和一个本地 broker，比如 mosquitto）：
+
+    python -m modules.mqtt_bridge --host 127.0.0.1 --port 1883
+
+测试 / 压测可以用进程内的 LocalBroker 代替真正的 broker。
+"""
+import time
+import argparse
+import threading
+from datetime import datetime
+
+from . import codec, telemetry
+from .anomaly import ingest_readings
+from .records import SensorReading
+
+try:
+    import paho.mqtt.client as paho_mqtt
+except ImportError:
+    paho_mqtt = None
+
+TOPIC_PREFIX = "plants"
+JSON_FILTER = TOPIC_PREFIX + "/+/sensor"
+BIN_FILTER = TOPIC_PREFIX + "/+/sensor/bin"
+
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT 通配：+ 匹配一层，# 匹配剩下所有层。"""
+    f_parts, t_parts = topic_filter.split("/"), topic.split("/")
+    for i, f in enumerate(f_parts):
+        if f == "#":
+            return True
+        if i >= len(t_parts) or (f != "+" and f != t_parts[i]):
+            return False
+    return len(f_parts) == len(t_parts)
+
+
+# ========== 进程内 broker（测试 / 压测用） ==========
+
+class LocalBroker:
+    """最小的进程内 broker：publish 同步调用所有匹配的订阅回调 callback(topic, payload)。"""
+
+    def __init__(self):
+        self._subs = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic_filter, callback):
+        with self._lock:
+            self._subs.append((topic_filter, callback))
+
+    def publish(self, topic, payload):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        for topic_filter, callback in list(self._subs):
+            if topic_matches(topic_filter, topic):
+                callback(topic, payload)
+
+
+# ========== paho-mqtt 适配 ==========
+
+class PahoSource:
+    """把 paho 客户端包装成和 LocalBroker 一样的 subscribe(topic_filter, callback) 接口。"""
+
+    def __init__(self, host="127.0.0.1", port=1883, client_id="plant-bridge"):
+        if paho_mqtt is None:
+            raise RuntimeError("MQTT bridge 需要安装 paho-mqtt（pip install paho-mqtt）")
+        try:
+            self.client = paho_mqtt.Client(paho_mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+        except AttributeError:  # paho-mqtt 1.x
+            self.client = paho_mqtt.Client(client_id=client_id)
+        self._filters = []
+        self.client.on_connect = self._on_connect
+        self.client.connect(host, port)
+        self.client.loop_start()
+
+    def _on_connect(self, client, userdata, *args):
+        # 断线重连后重新订阅
+        for topic_filter in self._filters:
+            client.subscribe(topic_filter, qos=1)
+
+    def subscribe(self, topic_filter, callback):
+        self._filters.append(topic_filter)
+        self.client.message_callback_add(topic_filter, lambda c, u, msg: callback(msg.topic, msg.payload))
+        self.client.subscribe(topic_filter, qos=1)
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+# ========== bridge ==========
+
+class MqttBridge:
+    def __init__(self, log_path, batch_size=DEFAULT_BATCH_SIZE, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.received = 0
+        self.dropped = 0
+        self.written = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # 同一时间只有一个 flush 在写
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, source):
+        source.subscribe(JSON_FILTER, self.on_message)
+        source.subscribe(BIN_FILTER, self.on_message)
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+        print(f"[mqtt_bridge] 订阅 {JSON_FILTER}, {BIN_FILTER} -> {self.log_path}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    # ---------- 收消息 ----------
+
+    def on_message(self, topic, payload):
+        parts = topic.split("/")
+        pot = parts[1] if len(parts) > 2 else None
+        try:
+            if topic.endswith("/bin"):
+                readings = telemetry.decode(payload)
+            else:
+                data = codec.loads(payload)
+                if not isinstance(data, dict):
+                    raise ValueError("json must be object")
+                readings = [data]
+            now = datetime.now()
+            records = [
+                SensorReading.from_dict({
+                    **r,
+                    "pot": pot,
+                    "timestamp": now.isoformat(timespec="seconds"),
+                    "date": now.date().isoformat(),
+                    "remote_addr": "mqtt",
+                }).to_dict()
+                for r in readings
+            ]
+        except Exception as e:
+            self.dropped += 1
+            print("[mqtt_bridge] 丢弃消息:", topic, "error:", e)
+            return
+
+        with self._lock:
+            self.received += len(records)
+            self._pending.extend(records)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    # ---------- 批量写 ----------
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                total, _ = ingest_readings(batch, self.log_path)
+            except Exception as e:
+                # 写失败放回缓冲，下次再试
+                print("[mqtt_bridge] 写入失败，稍后重试:", e)
+                with self._lock:
+                    self._pending[:0] = batch
+                return 0
+            self.written += len(batch)
+            print(f"[mqtt_bridge] 写入 {len(batch)} 条，日志共 {total} 条")
+            return len(batch)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="订阅 MQTT 传感器 topic，批量写入 sensor_log.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--log", default="sensor_log.json", help="写入的传感器日志")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL)
+    args = parser.parse_args()
+
+    bridge = MqttBridge(args.log, batch_size=args.batch_size, flush_interval=args.flush_interval)
+    source = PahoSource(args.host, args.port)
+    bridge.start(source)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        bridge.stop()
+        source.close()
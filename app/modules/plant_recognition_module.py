@@ -1,7 +1,9 @@
 # identify_plant.py
-import requests
+import os
 
 def identify_plant_plantnet(image_path: str, api_key: str) -> dict:
+    from .http_client import request  # 连接池 + 超时 + 重试 + 熔断（requests 在这里才加载）
+
     base_url = "https://my-api.plantnet.org/v2/identify/all"
 
     params = {
@@ -17,17 +19,21 @@ def identify_plant_plantnet(image_path: str, api_key: str) -> dict:
         "organs": "auto"   #"flower" / "fruit" / "bark" / "auto"
     }
 
+    # 先读成 bytes：重试时请求体要能重复发送
     with open(image_path, "rb") as f:
-        files = [
-            ("images", (image_path, f, "image/jpeg"))
-        ]
-
-        resp = requests.post(
-            base_url,
-            params=params,
-            data=data,
-            files=files
-        )
+        image_bytes = f.read()
+    files = [
+        ("images", (os.path.basename(image_path), image_bytes, "image/jpeg"))
+    ]
+
+    resp = request(
+        "plantnet",
+        "POST",
+        base_url,
+        params=params,
+        data=data,
+        files=files
+    )
 
     resp.raise_for_status()
     return resp.json()
@@ -0,0 +1,195 @@
+"""
+花盆配置注册表：pot_info.json 只在变化时解析一次，之后所有模块从内存里查（类型已校验）。
+
+文件格式（两种都能读）：
+    旧格式，单盆（当作 pot "default"）：
+        {"pot_diameter": "50.0", "pot_height": "30.0", "latitude": "40.8", "longitude": "-73.9"}
+    多盆：
+        {"pots": {"default": {...}, "balcony": {...}}}
+写入（save_pot_config）统一写成多盆格式。
+
+数值字段不管文件里是字符串（/save_pot 以前这样存）还是数字，都转成 float；空字符串当作未设置。
+
+什么时候重新解析：
+- 本系统的写入（save_json / write_json_atomic）会递增 store_version 里的版本号，
+  每次查询比较版本号（mmap 里读一个整数，没有系统调用），变了立即重载，多进程也一致；
+- 手工编辑文件不会递增版本号，所以另外每 STAT_INTERVAL_S 秒 stat 一次看 mtime。
+文件内容无效时保留上一次的配置并打印错误。
+
+    pot = get_pot()               # PotConfig 或 None
+    pot.pot_diameter, pot.latitude
+    get_registry().locations()    # [(lat, lon), ...]
+"""
+import os
+import time
+import threading
+
+from .records import Record, text
+from .storage import file_lock, load_json, load_json_for_update, write_json_atomic
+from .store_version import get_version
+
+DEFAULT_POT = "default"   # 旧的单盆配置、没有 pot 字段的历史记录都归到这一盆
+POT_INFO_FILE = "pot_info.json"
+STAT_INTERVAL_S = 2.0
+
+
+def coerced_number(name, value, low=None, high=None):
+    """数字或数字字符串 -> float；None / "" -> None。"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be a number")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number") from None
+    if number != number or number in (float("inf"), float("-inf")):
+        raise ValueError(f"{name} must be finite")
+    if (low is not None and number < low) or (high is not None and number > high):
+        raise ValueError(f"{name} must be in {low}..{high}")
+    return number
+
+
+def size_cm(name, value):
+    number = coerced_number(name, value, low=0)
+    if number == 0:
+        raise ValueError(f"{name} must be > 0")
+    return number
+
+
+def percent(name, value):
+    return coerced_number(name, value, low=0, high=100)
+
+
+def latitude(name, value):
+    return coerced_number(name, value, low=-90, high=90)
+
+
+def longitude(name, value):
+    return coerced_number(name, value, low=-180, high=180)
+
+
+class PotConfig(Record):
+    FIELDS = {
+        "pot_diameter": size_cm,   # cm
+        "pot_height": size_cm,     # cm
+        "latitude": latitude,
+        "longitude": longitude,
+        "plant_name": text,
+        "device": text,            # 给这盆浇水的板子（hardware/main.py 的 DEVICE_NAME），水泵命令发给它
+        "moisture_min": percent,   # 土壤湿度下限（%），低于它就评估 / 浇水；不填用 AI 上次给的下限
+        "updated_at": text,
+    }
+    __slots__ = tuple(FIELDS) + ("name",)
+
+    @classmethod
+    def from_dict(cls, data, name=DEFAULT_POT):
+        rec = super().from_dict(data)
+        rec.name = name
+        return rec
+
+    @property
+    def location(self):
+        """(lat, lon)；没填完整返回 None。"""
+        lat, lon = self.get("latitude"), self.get("longitude")
+        return None if lat is None or lon is None else (lat, lon)
+
+
+def parse_config(data):
+    """文件内容 -> {pot 名: PotConfig}；任何一盆无效都抛 ValueError（指明是哪一盆）。"""
+    if not isinstance(data, dict):
+        raise ValueError("pot config must be a JSON object")
+    pots = data["pots"] if "pots" in data else ({DEFAULT_POT: data} if data else {})
+    if not isinstance(pots, dict):
+        raise ValueError("pots must be a JSON object")
+    result = {}
+    for name, values in pots.items():
+        try:
+            result[name] = PotConfig.from_dict(values, name=name)
+        except ValueError as e:
+            raise ValueError(f"pot {name}: {e}") from None
+    return result
+
+
+class PotRegistry:
+    def __init__(self, path=POT_INFO_FILE):
+        self.path = path
+        self._pots = {}
+        self._version = None
+        self._stat = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fresh(self):
+        version = get_version(self.path)
+        now = time.monotonic()
+        if version == self._version and now - self._checked_at < STAT_INTERVAL_S:
+            return self._pots
+        try:
+            st = os.stat(self.path)
+            stat = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stat = None
+        with self._lock:
+            self._checked_at = now
+            if version != self._version or stat != self._stat:
+                try:
+                    self._pots = parse_config(load_json(self.path, default={}))
+                except ValueError as e:
+                    print("[pot_config] 配置无效，继续使用上一次的配置:", e)
+                self._version, self._stat = version, stat
+        return self._pots
+
+    def get(self, pot=None):
+        return self._fresh().get(pot or DEFAULT_POT)
+
+    def all(self):
+        return dict(self._fresh())
+
+    def names(self):
+        return list(self._fresh())
+
+    def locations(self):
+        """所有花盆的位置（去重，保持顺序），给天气预报后台刷新用。"""
+        seen = []
+        for pot in self._fresh().values():
+            loc = pot.location
+            if loc is not None and loc not in seen:
+                seen.append(loc)
+        return seen
+
+
+_registries = {}
+
+
+def get_registry(path=POT_INFO_FILE):
+    registry = _registries.get(path)
+    if registry is None:
+        registry = _registries.setdefault(path, PotRegistry(path))
+    return registry
+
+
+def get_pot(pot=None, path=POT_INFO_FILE):
+    return get_registry(path).get(pot)
+
+
+def pot_form(pot=None, path=POT_INFO_FILE):
+    """给模板（setup.html / base.html 的花盆表单）用的 dict；没有配置时为 {}。"""
+    config = get_pot(pot, path)
+    return config.to_dict() if config is not None else {}
+
+
+def save_pot_config(values, pot=None, path=POT_INFO_FILE):
+    """校验并保存一盆的配置（其他盆不变），返回 PotConfig；无效时抛 ValueError，文件不动。"""
+    name = pot or DEFAULT_POT
+    config = PotConfig.from_dict(values, name=name)
+    with file_lock(path):
+        data = load_json_for_update(path, default={})
+        try:
+            pots = {n: p.to_dict() for n, p in parse_config(data).items()}
+        except ValueError as e:
+            print("[pot_config] 旧配置无效，只保留这次保存的花盆:", e)
+            pots = {}
+        pots[name] = config.to_dict()
+        write_json_atomic(path, {"pots": pots})
+    return config
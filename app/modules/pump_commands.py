@@ -0,0 +1,232 @@
+"""
+服务器 -> 设备的水泵命令通道：每台设备一个命令队列，设备长轮询取命令，确认后闭环。
+
+    scheduler 决定浇水 ──enqueue──> pump_commands.json ──长轮询──> ESP32 开泵
+                                                            ──ack "started"──> 记下开泵时间
+                                                            ──/api/report_watering──> 命令完成，写浇水记录
+
+为什么是长轮询：设备按采样周期去问“有没有命令”，决策到出水最多要多等一个周期；
+长轮询时设备的 GET 一直挂在服务器上，命令一入队就返回，延迟只剩一次往返。
+
+队列放在文件里（file_lock + write_json_atomic），因为入队的是 scheduler 进程、
+持有长轮询连接的是 web 的某个 worker。等待方不读文件：每 POLL_INTERVAL_S 读一次
+store_version 里的版本号（共享内存），版本变了才加锁取命令，所以挂着的连接几乎不占 CPU。
+
+命令状态：
+    pending    入队，还没发给设备
+    delivered  已经在某次长轮询里发出去；REDELIVER_S 内没有 ack 会再发一次（ack 丢了 / 设备重启）
+    started    设备已经打开水泵（ack）
+    done       设备报告浇完（/api/report_watering 带 command_id），water_ml_actual 是实际出水量
+    failed     设备报告失败
+    expired    COMMAND_TTL_S 内设备没开泵（没发出去 / 发出去没 ack）：土壤情况已经变了，不再浇
+
+每盆同一时间最多一条未结束的命令：scheduler 在土壤一直偏干时每轮都会决定浇水，
+设备离线期间这些决定不能攒成一串命令、等设备上线后一次全浇下去（enqueue 直接返回已有的那条）。
+
+    {"feather-esp32-v2": [{"id": "3f9c...", "pot": "default", "water_ml": 200, "status": "pending",
+                           "decided_at": 1733585028.41, ...}, ...]}
+"""
+import time
+import uuid
+import asyncio
+
+from .storage import file_lock, load_json, load_json_for_update, write_json_atomic
+from .store_version import get_version
+
+PUMP_COMMANDS_FILE = "pump_commands.json"
+DEFAULT_DEVICE = "feather-esp32-v2"   # 和 hardware/main.py 的 DEVICE_NAME 一致
+
+POLL_INTERVAL_S = 0.02    # 等待时多久看一次版本号
+MAX_WAIT_S = 25           # 长轮询最多挂这么久（要小于 gunicorn 的 timeout）
+REDELIVER_S = 30
+COMMAND_TTL_S = 600
+MAX_HISTORY = 100         # 每台设备保留的已结束命令数
+
+STATUSES = ("pending", "delivered", "started", "done", "failed", "expired")
+ACK_STATUSES = ("started", "done", "failed")
+_OPEN = ("pending", "delivered", "started")
+
+
+def _prune(commands):
+    """已结束的命令只留最近 MAX_HISTORY 条。"""
+    finished = [c for c in commands if c["status"] not in _OPEN]
+    if len(finished) <= MAX_HISTORY:
+        return commands
+    drop = {id(c) for c in finished[:len(finished) - MAX_HISTORY]}
+    return [c for c in commands if id(c) not in drop]
+
+
+def _expire(commands, now):
+    """超过 COMMAND_TTL_S 还没开泵的命令标成 expired，返回有没有改动。"""
+    dirty = False
+    for c in commands:
+        if c["status"] in ("pending", "delivered") and now - c["decided_at"] > COMMAND_TTL_S:
+            c["status"], c["finished_at"], dirty = "expired", now, True
+    return dirty
+
+
+def open_command(device, pot, path=PUMP_COMMANDS_FILE, now=None):
+    """device 队列里这盆还没结束（也没过期）的命令，没有返回 None。"""
+    now = now or time.time()
+    for c in load_json(path, default={}).get(device, []):
+        if c["status"] in _OPEN and c.get("pot") == pot:
+            if c["status"] == "started" or now - c["decided_at"] <= COMMAND_TTL_S:
+                return c
+    return None
+
+
+# ========== 入队（scheduler / 手动浇水） ==========
+
+def enqueue(device, water_ml, pot=None, reason=None, decided_at=None, path=PUMP_COMMANDS_FILE, now=None):
+    """
+    新命令放进 device 的队列，返回命令 dict。water_ml 必须 > 0。
+    这盆已经有未结束的命令时不再入队，直接返回那一条（命令按 pot 幂等）。
+    """
+    water_ml = float(water_ml)
+    if not water_ml > 0:
+        raise ValueError("water_ml must be > 0")
+    now = now or time.time()
+    command = {
+        "id": uuid.uuid4().hex[:12],
+        "device": device,
+        "pot": pot,
+        "water_ml": water_ml,
+        "reason": reason,
+        "status": "pending",
+        "decided_at": decided_at or now,
+        "attempts": 0,
+    }
+    with file_lock(path):
+        queues = load_json_for_update(path, default={})
+        commands = queues.get(device, [])
+        dirty = _expire(commands, now)
+        existing = next((c for c in commands if c["status"] in _OPEN and c.get("pot") == pot), None)
+        if existing is None:
+            commands.append(command)
+        if existing is None or dirty:
+            queues[device] = _prune(commands)
+            write_json_atomic(path, queues)
+    if existing is not None:
+        print(f"[pump_commands] {pot or 'default'} already has open command {existing['id']} "
+              f"({existing['status']}), not queueing another")
+        return existing
+    print(f"[pump_commands] queued {command['id']} -> {device}: {water_ml:g} ml ({pot or 'default'})")
+    return command
+
+
+# ========== 设备取命令 ==========
+
+def take_commands(device, path=PUMP_COMMANDS_FILE, now=None):
+    """
+    取出 device 现在该执行的命令（pending，或发出后 REDELIVER_S 内没 ack 的），标成 delivered。
+    没有可发的命令时不写文件（否则每个等待中的连接都会把版本号顶上去，互相唤醒）。
+    """
+    now = now or time.time()
+    if not any(c.get("status") in ("pending", "delivered") for c in load_json(path, default={}).get(device, [])):
+        return []
+    with file_lock(path):
+        queues = load_json_for_update(path, default={})
+        commands = queues.get(device, [])
+        dirty = _expire(commands, now)
+        ready = []
+        for c in commands:
+            if c["status"] == "pending" or (c["status"] == "delivered" and now - c["delivered_at"] >= REDELIVER_S):
+                c["status"], c["delivered_at"] = "delivered", now
+                c["attempts"] += 1
+                ready.append(c)
+                dirty = True
+        if dirty:
+            queues[device] = _prune(commands)
+            write_json_atomic(path, queues)
+    return [device_view(c) for c in ready]
+
+
+def device_view(command):
+    """发给设备的字段（ESP32 上解析的 JSON 越小越好）。"""
+    return {"id": command["id"], "pot": command["pot"], "water_ml": command["water_ml"]}
+
+
+def wait_for_commands(device, timeout=MAX_WAIT_S, path=PUMP_COMMANDS_FILE):
+    """长轮询：有命令立即返回，否则等到有命令入队或超时（返回 []）。"""
+    deadline = time.monotonic() + min(timeout, MAX_WAIT_S)
+    while True:
+        version = get_version(path)
+        commands = take_commands(device, path)
+        if commands or time.monotonic() >= deadline:
+            return commands
+        while get_version(path) == version and time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL_S)
+
+
+async def wait_for_commands_async(device, timeout=MAX_WAIT_S, path=PUMP_COMMANDS_FILE):
+    """同上，给 asgi.py 用：等待时不占线程，加锁取命令放到线程池。"""
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + min(timeout, MAX_WAIT_S)
+    while True:
+        version = get_version(path)
+        commands = await loop.run_in_executor(None, take_commands, device, path)
+        if commands or time.monotonic() >= deadline:
+            return commands
+        while get_version(path) == version and time.monotonic() < deadline:
+            await asyncio.sleep(POLL_INTERVAL_S)
+
+
+# ========== 确认 / 完成 ==========
+
+def acknowledge(command_id, status, device=None, water_ml=None, error=None, path=PUMP_COMMANDS_FILE, now=None):
+    """
+    设备回报命令进度：started（已开泵）/ done（浇完，water_ml 为实际出水量）/ failed。
+    返回更新后的命令；找不到这个 id 返回 None。重复的 ack、已结束命令的 ack 都不改动。
+    """
+    if status not in ACK_STATUSES:
+        raise ValueError(f"status must be one of {list(ACK_STATUSES)}")
+    now = now or time.time()
+    with file_lock(path):
+        queues = load_json_for_update(path, default={})
+        devices = [device] if device else list(queues)
+        command = next((c for d in devices for c in queues.get(d, []) if c["id"] == command_id), None)
+        if command is None:
+            return None
+        if command["status"] not in _OPEN or command["status"] == status:
+            return command
+        command["status"] = status
+        if status == "started" or (status == "done" and "started_at" not in command):
+            command["started_at"] = now
+        if status != "started":
+            command["finished_at"] = now
+        if water_ml is not None:
+            command["water_ml_actual"] = float(water_ml)
+        if error:
+            command["error"] = str(error)
+        write_json_atomic(path, queues)
+    return command
+
+
+# ========== 查询 ==========
+
+def list_commands(device=None, path=PUMP_COMMANDS_FILE):
+    queues = load_json(path, default={})
+    if device is not None:
+        return list(queues.get(device, []))
+    return [c for commands in queues.values() for c in commands]
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"n": len(values), "p50": round(pick(0.5), 3), "p95": round(pick(0.95), 3),
+            "max": round(values[-1], 3)}
+
+
+def latency_stats(device=None, path=PUMP_COMMANDS_FILE):
+    """决策 -> 发出 / 开泵 / 浇完 的延迟（秒）分布。"""
+    commands = list_commands(device, path)
+    span = lambda key: [c[key] - c["decided_at"] for c in commands if c.get(key)]
+    return {
+        "to_delivered": _percentiles(span("delivered_at")),
+        "to_actuation": _percentiles(span("started_at")),
+        "to_done": _percentiles(span("finished_at")),
+        "open": sum(c["status"] in _OPEN for c in commands),
+    }
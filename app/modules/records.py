@@ -0,0 +1,239 @@
+"""
+日志记录的类型定义：传感器读数、浇水事件、健康评估。
+
+每种记录是一个带 __slots__ 的类（没有 per-instance __dict__，内存比 dict 小），
+字段固定、类型在入库时校验，客户端不能再往日志里塞任意字段。
+落盘仍然是普通 JSON 对象（to_dict），和旧日志完全兼容。
+
+    reading = SensorReading.from_dict(payload)   # 字段 / 类型不对抛 ValueError
+    append_json_log(reading.to_dict(), SENSOR_LOG_FILE)
+"""
+import math
+
+_MISSING = object()
+
+# 健康评估 reasons 只允许这些标签（和 ai_test.COMBINED_SYSTEM_PROMPT 里的固定列表一致）
+HEALTH_TAGS = (
+    "need more light",
+    "need less light",
+    "light inconsistent",
+    "drainage issue",
+    "temperature too high",
+    "temperature too low",
+    "temperature fluctuating",
+    "pest suspected",
+    "disease suspected",
+    "fungus suspected",
+    "need pruning",
+    "nutrient deficiency suspected",
+    "overgrowth",
+    "weak growth",
+    "environmental stress",
+    "uncertain assessment",
+    "healthy",
+)
+
+
+# ========== 字段校验 ==========
+
+def number(name, value):
+    """数值字段：int / float（允许 None，表示传感器读取失败）。"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} must be a number")
+    if isinstance(value, float) and not math.isfinite(value):
+        raise ValueError(f"{name} must be finite")
+    return value
+
+
+def text(name, value, max_len=256):
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string")
+    if len(value) > max_len:
+        raise ValueError(f"{name} is too long")
+    return value
+
+
+def flag(name, value):
+    if value is None or isinstance(value, bool):
+        return value
+    raise ValueError(f"{name} must be true or false")
+
+
+def scalar(name, value):
+    """上下文字段：任意 JSON 标量（历史数据里这些字段类型并不统一）。"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise ValueError(f"{name} must be a scalar")
+
+
+def text_list(name, value, max_items=10):
+    if value is None:
+        return []
+    if not isinstance(value, list) or len(value) > max_items:
+        raise ValueError(f"{name} must be a list of at most {max_items} strings")
+    return [text(name, v) for v in value]
+
+
+# ========== 基类 ==========
+
+class Record:
+    """
+    子类声明 FIELDS = {字段名: 校验函数}，并写上 __slots__ = tuple(FIELDS)。
+    没有赋值的字段不会出现在 to_dict() 里。
+    """
+    __slots__ = ()
+    FIELDS = {}
+    REQUIRED = ()
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, data):
+        """校验并构造；未知字段直接丢弃，类型不对或缺少必填字段抛 ValueError。"""
+        if not isinstance(data, dict):
+            raise ValueError(f"{cls.__name__} must be a JSON object")
+        for name in cls.REQUIRED:
+            if data.get(name) is None:
+                raise ValueError(f"{name} required")
+        rec = cls.__new__(cls)
+        for name, check in cls.FIELDS.items():
+            value = data.get(name, _MISSING)
+            if value is not _MISSING:
+                setattr(rec, name, check(name, value))
+        return rec
+
+    @classmethod
+    def clean(cls, data):
+        """等价于 from_dict(data).to_dict()，但不构造对象（批量导入时每条都要过一遍）。"""
+        if cls.from_dict.__func__ is not Record.from_dict.__func__:
+            return cls.from_dict(data).to_dict()  # 子类有额外校验
+        if not isinstance(data, dict):
+            raise ValueError(f"{cls.__name__} must be a JSON object")
+        for name in cls.REQUIRED:
+            if data.get(name) is None:
+                raise ValueError(f"{name} required")
+        return {name: check(name, data[name]) for name, check in cls.FIELDS.items() if name in data}
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+    def to_dict(self):
+        out = {}
+        for name in self.FIELDS:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                out[name] = value
+        return out
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+# ========== 三种记录 ==========
+
+def anomaly_list(name, value):
+    # 入库检测（anomaly.ingest_reading）写入的标记，形如 "soil_temperature_c:error_value"
+    return text_list(name, value, max_items=20)
+
+
+class SensorReading(Record):
+    FIELDS = {
+        "timestamp": text,
+        "date": text,
+        "remote_addr": text,
+        "device": text,
+        "pot": text,
+        "light_lux": number,
+        "soil_moisture_percent": number,
+        "soil_temperature_c": number,
+        "air_temperature_c": number,
+        "air_humidity_percent": number,
+        "anomalies": anomaly_list,
+    }
+    __slots__ = tuple(FIELDS)
+
+
+class WateringEvent(Record):
+    FIELDS = {
+        "timestamp": text,
+        "date": text,
+        "pot": text,
+        "water_ml": number,        # 实际浇下去的水量（决策记录是 0，见 planned_ml）
+        "planned_ml": number,      # 评估决定要浇的量；实际出水由水泵回报的那条记录记
+        "reason": text,
+        "note": text,
+        "source": text,
+        "soil_moisture_before": number,
+        "soil_moisture_after": number,
+        "command_id": text,        # 设备执行水泵命令后回报的（pump_commands）
+        # 以下是 AI 决策时附带的上下文（ai_test.assess_health_and_irrigation 写入）
+        "should_water": flag,
+        "target_soil_moisture_percent_min": number,
+        "target_soil_moisture_percent_max": number,
+        "plant_name": text,
+        "pot_diameter": scalar,
+        "pot_height": scalar,
+        "soil_moisture_percent": number,
+        "will_rain_next_24h": scalar,
+        "rain_mm_next_24h": scalar,
+        "max_temp_next_24h_c": scalar,
+        "light_lux": number,
+        "soil_temperature_c": number,
+        "air_temperature_c": number,
+        "air_humidity_percent": number,
+    }
+    __slots__ = tuple(FIELDS)
+    REQUIRED = ("water_ml",)
+
+    @classmethod
+    def from_dict(cls, data):
+        rec = super().from_dict(data)
+        if rec.water_ml < 0:
+            raise ValueError("water_ml must be >= 0")
+        return rec
+
+
+def health_level(name, value):
+    # 模型偶尔会输出 "4" 或 4.0，能无损转成整数的都接受
+    try:
+        level = int(value)
+        ok = not isinstance(value, bool) and level == float(value) and 1 <= level <= 5
+    except (TypeError, ValueError):
+        ok = False
+    if not ok:
+        raise ValueError(f"{name} must be an integer 1-5")
+    return level
+
+
+def health_tags(name, value):
+    tags = text_list(name, value, max_items=4)
+    unknown = [t for t in tags if t not in HEALTH_TAGS]
+    if unknown:
+        raise ValueError(f"unknown {name}: {unknown}")
+    return tags
+
+
+class HealthAssessment(Record):
+    FIELDS = {
+        "timestamp": text,
+        "date": text,
+        "pot": text,
+        "image_path": text,
+        "plant_name": text,
+        "soil_temperature_c": number,
+        "soil_moisture_percent": number,
+        "light_lux": number,
+        "air_temperature_c": number,
+        "air_humidity_percent": number,
+        "health_level": health_level,
+        "reasons": health_tags,
+        "suggestions": text_list,
+    }
+    __slots__ = tuple(FIELDS)
+    REQUIRED = ("health_level",)
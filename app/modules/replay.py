@@ -0,0 +1,355 @@
+"""
+历史回放：把已经存下来的 sensor_log / watering_log 按时间重新“播放”一遍，
+交给一个浇水决策函数（policy），看它在过去这段时间里会怎么做、效果如何——
+不用真的等几天，几秒钟就能比较不同策略、调阈值。
+
+土壤湿度怎么模拟（反事实）：
+- 传感器数据按 STEP_S 分桶取平均，得到每个 pot 的观测湿度曲线；
+- 相邻两桶的变化量就是“自然变干”的速度；真实浇水造成的跳变（桶内有浇水记录，
+  或上升超过 WATERING_JUMP）置 0，去掉真实浇水的影响；
+- 模拟湿度 = 上一步模拟湿度 + 自然变化 + 策略浇的水 × 每毫升升高的湿度（从历史浇水估算）。
+
+天气预报没有单独的历史，用 watering_log 里每次 AI 决策时记下的
+will_rain_next_24h / rain_mm_next_24h / max_temp_next_24h_c 作为当时的预报。
+
+policy(obs) -> {"should_water": bool, "water_ml": float}，obs 是当时能看到的信息（dict）：
+time、pot、soil_moisture_percent（模拟值）、air_temperature_c、air_humidity_percent、light_lux、
+will_rain_next_24h、rain_mm_next_24h、max_temp_next_24h_c。
+
+    python -m modules.replay --lower 30 --upper 60 --dose 150
+    python -m modules.replay --sweep 20,25,30,35,40    # 多个阈值一起向量化评估
+"""
+import math
+import time
+import argparse
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from .archive import query_range
+from .log_reader import to_seconds
+from .pot_config import DEFAULT_POT
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STEP_S = 5 * 60               # 模拟步长
+DECISION_INTERVAL_S = 30 * 60  # 多久做一次决策
+WATERING_JUMP = 5.0           # 一步内上升超过这么多视为浇过水（含没有记录的手动浇水）
+DEFAULT_GAIN_PER_ML = 0.05    # 没法从历史估算时：每毫升水让湿度升高多少个百分点
+DEFAULT_TARGET = (30.0, 60.0)
+CONTEXT_FIELDS = ("will_rain_next_24h", "rain_mm_next_24h", "max_temp_next_24h_c")
+OBS_FIELDS = ("air_temperature_c", "air_humidity_percent", "light_lux")
+_EPOCH = datetime(1970, 1, 1)  # 和 log_reader.to_seconds 一致（不考虑时区）
+
+
+# ========== 载入历史 ==========
+
+class PotHistory:
+    __slots__ = ("pot", "moisture", "drift", "obs", "waterings", "gain")
+
+    def __init__(self, pot, n):
+        self.pot = pot
+        self.moisture = [math.nan] * n        # 每步观测湿度（NaN = 这一步没有数据）
+        self.drift = [0.0] * n                # 每步自然变化量（已去掉真实浇水）
+        self.obs = [None] * n                 # 每步其他传感器的均值
+        self.waterings = [0.0] * n            # 每步真实浇水量
+        self.gain = DEFAULT_GAIN_PER_ML
+
+
+class History:
+    """所有 pot 对齐到同一个时间网格：第 k 步是 [start + k·step, start + (k+1)·step)。"""
+
+    def __init__(self, start, n, step):
+        self.start = start
+        self.n = n
+        self.step = step
+        self.pots = {}
+        self.context_times = []   # 决策时记下的预报，按时间排序
+        self.context = []
+
+    def time_of(self, k):
+        return self.start + k * self.step
+
+    def context_at(self, t):
+        i = bisect_right(self.context_times, t)
+        return self.context[i - 1] if i else {}
+
+
+def _pot_of(rec):
+    return rec.get("pot") or DEFAULT_POT
+
+
+def _estimate_gain(h):
+    """历史上每次浇水之后湿度升高了多少 / 浇水量，取中位数。"""
+    ratios = []
+    for k, ml in enumerate(h.waterings):
+        if ml <= 0:
+            continue
+        before = next((h.moisture[j] for j in range(k - 1, max(k - 4, -1), -1) if h.moisture[j] == h.moisture[j]), None)
+        after = [h.moisture[j] for j in range(k, min(k + 6, len(h.moisture))) if h.moisture[j] == h.moisture[j]]
+        if before is not None and after and max(after) > before:
+            ratios.append((max(after) - before) / ml)
+    if not ratios:
+        return DEFAULT_GAIN_PER_ML
+    ratios.sort()
+    return ratios[len(ratios) // 2]
+
+
+def load_history(sensor_log_path, watering_log_path, start=None, end=None, step=STEP_S):
+    sensors = query_range(sensor_log_path, start, end)
+    waterings = query_range(watering_log_path, start, end)
+
+    times = [to_seconds(r.get("timestamp")) for r in sensors]
+    valid = [t for t in times if t == t]
+    if not valid:
+        return History(0, 0, step)
+    t0 = math.floor(min(valid) / step) * step
+    n = int((max(valid) - t0) // step) + 1
+    history = History(t0, n, step)
+
+    # 传感器按步求平均
+    sums = {}
+    for rec, t in zip(sensors, times):
+        value = rec.get("soil_moisture_percent")
+        anomalies = rec.get("anomalies") or ()
+        if t != t or not isinstance(value, (int, float)) \
+                or any(a.startswith("soil_moisture_percent:") for a in anomalies):
+            continue
+        k = int((t - t0) // step)
+        acc = sums.setdefault((_pot_of(rec), k), [0.0, 0, {}])
+        acc[0] += value
+        acc[1] += 1
+        for f in OBS_FIELDS:
+            if isinstance(rec.get(f), (int, float)):
+                acc[2][f] = rec[f]
+    for (pot, k), (total, count, obs) in sums.items():
+        h = history.pots.get(pot)
+        if h is None:
+            h = history.pots[pot] = PotHistory(pot, n)
+        h.moisture[k] = total / count
+        h.obs[k] = obs
+
+    # 真实浇水 + 当时的预报
+    for rec in waterings:
+        t = to_seconds(rec.get("timestamp"))
+        if t != t:
+            continue
+        if any(rec.get(f) is not None for f in CONTEXT_FIELDS):
+            history.context_times.append(t)
+            history.context.append({f: rec.get(f) for f in CONTEXT_FIELDS})
+        h = history.pots.get(_pot_of(rec))
+        k = int((t - t0) // step)
+        if h is not None and 0 <= k < n:
+            try:
+                h.waterings[k] += float(rec.get("water_ml") or 0)
+            except (TypeError, ValueError):
+                pass
+
+    # 自然变化：相邻有效步的差，浇水造成的跳变置 0
+    for h in history.pots.values():
+        last_k = None
+        for k, m in enumerate(h.moisture):
+            if m != m:
+                continue
+            if last_k is not None:
+                d = m - h.moisture[last_k]
+                watered = any(h.waterings[j] > 0 for j in range(last_k + 1, k + 1))
+                if not watered and d <= WATERING_JUMP:
+                    h.drift[k] = d
+            last_k = k
+        h.gain = _estimate_gain(h)
+    return history
+
+
+# ========== 策略 ==========
+
+def threshold_policy(lower, dose_ml):
+    """本地规则：模拟湿度低于 lower 就浇 dose_ml；预报 24 小时内有雨则不浇。"""
+    def policy(obs):
+        dry = obs["soil_moisture_percent"] < lower
+        rain = obs.get("will_rain_next_24h") is True
+        return {"should_water": dry and not rain, "water_ml": dose_ml if dry and not rain else 0.0}
+    return policy
+
+
+def assess_policy(assess_fn):
+    """
+    把（mock 的）assess_health_and_irrigation 当作策略：obs 作为关键字参数传进去，
+    从返回值的 irrigation 部分取 should_water / water_ml。
+    """
+    def policy(obs):
+        result = assess_fn(**obs) or {}
+        irrigation = result.get("irrigation", result)
+        should = bool(irrigation.get("should_water"))
+        return {"should_water": should, "water_ml": float(irrigation.get("water_ml") or 0) if should else 0.0}
+    return policy
+
+
+# ========== 回放 ==========
+
+def _hours_outside(values, lower, upper, step):
+    below = sum(1 for m in values if m < lower)
+    above = sum(1 for m in values if m > upper)
+    return below * step / 3600, above * step / 3600
+
+
+def simulate(history, policy, target=DEFAULT_TARGET, decision_interval=DECISION_INTERVAL_S, pots=None):
+    """
+    用 policy 回放每个 pot，返回 {pot: 指标}：
+    water_ml、waterings、hours_below / hours_above / hours_outside（模拟湿度不在 target 内的时长）、
+    decisions、decision_latency_ms（mean / p95 / max）、actual_water_ml（历史上真实浇水量，对比用）。
+    """
+    lower, upper = target
+    every = max(1, decision_interval // history.step)
+    results = {}
+    for pot, h in history.pots.items():
+        if pots is not None and pot not in pots:
+            continue
+        first = next((k for k, m in enumerate(h.moisture) if m == m), None)
+        if first is None:
+            continue
+        m = h.moisture[first]
+        sim, latencies, water, count = [], [], 0.0, 0
+        obs_base = {}
+        for k in range(first, history.n):
+            m = min(max(m + h.drift[k], 0.0), 100.0)
+            if h.obs[k]:
+                obs_base = h.obs[k]
+            if (k - first) % every == 0:
+                t = history.time_of(k)
+                obs = {
+                    "time": (_EPOCH + timedelta(seconds=t)).isoformat(timespec="seconds"),
+                    "pot": pot,
+                    "soil_moisture_percent": m,
+                    **obs_base,
+                    **history.context_at(t),
+                }
+                t0 = time.perf_counter()
+                decision = policy(obs)
+                latencies.append(time.perf_counter() - t0)
+                ml = float(decision.get("water_ml") or 0) if decision.get("should_water") else 0.0
+                if ml > 0:
+                    water += ml
+                    count += 1
+                    m = min(m + ml * h.gain, 100.0)
+            sim.append(m)
+
+        below, above = _hours_outside(sim, lower, upper, history.step)
+        latencies.sort()
+        results[pot] = {
+            "water_ml": round(water, 1),
+            "waterings": count,
+            "actual_water_ml": round(sum(h.waterings), 1),
+            "hours_below": round(below, 2),
+            "hours_above": round(above, 2),
+            "hours_outside": round(below + above, 2),
+            "decisions": len(latencies),
+            "decision_latency_ms": {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 4) if latencies else None,
+                "p95": round(latencies[int(len(latencies) * 0.95)] * 1000, 4) if latencies else None,
+                "max": round(latencies[-1] * 1000, 4) if latencies else None,
+            },
+            "gain_per_ml": round(h.gain, 4),
+        }
+    return results
+
+
+def sweep_thresholds(history, lowers, dose_ml, target=DEFAULT_TARGET, decision_interval=DECISION_INTERVAL_S):
+    """
+    threshold_policy 在多个下限阈值 × 所有 pot 上一起回放（每个组合是一条“lane”）。
+    装了 numpy 时每一步对所有 lane 做一次向量运算，否则逐 lane 循环。
+    返回 [{"lower", "pot", "water_ml", "waterings", "hours_below", "hours_above", "hours_outside"}, ...]
+    """
+    lower_t, upper_t = target
+    every = max(1, decision_interval // history.step)
+    lanes = [(pot, lower) for pot in history.pots for lower in lowers]
+    if not lanes:
+        return []
+    pots = [history.pots[pot] for pot, _ in lanes]
+    firsts = [next((k for k, m in enumerate(h.moisture) if m == m), history.n) for h in pots]
+    start = min(firsts)
+    rain = [history.context_at(history.time_of(k)).get("will_rain_next_24h") is True for k in range(history.n)]
+
+    if np is not None:
+        drift = np.array([h.drift for h in pots], dtype=float)
+        gain = np.array([h.gain for h in pots])
+        lower = np.array([lw for _, lw in lanes], dtype=float)
+        first = np.array(firsts)
+        m = np.array([h.moisture[f] if f < history.n else 0.0 for h, f in zip(pots, firsts)])
+        water = np.zeros(len(lanes))
+        count = np.zeros(len(lanes), dtype=int)
+        below = np.zeros(len(lanes), dtype=int)
+        above = np.zeros(len(lanes), dtype=int)
+        for k in range(start, history.n):
+            active = first <= k
+            m = np.where(active, np.clip(m + drift[:, k], 0.0, 100.0), m)
+            if (k - start) % every == 0 and not rain[k]:
+                dose = active & (m < lower)
+                m = np.where(dose, np.minimum(m + dose_ml * gain, 100.0), m)
+                water += dose * dose_ml
+                count += dose
+            below += active & (m < lower_t)
+            above += active & (m > upper_t)
+        water, count, below, above = water.tolist(), count.tolist(), below.tolist(), above.tolist()
+    else:
+        water, count, below, above = [], [], [], []
+        for (pot, lw), h, f in zip(lanes, pots, firsts):
+            m = h.moisture[f] if f < history.n else 0.0
+            w = c = b = a = 0
+            for k in range(f, history.n):
+                m = min(max(m + h.drift[k], 0.0), 100.0)
+                if (k - start) % every == 0 and not rain[k] and m < lw:
+                    m = min(m + dose_ml * h.gain, 100.0)
+                    w += dose_ml
+                    c += 1
+                b += m < lower_t
+                a += m > upper_t
+            water.append(w)
+            count.append(c)
+            below.append(b)
+            above.append(a)
+
+    hours = history.step / 3600
+    return [
+        {
+            "lower": lw,
+            "pot": pot,
+            "water_ml": round(water[i], 1),
+            "waterings": int(count[i]),
+            "hours_below": round(below[i] * hours, 2),
+            "hours_above": round(above[i] * hours, 2),
+            "hours_outside": round((below[i] + above[i]) * hours, 2),
+        }
+        for i, (pot, lw) in enumerate(lanes)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="用历史日志回放浇水策略")
+    parser.add_argument("--sensor-log", default="sensor_log.json")
+    parser.add_argument("--watering-log", default="watering_log.json")
+    parser.add_argument("--lower", type=float, default=DEFAULT_TARGET[0], help="threshold_policy 的浇水阈值")
+    parser.add_argument("--upper", type=float, default=DEFAULT_TARGET[1], help="目标区间上限")
+    parser.add_argument("--dose", type=float, default=150.0, help="每次浇水量（ml）")
+    parser.add_argument("--sweep", help="逗号分隔的多个阈值，一起向量化评估")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    hist = load_history(args.sensor_log, args.watering_log)
+    t1 = time.perf_counter()
+    simulated_h = hist.n * hist.step / 3600
+    print(f"载入 {len(hist.pots)} 个 pot、{simulated_h:.1f} 小时的历史：{t1 - t0:.2f}s")
+
+    if args.sweep:
+        lowers = [float(x) for x in args.sweep.split(",")]
+        rows = sweep_thresholds(hist, lowers, args.dose, target=(args.lower, args.upper))
+        for row in rows:
+            print(row)
+    else:
+        res = simulate(hist, threshold_policy(args.lower, args.dose), target=(args.lower, args.upper))
+        for pot_name, metrics in res.items():
+            print(pot_name, metrics)
+    elapsed = time.perf_counter() - t1
+    print(f"回放耗时 {elapsed:.2f}s（约 {simulated_h / max(elapsed, 1e-9):.0f} 倍速）")
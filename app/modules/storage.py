@@ -0,0 +1,201 @@
+"""
+JSON 日志文件的统一读写层。
+
+web 进程（/upload、/api/report_watering）和 scheduler 会同时写
+watering_log.json / sensor_log.json / plant_health_log.json，
+所以所有写操作都走这里：
+
+- 写者之间：对 "<文件>.lock" 加跨进程排他锁，读-改-写在锁内完成，不会丢记录；
+- 写入方式：先写同目录临时文件 + fsync，再 os.replace 原子替换（编码见 codec，紧凑 JSON），
+  读者要么看到旧文件、要么看到新文件，永远不会读到写了一半的内容；
+- 读者：不加锁，直接读（原子替换保证一致），多 worker 下不会互相阻塞；
+- 崩溃恢复：拿到锁后清理崩溃遗留的临时文件；如果主文件损坏，
+  先把它改名备份，再尽量抢救出完整的记录，而不是当成空列表覆盖掉。
+"""
+import os
+import json
+import glob
+from contextlib import contextmanager
+from datetime import datetime
+
+from . import codec
+from .store_version import bump_version
+
+try:
+    import fcntl  # POSIX
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# ========== 跨进程文件锁 ==========
+
+@contextmanager
+def file_lock(path):
+    """
+    对 path 加跨进程排他锁（锁的是旁边的 "<path>.lock" 文件，
+    这样主文件被 os.replace 换掉以后锁依然有效）。
+    拿到锁后顺便清理上一个写者崩溃留下的临时文件。
+    """
+    lock_path = path + ".lock"
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        else:
+            # msvcrt 需要锁住至少 1 个字节，LK_LOCK 会重试直到拿到锁
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        _cleanup_stale_tmp(path)
+        yield
+    finally:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+
+# ========== 原子写 ==========
+
+def _tmp_path(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+
+
+def _fsync_dir(directory):
+    # 目录 fsync 只在 POSIX 上有意义，Windows 打不开目录直接跳过
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path, data):
+    """临时文件 + fsync + os.replace，完成后递增该文件的版本号。调用方需要已经持有 file_lock(path)。"""
+    tmp = _tmp_path(path)
+    with open(tmp, "wb") as f:
+        f.write(codec.dumps(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    _fsync_dir(os.path.dirname(os.path.abspath(path)))
+    bump_version(path)
+
+
+def _cleanup_stale_tmp(path):
+    """持有锁时调用：此时不可能有别的写者在写，遗留的临时文件都是崩溃残留。"""
+    directory, name = os.path.split(os.path.abspath(path))
+    for tmp in glob.glob(os.path.join(directory, f".{glob.escape(name)}.*.tmp")):
+        try:
+            os.remove(tmp)
+            print("[storage] 清理崩溃遗留的临时文件:", tmp)
+        except OSError:
+            pass
+
+
+# ========== 损坏文件恢复 ==========
+
+def _salvage_records(text):
+    """从一个被截断 / 损坏的 JSON 数组里，按顺序抢救出完整的元素。"""
+    decoder = json.JSONDecoder()
+    records = []
+    idx = text.find("[")
+    if idx == -1:
+        return records
+    idx += 1
+    n = len(text)
+    while idx < n:
+        while idx < n and text[idx] in " \t\r\n,":
+            idx += 1
+        if idx >= n or text[idx] == "]":
+            break
+        try:
+            obj, idx = decoder.raw_decode(text, idx)
+        except json.JSONDecodeError:
+            break
+        records.append(obj)
+    return records
+
+
+def load_json_for_update(path, default):
+    """
+    写者在锁内读取当前内容。
+    文件损坏时不会返回空列表去覆盖历史：先备份原文件，再抢救可用记录。
+    """
+    if not os.path.exists(path):
+        return default
+    with open(path, "rb") as f:
+        raw = f.read()
+    if not raw.strip():
+        return default
+    try:
+        return codec.loads(raw)
+    except ValueError as e:
+        text = raw.decode("utf-8", errors="replace")
+        backup = path + ".corrupt-" + datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.replace(path, backup)
+        salvaged = _salvage_records(text) if isinstance(default, list) else default
+        print(f"[storage] {path} 已损坏({e})，原文件备份到 {backup}，"
+              f"抢救出 {len(salvaged) if isinstance(salvaged, list) else 0} 条记录")
+        return salvaged
+
+
+# ========== 对外接口 ==========
+
+def load_json(path, default):
+    """无锁读取。文件不存在或无法解析时返回 default。"""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "rb") as f:
+            return codec.loads(f.read())
+    except Exception as e:
+        print("[load_json] 读取失败:", path, "error:", e)
+        return default
+
+
+def save_json(path, data):
+    """整体覆盖写（加锁 + 原子替换）。"""
+    try:
+        with file_lock(path):
+            write_json_atomic(path, data)
+        print(f"[save_json] 已写入: {path}，当前记录数: {len(data)}")
+    except Exception as e:
+        print("[save_json] 写入失败:", path, "error:", e)
+
+
+def append_json_logs(entries, log_path):
+    """
+    在锁内把多条记录追加到 JSON log（数组形式存储），返回追加后的总条数。
+    """
+    entries = list(entries)
+    with file_lock(log_path):
+        data = load_json_for_update(log_path, default=[])
+        if not isinstance(data, list):
+            data = [data]
+        data.extend(entries)
+        write_json_atomic(log_path, data)
+    return len(data)
+
+
+def append_json_log(entry: dict, log_path: str):
+    """
+    追加一条记录到 JSON log 文件（数组形式存储）。
+    """
+    total = append_json_logs([entry], log_path)
+    print(f"[LOG] Saved record to {log_path}")
+    return total
@@ -0,0 +1,72 @@
+"""
+每个数据文件（watering_log.json、sensor_log.json、pot_info.json ……）一个写入计数器，
+所有进程共享：计数器放在数据目录下的 .store_versions 文件里，通过 mmap 映射。
+
+- 写者（storage.write_json_atomic 等）写完后调用 bump_version(path)；
+- 读者调用 get_version(path) 只是读一块共享内存，不产生任何文件 I/O，
+  web 的多个 worker 和 scheduler 看到的是同一个计数器。
+
+缓存（页面 view model、浇水索引等）用版本号做 key，数据一变就精确失效。
+"""
+import os
+import mmap
+import zlib
+import struct
+import threading
+
+VERSION_FILE_NAME = ".store_versions"
+_SLOTS = 256
+_SLOT = struct.Struct("<Q")
+_SIZE = _SLOTS * _SLOT.size
+
+_maps = {}  # 数据目录 -> mmap
+_maps_lock = threading.Lock()
+
+
+def _slot(path):
+    # 不同文件名撞到同一个槽只会导致多失效一次，不会读到旧数据
+    return zlib.crc32(os.path.basename(path).encode("utf-8")) % _SLOTS * _SLOT.size
+
+
+def _map_for(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    mm = _maps.get(directory)
+    if mm is not None:
+        return mm
+    with _maps_lock:
+        mm = _maps.get(directory)
+        if mm is None:
+            version_file = os.path.join(directory, VERSION_FILE_NAME)
+            fd = os.open(version_file, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size < _SIZE:
+                    os.ftruncate(fd, _SIZE)
+                mm = mmap.mmap(fd, _SIZE, access=mmap.ACCESS_WRITE)
+            finally:
+                os.close(fd)
+            _maps[directory] = mm
+    return mm
+
+
+def get_version(path):
+    """path 当前的写入版本号（读共享内存，无 I/O）。"""
+    return _SLOT.unpack_from(_map_for(path), _slot(path))[0]
+
+
+def bump_version(path):
+    """
+    写入 path 之后调用。同一个文件的写者已经被 storage.file_lock 串行化，
+    这里再用计数器文件自己的锁，保证不同文件撞槽时也不会丢计数。
+    """
+    from .storage import file_lock  # storage 也依赖本模块，延迟导入避免循环
+
+    mm = _map_for(path)
+    offset = _slot(path)
+    with file_lock(os.path.join(os.path.dirname(os.path.abspath(path)), VERSION_FILE_NAME)):
+        value = _SLOT.unpack_from(mm, offset)[0] + 1
+        _SLOT.pack_into(mm, offset, value)
+    return value
+
+
+def get_versions(*paths):
+    return tuple(get_version(p) for p in paths)
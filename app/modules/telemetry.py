@@ -0,0 +1,71 @@
+"""
+设备上报的二进制遥测格式（/upload_bin），和 JSON 的 /upload 二选一。
+
+一条读数 16 字节（JSON 约 200 字节），小端：
+
+    B  版本号（1）
+    B  字段存在位：第 i 位为 1 表示第 i 个字段有值（固件里的 None 不置位）
+    H  设备编号（DEVICE_NAMES 映射成名字）
+    I  light_lux             ×10
+    H  soil_moisture_percent ×100
+    h  soil_temperature_c    ×100
+    h  air_temperature_c     ×100
+    H  air_humidity_percent  ×100
+
+请求体可以是多条首尾相连。固件端的编码器在 hardware/telemetry.py，两边格式必须一致。
+"""
+import struct
+
+VERSION = 1
+FRAME = struct.Struct("<BBHIHhhH")
+
+FIELDS = (
+    ("light_lux", 10),
+    ("soil_moisture_percent", 100),
+    ("soil_temperature_c", 100),
+    ("air_temperature_c", 100),
+    ("air_humidity_percent", 100),
+)
+
+# 设备编号 -> 记录里的 device 名字（未登记的编号记为 "device-<编号>"）
+DEVICE_NAMES = {
+    1: "feather-esp32-v2",
+}
+
+
+def device_name(device_id):
+    return DEVICE_NAMES.get(device_id, f"device-{device_id}")
+
+
+# (字段名, 位掩码, 比例)，decode 的热循环里不再算
+_LAYOUT = tuple((name, 1 << i, scale) for i, (name, scale) in enumerate(FIELDS))
+
+
+def decode(data):
+    """二进制请求体 -> 读数 dict 列表；长度或版本不对抛 ValueError。"""
+    if not data or len(data) % FRAME.size:
+        raise ValueError(f"body length must be a multiple of {FRAME.size}")
+    readings = []
+    for frame in FRAME.iter_unpack(data):
+        if frame[0] != VERSION:
+            raise ValueError(f"unsupported telemetry version {frame[0]}")
+        present = frame[1]
+        reading = {"device": device_name(frame[2])}
+        for (name, bit, scale), value in zip(_LAYOUT, frame[3:]):
+            reading[name] = value / scale if present & bit else None
+        readings.append(reading)
+    return readings
+
+
+def encode(reading, device_id):
+    """服务器端的编码（测试、压测、回放用），和固件的 encode 相同。"""
+    present = 0
+    values = []
+    for i, (name, scale) in enumerate(FIELDS):
+        v = reading.get(name)
+        if v is None:
+            values.append(0)
+        else:
+            present |= 1 << i
+            values.append(int(round(v * scale)))
+    return FRAME.pack(VERSION, present, device_id, *values)
@@ -0,0 +1,31 @@
+"""
+页面 view model 缓存：key 是依赖的数据文件的版本号（见 store_version），
+两次写入之间重复打开页面，不再读文件、不再排序，直接返回上次算好的结果。
+
+    vm = cached("index.health", [HEALTH_LOG_FILE], build_health_panel)
+
+extra_key 用来放和时间相关的部分（比如“今天”的日期），跨天自动重算。
+缓存是每个进程各一份，但失效依据是所有进程共享的版本号，所以多 worker 下也是精确的。
+"""
+import threading
+
+from .store_version import get_versions
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def cached(name, deps, build, extra_key=()):
+    key = (get_versions(*deps), extra_key)
+    entry = _cache.get(name)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+    value = build()
+    with _lock:
+        _cache[name] = (key, value)
+    return value
+
+
+def clear():
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,279 @@
+"""
+浇水历史的内存索引 + 按小时/天的预聚合，给 /api/watering 和首页用。
+
+- 每个 pot 一份索引（没有 pot 字段的旧记录归到 "default"），另有 "*" 表示全部 pot；
+- 浇水事件（water_ml > 0）按 timestamp 排序，范围查询用 bisect，分页直接切片；
+- hour / day 两级预聚合（总 ml + 次数），week 由 day 合并，查询只遍历范围内的桶；
+- 日志版本号（store_version）变化时增量更新：热文件只是追加了记录（绝大多数情况）时，
+  只解码新增的几条插进索引；热文件被重写（归档）或归档目录变了才重新组装，
+  归档文件只重读变化了的那几天，内存里只留浇水事件，不缓存归档的全部记录。
+"""
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date, timedelta
+
+from .archive import archive_dir_for, archived_days, read_archive_file
+from .log_reader import get_reader
+from .pot_config import DEFAULT_POT
+from .store_version import get_version
+
+ALL_POTS = "*"
+GROUP_BYS = ("hour", "day", "week")
+
+_lock = threading.Lock()
+_indexes = {}        # log_path -> LogIndex
+
+
+class PotIndex:
+    __slots__ = ("timestamps", "events", "hourly", "daily", "hour_keys", "day_keys")
+
+    def __init__(self):
+        self.timestamps = []   # 已排序，和 events 一一对应
+        self.events = []
+        self.hourly = {}       # "YYYY-MM-DDTHH" -> [water_ml, events]
+        self.daily = {}        # "YYYY-MM-DD" -> [water_ml, events]
+        self.hour_keys = []
+        self.day_keys = []
+
+    def add(self, ts, rec, water_ml):
+        """批量构建用：随意顺序 add，最后调用一次 finish()。"""
+        self.timestamps.append(ts)
+        self.events.append(rec)
+        for buckets, key in ((self.hourly, ts[:13]), (self.daily, ts[:10])):
+            b = buckets.setdefault(key, [0.0, 0])
+            b[0] += water_ml
+            b[1] += 1
+
+    def finish(self):
+        order = sorted(range(len(self.timestamps)), key=self.timestamps.__getitem__)
+        self.timestamps = [self.timestamps[i] for i in order]
+        self.events = [self.events[i] for i in order]
+        self.hour_keys = sorted(self.hourly)
+        self.day_keys = sorted(self.daily)
+
+    def insert(self, ts, rec, water_ml):
+        """
+        增量更新用：插入后仍然有序。查询不加锁，所以先写 events 再写 timestamps（按 timestamps 算出的下标
+        在 events 里总是有效），乱序插入时换成新列表而不是原地修改。
+        """
+        if not self.timestamps or ts >= self.timestamps[-1]:
+            self.events.append(rec)
+            self.timestamps.append(ts)
+        else:
+            i = bisect_right(self.timestamps, ts)
+            self.events = self.events[:i] + [rec] + self.events[i:]
+            self.timestamps = self.timestamps[:i] + [ts] + self.timestamps[i:]
+        for buckets, attr, key in ((self.hourly, "hour_keys", ts[:13]), (self.daily, "day_keys", ts[:10])):
+            b = buckets.get(key)
+            if b is not None:
+                b[0] += water_ml
+                b[1] += 1
+                continue
+            buckets[key] = [water_ml, 1]
+            keys = getattr(self, attr)
+            if not keys or key > keys[-1]:
+                keys.append(key)
+            else:
+                setattr(self, attr, sorted(keys + [key]))
+
+
+# ========== 构建 ==========
+
+def _water_ml(rec):
+    try:
+        return float(rec.get("water_ml", 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _events(records):
+    """记录 -> 浇水事件 [(ts, pot, rec, water_ml)]（其余记录不进索引）。"""
+    events = []
+    for rec in records:
+        if not isinstance(rec, dict):
+            continue
+        ts = rec.get("timestamp")
+        water_ml = _water_ml(rec)
+        if not isinstance(ts, str) or water_ml <= 0:
+            continue
+        try:
+            ts = datetime.fromisoformat(ts).isoformat()
+        except ValueError:
+            continue
+        events.append((ts, str(rec.get("pot") or DEFAULT_POT), rec, water_ml))
+    return events
+
+
+class LogIndex:
+    """一个日志文件（热文件 + 归档）的索引状态，每个进程每个文件一份。"""
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.lock = threading.Lock()
+        self.version = None
+        self.archive_dir_mtime = None
+        self.archive_events = {}   # 归档文件 -> (mtime_ns, 浇水事件)
+        self.hot_cursor = None
+        self.hot_events = []
+        self.pots = {ALL_POTS: PotIndex()}
+
+    def _refresh_archives(self):
+        """只重读新增 / 变化了的归档文件，返回归档是否有变化。"""
+        try:
+            dir_mtime = os.stat(archive_dir_for(self.log_path)).st_mtime_ns
+        except FileNotFoundError:
+            dir_mtime = None
+        if dir_mtime == self.archive_dir_mtime:
+            return False
+        self.archive_dir_mtime = dir_mtime
+        current = {}
+        for _, path in archived_days(self.log_path):
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            cached = self.archive_events.get(path)
+            if cached is None or cached[0] != mtime:
+                try:
+                    cached = (mtime, _events(read_archive_file(path)))
+                except Exception as e:
+                    print("[watering_index] 读取归档失败:", path, "error:", e)
+                    continue
+            current[path] = cached
+        changed = current.keys() != self.archive_events.keys() or any(
+            current[p][0] != self.archive_events[p][0] for p in current)
+        self.archive_events = current
+        return changed
+
+    def _assemble(self):
+        pots = {ALL_POTS: PotIndex()}
+        for events in [e for _, e in self.archive_events.values()] + [self.hot_events]:
+            for ts, pot, rec, water_ml in events:
+                pots[ALL_POTS].add(ts, rec, water_ml)
+                pots.setdefault(pot, PotIndex()).add(ts, rec, water_ml)
+        for idx in pots.values():
+            idx.finish()
+        return pots
+
+    def refresh(self):
+        version = get_version(self.log_path)
+        if version == self.version:
+            return self.pots
+        with self.lock:
+            if version == self.version:
+                return self.pots
+            archives_changed = self._refresh_archives()
+            cursor, records, appended = get_reader(self.log_path).tail(self.hot_cursor)
+            events = _events(records)
+            if appended and not archives_changed:
+                self.hot_events.extend(events)
+                for ts, pot, rec, water_ml in events:
+                    self.pots[ALL_POTS].insert(ts, rec, water_ml)
+                    self.pots.setdefault(pot, PotIndex()).insert(ts, rec, water_ml)
+            else:
+                self.hot_events = self.hot_events + events if appended else events
+                self.pots = self._assemble()
+            self.hot_cursor = cursor
+            self.version = version
+        return self.pots
+
+
+def get_index(log_path, pot=None):
+    """返回某个 pot 的索引（pot=None 表示全部）；日志没变化时直接用缓存，追加时增量更新。"""
+    log_path = os.path.abspath(log_path)
+    state = _indexes.get(log_path)
+    if state is None:
+        with _lock:
+            state = _indexes.setdefault(log_path, LogIndex(log_path))
+    return state.refresh().get(pot or ALL_POTS) or PotIndex()
+
+
+# ========== 查询 ==========
+
+def parse_bound(value, is_end=False):
+    """
+    "2025-12-01" 或 "2025-12-01T08:00:00" -> ISO 字符串。
+    只给日期的 to 表示包含当天（换成第二天 00:00，区间仍是左闭右开）。
+    """
+    if not value:
+        return None
+    if len(value) == 10:
+        d = date.fromisoformat(value)
+        if is_end:
+            d += timedelta(days=1)
+        return datetime(d.year, d.month, d.day).isoformat()
+    return datetime.fromisoformat(value).isoformat()
+
+
+def query_events(idx, start=None, end=None, offset=0, limit=None, newest_first=True):
+    """[start, end) 内的浇水事件，返回 (本页记录, 总条数)。limit=None 表示不分页。"""
+    lo = bisect_left(idx.timestamps, start) if start else 0
+    hi = bisect_left(idx.timestamps, end) if end else len(idx.timestamps)
+    total = max(0, hi - lo)
+    if limit is None:
+        limit = total
+    if newest_first:
+        stop = hi - offset
+        begin = max(lo, stop - limit)
+        page = idx.events[begin:max(begin, stop)][::-1]
+    else:
+        begin = lo + offset
+        page = idx.events[begin:min(hi, begin + limit)]
+    return page, total
+
+
+def _week_start(day):
+    d = date.fromisoformat(day)
+    return (d - timedelta(days=d.weekday())).isoformat()
+
+
+def _aligned(bound, width):
+    # bound 是 isoformat() 的结果：YYYY-MM-DDTHH:MM:SS[.ffffff]
+    return bound[width:] == (":00:00" if width == 13 else "T00:00:00")
+
+
+def _exact_bucket(idx, period, width, start, end):
+    """边界落在桶中间时，按原始事件精确统计这个桶。"""
+    lo = bisect_left(idx.timestamps, max(period, start or period))
+    hi = bisect_left(idx.timestamps, end) if end else len(idx.timestamps)
+    ml, n = 0.0, 0
+    for i in range(lo, hi):
+        if idx.timestamps[i][:width] != period:
+            break
+        ml += _water_ml(idx.events[i])
+        n += 1
+    return ml, n
+
+
+def query_groups(idx, group_by, start=None, end=None):
+    """按 hour / day / week 分组的 [{"period", "water_ml", "events"}]，按时间升序，没有浇水的桶不返回。"""
+    if group_by == "hour":
+        width, keys, buckets = 13, idx.hour_keys, idx.hourly
+    else:
+        width, keys, buckets = 10, idx.day_keys, idx.daily
+
+    lo = bisect_left(keys, start[:width]) if start else 0
+    hi = len(keys)
+    if end:
+        hi = bisect_left(keys, end[:width])
+        if not _aligned(end, width) and hi < len(keys) and keys[hi] == end[:width]:
+            hi += 1  # end 所在的桶只算一部分
+
+    groups = []
+    for key in keys[lo:hi]:
+        ml, n = buckets[key]
+        partial = ((start and key == start[:width] and not _aligned(start, width))
+                   or (end and key == end[:width]))
+        if partial:
+            ml, n = _exact_bucket(idx, key, width, start, end)
+        if not n:
+            continue
+        if group_by == "week":
+            key = _week_start(key)
+            if groups and groups[-1]["period"] == key:
+                groups[-1]["water_ml"] += ml
+                groups[-1]["events"] += n
+                continue
+        groups.append({"period": key, "water_ml": ml, "events": n})
+    return groups
@@ -1,65 +1,65 @@
-import requests
-import json
-
 OPENWEATHER_API_KEY=""
 
-def get_24h_forecast():
-    """
-    Returns:
-    - max_temperature (°C)
-    - rain_expected (True/False)
-    - max_rain (mm)
-    """
-
-    api_key = OPENWEATHER_API_KEY
+FORECAST_URL = "https://api.openweathermap.org/data/2.5/forecast"
 
-    location_path = "pot_info.json"
-    with open(location_path,"r") as f:
-        loc_info = json.load(f)
-    lat, lon = loc_info["latitude"], loc_info["longitude"]
 
-
-    url = "https://api.openweathermap.org/data/2.5/forecast"
+def fetch_forecast(lat, lon):
+    """
+    Raw OpenWeather 5-day / 3-hour forecast for one location (the full "list", not truncated).
+    Returns the decoded JSON, or None on failure.
+    """
+    from .http_client import request  # 延迟导入：web 进程不需要天气接口
 
     params = {
         "lat": lat,
         "lon": lon,
-        "appid": api_key,
+        "appid": OPENWEATHER_API_KEY,
         "units": "metric"   # Celsius
     }
 
     try:
-        response = requests.get(url, params=params, timeout=10)
+        response = request("openweather", "GET", FORECAST_URL, params=params)
         response.raise_for_status()
-        data = response.json()
-
-        forecast_list = data["list"]  # Each entry is 3-hour step
-        next_24h = forecast_list[:8]  # 8 entries = 24 hours
+        return response.json()
+    except Exception as e:
+        print("❌ Failed to fetch forecast:", e)
+        return None
 
-        # Max temperature
-        max_temp = max(item["main"]["temp"] for item in next_24h)
 
-        # Rain info
-        max_rain = 0.0
-        rain_expected = False
+def get_24h_forecast(location_path="pot_info.json", pot=None):
+    """
+    Returns (from the background-refreshed forecast store; the network is only
+    hit when the store has nothing fresh for this location):
+    - max_temperature (°C)
+    - rain_expected (True/False)
+    - max_rain (mm per 3 h)
+    plus every feature from forecast_store.compute_features
+    (rain_mm_next_6h/12h/24h/48h, et0_mm_next_24h, ...).
+    """
+    from .forecast_store import get_features, refresh_location
+    from .pot_config import DEFAULT_POT, get_pot
 
-        for item in next_24h:
-            if "rain" in item:
-                rain_amount = item["rain"].get("3h", 0)
-                if rain_amount > 0:
-                    rain_expected = True
-                    max_rain = max(max_rain, rain_amount)
-        
-        return {
-            "rain_expected": rain_expected,
-            "max_rain": max_rain if rain_expected else 0.0,
-            "max_temperature": max_temp
-        }
+    config = get_pot(pot, location_path)
+    if config is None or config.location is None:
+        print("❌ No location configured for pot", pot or DEFAULT_POT)
+        return None
+    lat, lon = config.location
 
-    except Exception as e:
-        print("❌ Failed to fetch forecast:", e)
+    features = get_features(lat, lon)
+    if features is None:
+        if refresh_location(lat, lon) is None:
+            return None
+        features = get_features(lat, lon)
+    if not features or not features.get("hours_available"):
         return None
 
+    return {
+        **features,
+        "rain_expected": features["will_rain_next_24h"],
+        "max_rain": round(features["max_rain_mm_per_hour_next_24h"] * 3, 2),
+        "max_temperature": features["max_temp_next_24h_c"],
+    }
+
 
 # Test output
 if __name__ == "__main__":
@@ -1,107 +1,160 @@
 import time
 import os
-from modules.main import main
-import json
 from datetime import datetime
 # from modules.ai_image_module import assess_plant_health
-from modules.ai_test import assess_health_and_irrigation
-from modules.weather_module import get_24h_forecast
+from modules.batch_assess import build_pot_input
+from modules.local_vision import assess_with_local_model, warm_up
+from modules.forecast_store import get_features, refresh_due, start_background_refresh
+from modules.storage import append_json_log
+from modules.health_summary import append_health_assessment
+from modules.archive import compact_all
+from modules.drying import predict_next_checks
+from modules.frame_hash import frame_changed, mark_assessed
+from modules.pot_config import POT_INFO_FILE, get_registry
+from modules.pump_commands import DEFAULT_DEVICE, PUMP_COMMANDS_FILE, enqueue, open_command
+from modules.records import HealthAssessment, WateringEvent
 
 WATERING_LOG_FILE = "watering_log.json"
 HEALTH_LOG_FILE = "plant_health_log.json"
+SENSOR_LOG_FILE = "sensor_log.json"
 
-def load_json(path, default):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return default
+# 热日志只保留最近 N 天，更早的记录每天归档一次到 archive/
+LOG_RETENTION_DAYS = 30
+_last_compaction_day = None
 
 
-def save_json(path, data):
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+def maybe_compact_logs():
+    global _last_compaction_day
+    today = datetime.now().date()
+    if _last_compaction_day == today:
+        return
+    compact_all([SENSOR_LOG_FILE, WATERING_LOG_FILE, HEALTH_LOG_FILE],
+                retain_days=LOG_RETENTION_DAYS)
+    _last_compaction_day = today
 
 
 def append_watering_log(water_ml, status):
-    log = load_json(WATERING_LOG_FILE, [])
     now = datetime.now()
 
-    log.append({
+    append_json_log(WateringEvent.from_dict({
         "timestamp": now.isoformat(timespec="seconds"),
         "date": now.date().isoformat(),
         "water_ml": water_ml,         # 0 if not watered
         "reason": status,             # "watered" / "skipped"
-    })
-
-    save_json(WATERING_LOG_FILE, log)
+    }).to_dict(), WATERING_LOG_FILE)
 
 def append_health_log(health):
-    log = load_json(HEALTH_LOG_FILE, [])
     now = datetime.now()
 
-    log.append({
+    append_health_assessment(HealthAssessment.from_dict({
         "timestamp": now.isoformat(timespec="seconds"),
         "date": now.date().isoformat(),
         **health
-    })
-
-    save_json(HEALTH_LOG_FILE, log)
+    }).to_dict(), HEALTH_LOG_FILE)
+
+
+def pot_locations():
+    """后台刷新预报的位置：所有花盆的经纬度（pot_config 注册表，文件改了自动重载）。"""
+    return get_registry().locations()
+
+
+def dispatch_watering(pot_name, result, commands_path=PUMP_COMMANDS_FILE, pot_info_path=POT_INFO_FILE):
+    """
+    评估结论是要浇水：命令放进这盆对应设备的队列，设备在长轮询里马上拿到并开泵。
+    这盆还有没结束的命令（设备离线、还没回报）时 enqueue 返回那一条，不会叠加浇水。
+    """
+    irrigation = result.get("irrigation") or {}
+    if not irrigation.get("should_water") or not irrigation.get("water_ml"):
+        return None
+    config = get_registry(pot_info_path).get(pot_name)
+    device = (config.get("device") if config else None) or DEFAULT_DEVICE
+    return enqueue(device, irrigation["water_ml"], pot=pot_name, reason="assessment", path=commands_path)
+
+
+def check_plan(pots, sensor_log_path=SENSOR_LOG_FILE, watering_log_path=WATERING_LOG_FILE,
+               commands_path=PUMP_COMMANDS_FILE):
+    """
+    所有盆的下一次检查预测（日志各扫一遍、一次拟合）。
+    还有没结束的水泵命令的盆不会得到 0 等待：等设备浇完再看，不会每隔几秒重新评估。
+    """
+    devices = {pot.get("device"): name for name, pot in pots.items() if pot.get("device")}
+    open_pots = {name for name, pot in pots.items()
+                 if open_command(pot.get("device") or DEFAULT_DEVICE, name, commands_path)}
+    thresholds = {name: pot.get("moisture_min") for name, pot in pots.items()}
+    return predict_next_checks(sensor_log_path, watering_log_path, thresholds, devices, open_pots)
+
+
+def latest_image(folder="images"):
+    """最新一张写完的照片（上传中的文件是 .jpg.part）；还没有照片时用 image.jpg。"""
+    try:
+        files = sorted(f for f in os.listdir(folder)
+                       if f.endswith(".jpg") and os.path.isfile(os.path.join(folder, f)))
+    except FileNotFoundError:
+        files = []
+    if not files:
+        print("no files found")
+        return "image.jpg"
+    return folder + "/" + files[-1]
+
+
+def run_round(image_path=None, pot_info_path=POT_INFO_FILE, sensor_log_path=SENSOR_LOG_FILE,
+              watering_log_path=WATERING_LOG_FILE, commands_path=PUMP_COMMANDS_FILE, **assess_kwargs):
+    """
+    一轮检查：注册表里的每一盆（/save_pot、/api/pots 加的都算）各自判断要不要评估，
+    阈值、位置（预报）、设备都取这盆自己的配置。返回距下一轮的秒数。
+    assess_kwargs 原样传给 assess_with_local_model（测试时传 complete / write_logs）。
+    """
+    pots = get_registry(pot_info_path).all()
+    if not pots:
+        print("[scheduler] pot_info.json has no pot configuration, waiting for /setup")
+        return 60
+    image_path = image_path or latest_image()
+
+    inputs = []
+    before = check_plan(pots, sensor_log_path, watering_log_path, commands_path)
+    for name, pot in pots.items():
+        # 照片和上次评估时几乎一样、土也还不缺水（或者已经在等水泵）：这一盆跳过评估（不编码图片、不调模型）
+        needs_water = before[name]["seconds_until_check"] == 0
+        changed, distance = frame_changed(image_path, name)
+        if not changed and not needs_water:
+            print(f"[scheduler] {name}: frame unchanged (hamming {distance}), skipping assessment")
+            continue
+        # 预报由后台线程刷新，这里只读缓存里现成的特征
+        forecast = (get_features(*pot.location) if pot.location else None) or {}
+        try:
+            inputs.append(build_pot_input(name, image_path, pot.pot_diameter, pot.pot_height, forecast,
+                                          sensor_log_path=sensor_log_path, pot_info_path=pot_info_path))
+        except ValueError as e:
+            print(f"[scheduler] {name}: cannot build input:", e)
+
+    if inputs:
+        # 本地模型有把握的直接用，其余走远程批量评估；回复格式不对只记错误（并单独重试），不会让 loop 退出
+        try:
+            outcome = assess_with_local_model(inputs, **assess_kwargs)
+            print(f"[scheduler] assessed {len(outcome['results'])} pot(s): {outcome['local']} local,"
+                  f" {outcome['calls']} remote call(s), {len(outcome['errors'])} failed")
+            for name, result in outcome["results"].items():
+                mark_assessed(image_path, name)
+                dispatch_watering(name, result, commands_path, pot_info_path)
+        except Exception as e:
+            print("[scheduler] assessment failed:", e)
+
+    # 不再固定间隔：按湿度下降速度预测每盆下一次需要检查的时间，睡到最早的那一盆
+    plan = check_plan(pots, sensor_log_path, watering_log_path, commands_path)
+    for name, next_check in plan.items():
+        print(f"[scheduler] {name}: next check at", next_check["next_check_at"],
+              f"({next_check['reason']}, moisture={next_check['moisture_now']}, "
+              f"threshold={next_check['threshold']})")
+    return max(min(p["seconds_until_check"] for p in plan.values()), 5)
 
 
 def loop():
+    refresh_due(pot_locations())  # 第一轮之前先同步取一次，之后交给后台线程
+    start_background_refresh(pot_locations)
+    warm_up()  # 有本地视觉模型时先加载好，之后每轮推理只要几十毫秒
     while True:
-        # watering_result = main()
-        # should_water = watering_result.get("should_water", False)
-        # note = watering_result.get("note", "No note")
-
-        # # if should_water:
-        # #     water_ml = watering_result.get("water_ml", 0)
-        # #     # TODO: 控制水泵浇水
-        # #     append_watering_log(water_ml, note)
-        # # else:
-        # #     append_watering_log(0, note)
-
-
-        folder = "images"
-
-        files = [f for f in os.listdir(folder) if os.path.isfile(os.path.join(folder, f))]
-        files.sort()
-
-        if files:
-            image_path = files[-1]
-        else:
-            image_path = ""
-            print("no files found")
-
-        # with open("sci_name.txt", "r", encoding="utf-8") as f:
-        #     plant_name = f.readline().strip()
-
-        # # assess_plant_health(image_path=folder+'/'+image_path,
-        #                     # plant_name=plant_name,
-        #                     # )
-        pot_path = "pot_info.json"
-        with open(pot_path,"r") as f:
-            pot_info = json.load(f)
-        pot_diameter, pot_height = pot_info["pot_diameter"], pot_info["pot_height"]
-
-        will_rain_next_24h, rain_mm_next_24h, max_temp_next_24h_c = get_24h_forecast()
-        if image_path:
-            image_path = "images/"+image_path
-        else:
-            image_path = "image.jpg"
-        assess_health_and_irrigation(
-            image_path=image_path,
-            pot_diameter=pot_diameter,
-            pot_height=pot_height,
-            will_rain_next_24h=will_rain_next_24h,
-            rain_mm_next_24h=rain_mm_next_24h,
-            max_temp_next_24h_c=max_temp_next_24h_c,
-        )
-
-        time.sleep(5)  # 24 hours
-
-
+        maybe_compact_logs()
+        time.sleep(run_round())
 
 
 if __name__ == "__main__":
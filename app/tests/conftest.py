@@ -0,0 +1,21 @@
+"""
+测试都在 app/ 目录下跑（和 web / scheduler 一样）：
+
+    cd app && python -m pytest -q
+
+缺少可选依赖（flask、requests ……）的测试用 pytest.importorskip 跳过。
+"""
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """每个测试一个空的数据目录（日志、.store_versions、归档都在这里），并把它设为当前目录。"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from modules.anomaly import check_reading, device_health, ingest_readings
+
+
+def _reading(minute, **values):
+    return {"timestamp": f"2025-06-01T12:{minute:02d}:00", "device": "board-a", **values}
+
+
+def test_field_the_device_never_sends_is_not_missing(data_dir):
+    """没接光照传感器的板子：light_lux 一直是 None（或者干脆不发），不报 missing，设备状态是 ok。"""
+    log = str(data_dir / "sensor_log.json")
+    records = [_reading(i, soil_moisture_percent=40.0 + i % 2, soil_temperature_c=20.0, light_lux=None)
+               for i in range(5)]
+    records.append(_reading(5, soil_moisture_percent=41.0, soil_temperature_c=20.0))
+    _, anomalies = ingest_readings(records, log)
+    assert anomalies == [[]] * 6
+    state = device_health(log, now=datetime(2025, 6, 1, 12, 10))["board-a"]
+    assert state["status"] == "ok" and "light_lux" not in state["last_valid"]
+
+
+def test_sensor_that_stops_reporting_is_still_flagged():
+    state = {}
+    assert check_reading(_reading(0, soil_moisture_percent=40.0, light_lux=300.0), state) == []
+    for minute in range(1, 4):
+        anomalies = check_reading(_reading(minute, soil_moisture_percent=40.0, light_lux=None), state)
+        assert anomalies == ["light_lux:missing"]
+    assert state["status"] == "faulty"
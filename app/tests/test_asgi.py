@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+
+def test_keep_alive_requests_through_flask_all_succeed():
+    """
+    uvicorn 在上一个响应的 send() 里就开始处理同一个 keep-alive 连接上已经到达的下一个请求，
+    新请求的 task 继承了当时的 context；asgiref 留在里面的状态不能让下一个请求 500。
+    """
+    pytest.importorskip("flask")
+    pytest.importorskip("asgiref")
+    from asgi import application
+
+    statuses, tasks = [], []
+
+    async def request(remaining):
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+            elif not message.get("more_body") and remaining > 1:
+                tasks.append(asyncio.get_running_loop().create_task(request(remaining - 1)))
+
+        scope = {"type": "http", "method": "GET", "path": "/no-such-page", "raw_path": b"/no-such-page",
+                 "root_path": "", "query_string": b"", "headers": [], "http_version": "1.1", "scheme": "http",
+                 "server": ("127.0.0.1", 5000), "client": ("127.0.0.1", 50000)}
+        await application(scope, receive, send)
+
+    async def connection():
+        await request(4)
+        while tasks:
+            await tasks.pop(0)
+
+    asyncio.run(connection())
+    assert statuses == [404] * 4
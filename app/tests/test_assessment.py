@@ -0,0 +1,172 @@
+import json
+import re
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import scheduler
+from modules import pump_commands
+from modules.anomaly import ingest_readings
+from modules.assessment_schema import AssessmentError, parse_batch, parse_single
+from modules.batch_assess import assess_batch, build_pot_input
+
+
+def _result(water_ml=150, level=4):
+    return {
+        "health": {"health_level": level, "reasons": ["healthy"],
+                   "suggestions": ["Keep the current routine.", "Check leaves weekly."]},
+        "irrigation": {"should_water": water_ml > 0, "water_ml": water_ml,
+                       "target_soil_moisture_percent_min": 35, "target_soil_moisture_percent_max": 60,
+                       "note": "Fake model reply."},
+    }
+
+
+# ---------- 严格解析 ----------
+
+@pytest.mark.parametrize("bad", ["NaN", "Infinity", "-Infinity", "1e400", "150.5", '"150"', "true"])
+def test_non_integer_water_ml_rejected_for_that_pot_only(bad):
+    good = json.dumps(_result())
+    broken = good.replace('"water_ml": 150', f'"water_ml": {bad}')
+    reply = '{"pots": {"a": %s, "b": %s}}' % (good, broken)
+    results, errors = parse_batch(reply, ["a", "b"])
+    assert set(results) == {"a"} and set(errors) == {"b"}
+    assert "water_ml" in errors["b"]
+    with pytest.raises(AssessmentError):
+        parse_single(broken)
+
+
+@pytest.mark.parametrize("bad", ['"4"', '"four"', "0", "6", "4.5", "true", "null"])
+def test_health_level_must_be_an_integer_in_range(bad):
+    broken = json.dumps(_result()).replace('"health_level": 4', f'"health_level": {bad}')
+    with pytest.raises(AssessmentError, match="health_level"):
+        parse_single(broken)
+    assert parse_single(json.dumps(_result(level=5)))["health"]["health_level"] == 5
+
+
+def test_schema_errors_are_per_pot():
+    extra = _result()
+    extra["health"]["mood"] = "happy"
+    unknown_tag = _result()
+    unknown_tag["health"]["reasons"] = ["not_a_tag"]
+    reply = json.dumps({"pots": {"ok": _result(), "extra": extra, "tag": unknown_tag}})
+    results, errors = parse_batch(reply, ["ok", "extra", "tag", "missing"])
+    assert set(results) == {"ok"}
+    assert set(errors) == {"extra", "tag", "missing"}
+    assert errors["missing"] == "missing from reply"
+    results, errors = parse_batch("not json", ["ok", "extra"])
+    assert results == {} and set(errors) == {"ok", "extra"}
+
+
+# ---------- 每盆自己的传感器读数 ----------
+
+def _setup_pots(data_dir):
+    pot_info = data_dir / "pot_info.json"
+    pot_info.write_text(json.dumps({"pots": {
+        "balcony": {"pot_diameter": 18, "pot_height": 20, "device": "board-a", "plant_name": "Monstera deliciosa"},
+        "kitchen": {"pot_diameter": 12, "pot_height": 10, "device": "board-b", "plant_name": "Ocimum basilicum"},
+    }}))
+    log = str(data_dir / "sensor_log.json")
+    now = "2025-06-01T12:00:00"
+    ingest_readings([
+        {"timestamp": now, "device": "board-a", "soil_moisture_percent": 22.0, "light_lux": 900.0},
+        {"timestamp": now, "device": "board-b", "soil_moisture_percent": 61.0, "light_lux": 150.0},
+    ], log)
+    image = data_dir / "photo.jpg"
+    image.write_bytes(b"\xff\xd8\xff\xe0fake jpeg")
+    return str(pot_info), log, str(image)
+
+
+def test_build_pot_input_uses_each_pots_device(data_dir):
+    pot_info, log, image = _setup_pots(data_dir)
+    a = build_pot_input("balcony", image, 18, 20, sensor_log_path=log, pot_info_path=pot_info)
+    b = build_pot_input("kitchen", image, 12, 10, sensor_log_path=log, pot_info_path=pot_info)
+    assert (a["soil_moisture_percent"], a["light_lux"], a["plant_name"]) == (22.0, 900.0, "Monstera deliciosa")
+    assert (b["soil_moisture_percent"], b["light_lux"], b["plant_name"]) == (61.0, 150.0, "Ocimum basilicum")
+
+
+# ---------- 假模型服务器 ----------
+
+class FakeModel(BaseHTTPRequestHandler):
+    """为每个 "pot_id: ..." 按湿度给出结果；broken 里的 pot 在批量回复里给 NaN。"""
+    broken = set()
+    calls = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = [part["text"] for msg in body["messages"] if msg["role"] == "user"
+                 for part in msg["content"] if part["type"] == "text"]
+        FakeModel.calls += 1
+
+        def result(text):
+            moisture = float(re.search(r"soil_moisture_percent: (\S+)", text).group(1))
+            return json.dumps(_result(150 if moisture < 35 else 0))
+
+        pot_ids = [re.match(r"pot_id: (\S+)", t).group(1) for t in texts if t.startswith("pot_id:")]
+        if pot_ids:
+            parts = []
+            for pot, t in zip(pot_ids, texts):
+                r = result(t)
+                if pot in self.broken:
+                    r = re.sub(r'"water_ml": \d+', '"water_ml": NaN', r)
+                parts.append(f'"{pot}": {r}')
+            content = '{"pots": {%s}}' % ", ".join(parts)
+        else:
+            content = result(texts[0])
+        reply = json.dumps({"choices": [{"message": {"role": "assistant", "content": content}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_model():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeModel)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+    def complete(messages, model):
+        req = urllib.request.Request(url, data=json.dumps({"model": model, "messages": messages}).encode(),
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return json.loads(resp.read())["choices"][0]["message"]["content"]
+
+    FakeModel.calls, FakeModel.broken = 0, set()
+    yield complete
+    server.shutdown()
+    server.server_close()
+
+
+def test_batch_against_fake_model_retries_only_the_bad_pot(data_dir, fake_model):
+    pot_info, log, image = _setup_pots(data_dir)
+    inputs = [build_pot_input(p, image, 18, 20, sensor_log_path=log, pot_info_path=pot_info)
+              for p in ("balcony", "kitchen")]
+    FakeModel.broken = {"kitchen"}
+    out = assess_batch(inputs, batch_size=4, complete=fake_model, write_logs=False)
+    assert out["errors"] == {}
+    assert out["calls"] == FakeModel.calls == 2       # 一次批量 + kitchen 单独重试一次
+    assert out["results"]["balcony"]["irrigation"]["water_ml"] == 150
+    assert out["results"]["kitchen"]["irrigation"]["should_water"] is False
+
+
+def test_scheduler_round_assesses_every_registered_pot_in_one_batch(data_dir, fake_model):
+    """scheduler 的一轮：注册表里的两盆打包成一次请求，各自的结论入库，只给缺水的那盆的板子发命令。"""
+    pot_info, log, image = _setup_pots(data_dir)
+    kwargs = dict(image_path=image, pot_info_path=pot_info, sensor_log_path=log,
+                  commands_path=str(data_dir / pump_commands.PUMP_COMMANDS_FILE), complete=fake_model)
+    wait = scheduler.run_round(**kwargs)
+    assert FakeModel.calls == 1 and wait >= 5
+    assessed = {rec["pot"] for rec in json.loads((data_dir / "plant_health_log.json").read_text())}
+    assert assessed == {"balcony", "kitchen"}
+    (command,) = pump_commands.list_commands(path=kwargs["commands_path"])
+    assert (command["device"], command["pot"], command["water_ml"]) == ("board-a", "balcony", 150.0)
+
+    # 板子没上线、没 ack：下一轮仍然只有这一条命令
+    scheduler.run_round(**kwargs)
+    assert len(pump_commands.take_commands("board-a", kwargs["commands_path"])) == 1
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+from modules import drying
+from modules.storage import save_json
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def _readings(path, series):
+    """series = {device: (起始湿度, 每小时变化)}，最近 6 小时每 30 分钟一条。"""
+    records = []
+    for i in range(13):
+        t = NOW - timedelta(minutes=30 * (12 - i))
+        for device, (start, per_hour) in series.items():
+            records.append({"timestamp": t.isoformat(timespec="seconds"), "device": device,
+                            "soil_moisture_percent": round(start + per_hour * i / 2, 2)})
+    save_json(path, records)
+
+
+def test_all_pots_fit_in_one_pass(data_dir):
+    sensor, watering = str(data_dir / "sensor_log.json"), str(data_dir / "watering_log.json")
+    _readings(sensor, {"board-a": (60, -2.0), "board-b": (50, -0.5), "board-c": (45, 1.0)})
+    pots = {"balcony": 30, "kitchen": 30, "porch": 30}
+    devices = {"board-a": "balcony", "board-b": "kitchen", "board-c": "porch"}
+    plan = drying.predict_next_checks(sensor, watering, pots, devices, now=NOW)
+
+    assert plan["balcony"]["slope_per_hour"] == -2.0 and plan["balcony"]["moisture_now"] == 49.0
+    assert plan["balcony"]["reason"] == "predicted" and plan["balcony"]["hours_to_threshold"] == 9.0
+    assert plan["kitchen"]["slope_per_hour"] == -0.5
+    assert plan["porch"]["reason"] == "not drying"
+    # 一起算和单独算结果一样
+    single = drying.predict_next_check(sensor, watering, pot="kitchen", threshold=30, now=NOW, device="board-b")
+    assert single == plan["kitchen"]
+
+
+def test_open_command_does_not_return_zero_wait(data_dir):
+    sensor, watering = str(data_dir / "sensor_log.json"), str(data_dir / "watering_log.json")
+    _readings(sensor, {"board-a": (30, -1.0)})
+    pots, devices = {"balcony": 35}, {"board-a": "balcony"}
+
+    dry = drying.predict_next_checks(sensor, watering, pots, devices, now=NOW)["balcony"]
+    assert (dry["reason"], dry["seconds_until_check"]) == ("below threshold", 0)
+    pending = drying.predict_next_checks(sensor, watering, pots, devices, open_pots={"balcony"}, now=NOW)["balcony"]
+    assert (pending["reason"], pending["seconds_until_check"]) == ("watering pending", drying.MIN_INTERVAL_S)
@@ -0,0 +1,84 @@
+"""
+固件（hardware/，MicroPython）在 CPython 上用 mock_board 的假硬件模块跑：
+采样循环把二进制帧发给本地假 /upload_bin，服务器端的 telemetry.decode 能解出同样的读数。
+"""
+import os
+import sys
+import time
+import asyncio
+
+import pytest
+
+from modules import telemetry
+
+HARDWARE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                            "hardware")
+
+
+@pytest.fixture
+def mock_board(monkeypatch):
+    """导入 mock_board 并装上假的 machine / network / ds18x20 / dht；结束后把固件模块从 sys.modules 清掉。"""
+    monkeypatch.syspath_prepend(HARDWARE_DIR)
+    before = set(sys.modules)
+    import mock_board
+
+    mock_board.install_fake_modules(lux=300.0, soil_temp=21.5, air=(22.0, 55.0))
+    yield mock_board
+    for name in set(sys.modules) - before:
+        del sys.modules[name]
+
+
+def test_sampling_loop_uploads_binary_frames(mock_board):
+    import main
+
+    async def scenario():
+        received = []
+        server = await mock_board.start_server(0, received)
+        port = server.sockets[0].getsockname()[1]
+        main.SERVER_BIN_URL = "http://127.0.0.1:{}/upload_bin".format(port)
+        main.TELEMETRY_FORMAT, main.TRANSPORT, main.CYCLE_MS = "binary", "http", 0
+        sensors = main.make_sensors(main.I2C_SDA_PIN, main.I2C_SCL_PIN, main.SOIL_MOISTURE_PIN,
+                                    main.DS18B20_PIN, main.DHT22_PIN)
+        t0 = time.perf_counter()
+        await main.run(sensors, cycles=2, clock_ms=lambda: int(time.monotonic() * 1000))
+        elapsed = time.perf_counter() - t0
+        server.close()
+        return received, elapsed
+
+    received, elapsed = asyncio.run(scenario())
+    assert len(received) == 2
+    readings = telemetry.decode(b"".join(received))
+    for r in readings:
+        assert r["light_lux"] == pytest.approx(300.0, abs=1)
+        assert r["soil_temperature_c"] == pytest.approx(21.5)
+        assert (r["air_temperature_c"], r["air_humidity_percent"]) == (pytest.approx(22.0), pytest.approx(55.0))
+        assert r["soil_moisture_percent"] is not None
+    # 并发采样：每轮约等于 DS18B20 的 750 ms 转换时间，而不是各传感器耗时相加
+    assert elapsed < 2 * 0.93
+
+
+def test_pump_loop_runs_each_command_once(mock_board):
+    import pump as pump_mod
+    import machine
+
+    async def scenario():
+        queue, log = asyncio.Queue(), []
+        server = await mock_board.start_pump_server(0, queue, log)
+        base_url = "http://127.0.0.1:{}".format(server.sockets[0].getsockname()[1])
+        pump_mod.POLL_WAIT_S, pump_mod.FLOW_ML_PER_S = 1, 1000.0
+        pump = pump_mod.Pump(27, flow_ml_per_s=pump_mod.FLOW_ML_PER_S)
+        command = {"id": "c1", "pot": "balcony", "water_ml": 50}
+        for c in (command, command):          # 服务器重发了同一条命令
+            queue.put_nowait(c)
+        await pump_mod.command_loop(pump, base_url, "mock-board", rounds=3)
+        server.close()
+        return log
+
+    machine.Pin.changes.clear()
+    log = asyncio.run(scenario())
+    levels = [level for _, pin, level in machine.Pin.changes if pin == 27]
+    assert levels == [0, 1, 0]                    # 初始化关、开泵一次、关
+    acks = [body for _, path, body in log if path == "/api/pump/ack"]
+    reports = [body for _, path, body in log if path == "/api/report_watering"]
+    assert acks == [{"device": "mock-board", "id": "c1", "status": "started"}]
+    assert [(r["command_id"], r["pot"], r["water_ml"]) for r in reports] == [("c1", "balcony", 50.0)]
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from modules import health_summary
+from modules.archive import compact_log
+from modules.health_summary import (append_health_assessment, get_health_summary, load_health_summary,
+                                    rebuild_health_summary, summary_path_for)
+from modules.storage import append_json_log, load_json, save_json
+
+
+def _entry(level, pot="p1", reasons=("healthy",), days_ago=0):
+    ts = (datetime.now() - timedelta(days=days_ago)).replace(microsecond=0).isoformat()
+    return {"timestamp": ts, "date": ts[:10], "pot": pot, "health_level": level, "reasons": list(reasons)}
+
+
+def test_append_updates_log_and_summary_together(data_dir):
+    log = str(data_dir / "plant_health_log.json")
+    append_health_assessment(_entry(4), log)
+    append_health_assessment(_entry(2, reasons=("yellow_leaves",)), log)
+    append_health_assessment(_entry(5, pot="p2"), log)
+
+    assert len(load_json(log, [])) == 3
+    stored = load_json(summary_path_for(log), None)
+    assert set(stored["pots"]) == {"p1", "p2"}
+    week = get_health_summary(log, "p1")["windows"]["7d"]
+    assert week["assessments"] == 2 and week["mean_health_level"] == 3.0
+    assert week["tags"] == {"healthy": 1, "yellow_leaves": 1}
+
+
+def test_log_written_elsewhere_triggers_rebuild(data_dir):
+    log = str(data_dir / "plant_health_log.json")
+    append_health_assessment(_entry(4), log)
+    assert get_health_summary(log, "p1")["windows"]["7d"]["assessments"] == 1
+
+    # 绕过摘要直接追加（比如老代码、手动修复），版本号对不上，读取时重建
+    append_json_log(_entry(2), log)
+    assert get_health_summary(log, "p1")["windows"]["7d"]["assessments"] == 2
+    # 下一次增量追加建立在重建后的摘要上
+    append_health_assessment(_entry(3), log)
+    assert get_health_summary(log, "p1")["windows"]["7d"]["assessments"] == 3
+
+
+def test_summary_cached_between_writes(data_dir, monkeypatch):
+    log = str(data_dir / "plant_health_log.json")
+    append_health_assessment(_entry(4), log)
+    first = load_health_summary(log)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("summary re-read without a write")
+
+    monkeypatch.setattr(health_summary, "load_json", fail)
+    assert load_health_summary(log) is first
+
+
+def test_stale_pot_keeps_its_own_latest(data_dir):
+    """cellar 最近 30 天没有评估、p1 有：重建后两盆都有自己的 latest，cellar 没有窗口内的统计。"""
+    log = str(data_dir / "plant_health_log.json")
+    append_json_log(_entry(2, pot="cellar", days_ago=45), log)
+    append_json_log(_entry(3, pot="cellar", days_ago=40), log)
+    append_health_assessment(_entry(5), log)
+
+    def check():
+        summary = load_health_summary(log)
+        assert summary["p1"]["latest"]["health_level"] == 5
+        assert summary["cellar"]["latest"]["health_level"] == 3 and summary["cellar"]["days"] == {}
+
+    check()
+    # 旧记录归档之后也能从归档里找回（cellar 在注册表里）
+    save_json(str(data_dir / "pot_info.json"), {"pots": {
+        "p1": {"pot_diameter": 18, "pot_height": 20}, "cellar": {"pot_diameter": 12, "pot_height": 10}}})
+    assert compact_log(log, retain_days=30) == 2
+    rebuild_health_summary(log)
+    check()
@@ -0,0 +1,107 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from modules import http_client
+from modules.http_client import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_transitions():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    assert breaker.allow() and not breaker.failure()
+    assert breaker.failure()                      # 第二次连续失败：打开
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    clock.now = 10
+    assert breaker.allow()                        # 放一个试探请求
+    assert breaker.state == CircuitBreaker.HALF_OPEN and not breaker.allow()
+    assert breaker.failure()                      # 试探失败：重新打开，重新计时
+    clock.now = 15
+    assert not breaker.allow()
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_call_opens_breaker_and_fails_fast():
+    http_client.configure("test-call", failure_threshold=2, reset_timeout=60)
+
+    def boom():
+        raise ValueError("model down")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            http_client.call("test-call", boom)
+    with pytest.raises(CircuitOpenError):
+        http_client.call("test-call", boom)
+    s = http_client.stats()["test-call"]
+    assert (s["failures"], s["breaker_opens"], s["short_circuited"], s["breaker"]) == (2, 1, 1, "open")
+
+
+# ---------- request()：本地假服务器 ----------
+
+class _Handler(BaseHTTPRequestHandler):
+    statuses = []
+
+    def do_GET(self):
+        status = self.statuses.pop(0) if self.statuses else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    pytest.importorskip("requests")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_request_retries_5xx_then_succeeds(server):
+    http_client.configure("test-retry", retries=2, backoff_base=0.001, timeout=(1, 2))
+    _Handler.statuses = [503, 502]
+    resp = http_client.request("test-retry", "GET", server + "/x")
+    assert resp.status_code == 200
+    s = http_client.stats()["test-retry"]
+    assert (s["requests"], s["retries"], s["failures"], s["breaker"]) == (3, 2, 0, "closed")
+
+
+def test_unexpected_error_in_half_open_reopens_breaker(server):
+    import requests
+
+    http_client.configure("test-half-open", retries=0, failure_threshold=1, reset_timeout=0, timeout=(1, 2))
+    _Handler.statuses = [500]
+    with pytest.raises(requests.HTTPError):
+        http_client.request("test-half-open", "GET", server + "/x")
+    breaker = http_client._state("test-half-open").breaker
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # 试探请求抛了非连接类的异常：必须记为失败（重新打开），不能卡在 half_open
+    with pytest.raises(requests.exceptions.InvalidURL):
+        http_client.request("test-half-open", "GET", "http://[bad")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    resp = http_client.request("test-half-open", "GET", server + "/x")
+    assert resp.status_code == 200 and breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,53 @@
+import json
+
+from modules import telemetry
+from modules.mqtt_bridge import LocalBroker, MqttBridge, topic_matches
+from modules.storage import load_json
+from modules.store_version import get_version
+
+READING = {"light_lux": 312.5, "soil_moisture_percent": 41.7, "soil_temperature_c": 21.3,
+           "air_temperature_c": 24.8, "air_humidity_percent": 38.0, "device": "board-a"}
+
+
+def test_topic_matching():
+    assert topic_matches("plants/+/sensor", "plants/balcony/sensor")
+    assert not topic_matches("plants/+/sensor", "plants/balcony/sensor/bin")
+    assert topic_matches("plants/+/sensor/bin", "plants/balcony/sensor/bin")
+    assert topic_matches("plants/#", "plants/balcony/sensor/bin")
+    assert not topic_matches("plants/+/sensor", "plants/sensor")
+
+
+def test_bridge_batches_json_and_binary_messages(data_dir):
+    """进程内 LocalBroker 代替 mosquitto：攒够 batch_size 条才写一次日志，坏消息只计数丢弃。"""
+    log = str(data_dir / "sensor_log.json")
+    broker = LocalBroker()
+    bridge = MqttBridge(log, batch_size=4, flush_interval=3600)
+    bridge.start(broker)
+    try:
+        broker.publish("plants/balcony/sensor", json.dumps(READING))
+        broker.publish("plants/balcony/sensor", "not json")
+        broker.publish("plants/kitchen/sensor/bin", telemetry.encode(READING, 1) * 2)
+        broker.publish("plants/kitchen/sensor/bin", b"\x00" * 5)   # 长度不对
+        assert load_json(log, []) == [] and get_version(log) == 0
+        broker.publish("plants/kitchen/sensor", json.dumps({**READING, "light_lux": -5}))
+    finally:
+        bridge.stop()
+
+    records = load_json(log, [])
+    assert (bridge.received, bridge.dropped, bridge.written) == (4, 2, 4)
+    assert get_version(log) == 1            # 一批只追加一次
+    assert [r["pot"] for r in records] == ["balcony", "kitchen", "kitchen", "kitchen"]
+    assert all(r["remote_addr"] == "mqtt" for r in records)
+    assert records[1]["light_lux"] == records[2]["light_lux"] == 312.5
+    assert records[1]["device"] == telemetry.device_name(1)
+    assert "anomalies" in records[3] and "anomalies" not in records[0]
+
+
+def test_stop_flushes_partial_batch(data_dir):
+    log = str(data_dir / "sensor_log.json")
+    broker = LocalBroker()
+    bridge = MqttBridge(log, batch_size=100, flush_interval=3600)
+    bridge.start(broker)
+    broker.publish("plants/balcony/sensor", json.dumps(READING))
+    bridge.stop()
+    assert len(load_json(log, [])) == 1
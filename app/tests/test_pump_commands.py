@@ -0,0 +1,114 @@
+import threading
+
+import scheduler
+from modules import pump_commands
+from modules.ai_test import record_assessment
+from modules.records import WateringEvent
+from modules.storage import append_json_log
+from modules.watering_index import get_index
+
+
+def test_ack_flow_and_redelivery(data_dir):
+    path = str(data_dir / pump_commands.PUMP_COMMANDS_FILE)
+    command = pump_commands.enqueue("board-a", 120, pot="balcony", reason="test", path=path, decided_at=1000.0)
+    assert pump_commands.take_commands("board-b", path) == []
+
+    (taken,) = pump_commands.take_commands("board-a", path, now=1001.0)
+    assert taken == {"id": command["id"], "pot": "balcony", "water_ml": 120.0}
+    assert pump_commands.list_commands("board-a", path)[0]["status"] == "delivered"
+    # 还没 ack：REDELIVER_S 内不重发，之后重发
+    assert pump_commands.take_commands("board-a", path, now=1002.0) == []
+    assert len(pump_commands.take_commands("board-a", path, now=1001.0 + pump_commands.REDELIVER_S)) == 1
+
+    started = pump_commands.acknowledge(command["id"], "started", device="board-a", path=path, now=1040.0)
+    assert started["status"] == "started" and started["started_at"] == 1040.0
+    assert pump_commands.take_commands("board-a", path, now=2000.0) == []
+
+    done = pump_commands.acknowledge(command["id"], "done", water_ml=118.5, path=path, now=1045.0)
+    assert done["status"] == "done" and done["water_ml_actual"] == 118.5
+    # 已结束的命令不再被迟到的 ack 改动
+    late = pump_commands.acknowledge(command["id"], "failed", path=path, now=1050.0)
+    assert late["status"] == "done"
+    assert pump_commands.acknowledge("nope", "done", path=path) is None
+
+    stats = pump_commands.latency_stats(path=path)
+    assert stats["open"] == 0 and stats["to_actuation"]["max"] == 40.0
+
+
+def _decision(water_ml):
+    return {
+        "health": {"health_level": 4, "reasons": ["healthy"], "suggestions": ["Water soon."]},
+        "irrigation": {"should_water": water_ml > 0, "water_ml": water_ml,
+                       "target_soil_moisture_percent_min": 35, "target_soil_moisture_percent_max": 60,
+                       "note": "Soil is dry."},
+    }
+
+
+def test_simulated_device_waters_once(data_dir):
+    """评估 -> 入队 -> 设备长轮询拿到命令、开泵、回报：日志里有两条，但只算一次浇水。"""
+    commands = str(data_dir / pump_commands.PUMP_COMMANDS_FILE)
+    watering_log = str(data_dir / "watering_log.json")
+    stop = threading.Event()
+
+    def device():
+        while not stop.is_set():
+            for c in pump_commands.wait_for_commands("board-a", 0.5, commands):
+                pump_commands.acknowledge(c["id"], "started", device="board-a", path=commands)
+                # /api/report_watering 带 command_id 时写的记录
+                append_json_log(WateringEvent.from_dict({
+                    "timestamp": "2025-06-01T08:00:05", "date": "2025-06-01", "pot": c["pot"],
+                    "water_ml": c["water_ml"], "reason": "pump", "source": "pump", "command_id": c["id"],
+                }).to_dict(), watering_log)
+                pump_commands.acknowledge(c["id"], "done", device="board-a", water_ml=c["water_ml"], path=commands)
+
+    board = threading.Thread(target=device, daemon=True)
+    board.start()
+    try:
+        result = _decision(150)
+        record_assessment(result, image_path="photo.jpg", pot="balcony", plant_name="Monstera deliciosa",
+                          health_log_path=str(data_dir / "plant_health_log.json"), watering_log_path=watering_log)
+        command = pump_commands.enqueue("board-a", result["irrigation"]["water_ml"], pot="balcony", path=commands)
+        for _ in range(200):
+            if pump_commands.list_commands("board-a", commands)[0]["status"] == "done":
+                break
+            stop.wait(0.02)
+    finally:
+        stop.set()
+        board.join()
+
+    assert pump_commands.list_commands("board-a", commands)[0]["id"] == command["id"]
+    assert pump_commands.list_commands("board-a", commands)[0]["status"] == "done"
+    index = get_index(watering_log, "balcony")
+    assert len(index.events) == 1 and index.events[0]["source"] == "pump"
+    assert sum(ml for ml, _ in index.daily.values()) == 150
+
+
+def test_repeated_assessments_queue_one_command(data_dir):
+    """设备离线时连续两轮评估都要浇水：只留一条命令，设备上线后只浇一次；结束后才能再入队。"""
+    commands = str(data_dir / pump_commands.PUMP_COMMANDS_FILE)
+    pot_info = str(data_dir / "pot_info.json")
+    first = scheduler.dispatch_watering("balcony", _decision(150), commands, pot_info)
+    second = scheduler.dispatch_watering("balcony", _decision(180), commands, pot_info)
+    assert second["id"] == first["id"]
+    # 别的盆不受影响
+    other = scheduler.dispatch_watering("kitchen", _decision(80), commands, pot_info)
+    assert other["id"] != first["id"]
+
+    taken = pump_commands.take_commands(pump_commands.DEFAULT_DEVICE, commands)
+    assert sorted(c["pot"] for c in taken) == ["balcony", "kitchen"]
+    assert scheduler.dispatch_watering("balcony", _decision(150), commands, pot_info)["id"] == first["id"]
+
+    pump_commands.acknowledge(first["id"], "done", water_ml=150, path=commands)
+    assert pump_commands.open_command(pump_commands.DEFAULT_DEVICE, "balcony", commands) is None
+    again = scheduler.dispatch_watering("balcony", _decision(150), commands, pot_info)
+    assert again["id"] != first["id"]
+
+
+def test_stale_command_expires_instead_of_blocking(data_dir):
+    path = str(data_dir / pump_commands.PUMP_COMMANDS_FILE)
+    old = pump_commands.enqueue("board-a", 100, pot="balcony", path=path, decided_at=1000.0, now=1000.0)
+    later = 1001.0 + pump_commands.COMMAND_TTL_S
+    new = pump_commands.enqueue("board-a", 100, pot="balcony", path=path, now=later)
+    assert new["id"] != old["id"]
+    statuses = {c["id"]: c["status"] for c in pump_commands.list_commands("board-a", path)}
+    assert statuses == {old["id"]: "expired", new["id"]: "pending"}
@@ -0,0 +1,29 @@
+"""冷启动检查（benchmarks/bench_startup.py 的测量放进测试）：重依赖只在第一次真正调用时才 import。"""
+import os
+
+import pytest
+
+from conftest import APP_DIR
+
+
+@pytest.fixture
+def bench_startup(monkeypatch):
+    monkeypatch.syspath_prepend(os.path.join(APP_DIR, "benchmarks"))
+    import bench_startup
+
+    return bench_startup
+
+
+@pytest.mark.parametrize("module", ["modules.ai_test", "modules.batch_assess", "modules.http_client",
+                                    "modules.main", "modules.weather_module"])
+def test_modules_do_not_import_heavy_clients(bench_startup, module):
+    (result,) = bench_startup.measure(module, runs=1)
+    assert result["heavy"] == []
+
+
+def test_web_app_starts_within_budget(bench_startup):
+    pytest.importorskip("flask")
+    results = bench_startup.measure("app", runs=3)
+    times = sorted(r["seconds"] for r in results)
+    assert times[1] < bench_startup.BUDGET_SECONDS
+    assert all(r["heavy"] == [] for r in results)
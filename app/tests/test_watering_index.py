@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from modules import watering_index
+from modules.archive import compact_log
+from modules.storage import append_json_log, append_json_logs, file_lock, write_json_atomic
+from modules.watering_index import ALL_POTS, LogIndex, get_index
+
+
+def _event(ts, ml, pot="p1"):
+    return {"timestamp": ts, "date": ts[:10], "pot": pot, "water_ml": ml}
+
+
+def _fresh(log, pot=None):
+    """不走缓存，从头构建一份索引作对照。"""
+    return LogIndex(log).refresh().get(pot or ALL_POTS)
+
+
+def _same(a, b):
+    assert a.timestamps == b.timestamps
+    assert a.events == b.events
+    assert a.hourly == b.hourly and a.daily == b.daily
+    assert a.hour_keys == b.hour_keys and a.day_keys == b.day_keys
+
+
+def test_append_extends_index_incrementally(data_dir):
+    log = str(data_dir / "watering_log.json")
+    append_json_logs([_event("2025-03-01T08:00:00", 100), _event("2025-03-02T08:00:00", 50, "p2")], log)
+    first = get_index(log)
+    assert len(first.timestamps) == 2
+
+    # 追加（含乱序和 water_ml=0 的记录）只解码新增部分，结果和重新构建一致
+    state = watering_index._indexes[str(data_dir / "watering_log.json")]
+    cursor = state.hot_cursor
+    append_json_logs([_event("2025-03-03T09:30:00", 80), _event("2025-03-01T07:00:00", 20),
+                      _event("2025-03-03T10:00:00", 0)], log)
+    updated = get_index(log)
+    assert updated is first
+    assert state.hot_cursor[0] is cursor[0]
+    _same(updated, _fresh(log))
+    _same(get_index(log, "p1"), _fresh(log, "p1"))
+    assert updated.daily["2025-03-01"] == [120.0, 2]
+    assert get_index(log, "p3").timestamps == []
+
+
+def test_compaction_keeps_totals(data_dir):
+    log = str(data_dir / "watering_log.json")
+    with file_lock(log):
+        write_json_atomic(log, [_event("2025-01-0%dT08:00:00" % d, 10 * d) for d in range(1, 6)])
+    assert sum(ml for ml, _ in get_index(log).daily.values()) == 150
+
+    compact_log(log, retain_days=2, now=datetime(2025, 1, 6))
+    append_json_log(_event("2025-01-06T08:00:00", 60), log)
+    index = get_index(log)
+    assert sum(ml for ml, _ in index.daily.values()) == 210
+    _same(index, _fresh(log))
+    # 归档只在内存里留浇水事件（按文件），不缓存整份记录
+    archived = watering_index._indexes[log].archive_events
+    assert sum(len(events) for _, events in archived.values()) == 3
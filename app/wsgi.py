@@ -0,0 +1,11 @@
+"""
+生产环境 WSGI 入口（多进程 pre-fork）：
+
+    cd app
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+开发时仍然可以直接 python app.py（单进程 + reloader）。
+"""
+from app import app as application
+
+app = application
@@ -1,26 +1,40 @@
 # main.py - Feather ESP32 V2
 # Sensors: BH1750, Capacitive Soil Moisture (ADC), DS18B20, DHT22
 # Upload data to Flask HTTP server as JSON.
-
-import time
-import json
-from machine import Pin, I2C, ADC
-import network
-import dht
-import onewire
-import ds18x20
+#
+# uasyncio loop: all sensors are sampled concurrently (a cycle takes ~750 ms,
+# the DS18B20 conversion, instead of the sum of every wait), and each upload
+# runs in the background while the next cycle samples. Between cycles the
+# board can stay awake, light-sleep or deep-sleep (SLEEP_MODE).
+# With a pump relay (PUMP_PIN) a second task long-polls the server for
+# watering commands next to the sampling loop (pump.py).
 
 try:
-    import urequests as requests
+    import uasyncio as asyncio
 except ImportError:
-    import requests  # fallback
+    import asyncio
+import json
+
+from sensors import make_sensors, sleep_ms
+from net import connect_wifi, mqtt_publish, post, post_json
+from telemetry import encode
+from pump import Pump, command_loop
 
 
 # ---------- WiFi + Server Config ----------
 WIFI_SSID = "Columbia University"
 WIFI_PASSWORD = ""
 
-SERVER_JSON_URL = "http://10.206.182.201:5000/upload"   # Flask /upload endpoint
+SERVER_JSON_URL = "http://10.206.182.201:5000/upload"       # Flask /upload endpoint
+SERVER_BIN_URL = "http://10.206.182.201:5000/upload_bin"    # Flask /upload_bin endpoint
+SERVER_BASE_URL = "http://10.206.182.201:5000"              # pump commands: /api/pump/...
+DEVICE_NAME = "feather-esp32-v2"
+DEVICE_ID = 1            # binary frames carry this id; the server maps it back to DEVICE_NAME
+TELEMETRY_FORMAT = "binary"   # "binary": 16-byte struct frame, "json": JSON object
+
+TRANSPORT = "http"       # "http": POST to Flask, "mqtt": publish to the broker (bridged by app/modules/mqtt_bridge.py)
+MQTT_BROKER = "10.206.182.201"
+POT_NAME = "default"     # MQTT topic: plants/<POT_NAME>/sensor[/bin]
 
 
 # ---------- Pin Definitions (Feather V2) ----------
@@ -32,160 +46,114 @@ SOIL_MOISTURE_PIN = 34   # Capacitive soil moisture -> ADC
 DS18B20_PIN = 13         # DS18B20 DATA (module with pull-up)
 DHT22_PIN = 33           # DHT22 DATA
 
+PUMP_PIN = 27            # pump relay IN; None on boards without a pump
+PUMP_ACTIVE_HIGH = True  # most opto relay boards switch on a LOW input: set False for those
+
+
+# ---------- Cycle Config ----------
+CYCLE_MS = 5000          # time between the start of two sampling cycles
+SLEEP_MODE = "none"      # "none": stay awake (upload overlaps next sampling)
+                         # "light": machine.lightsleep between cycles (WiFi stays associated)
+                         # "deep": machine.deepsleep; the board reboots into main.py every cycle
+
+
+def print_reading(r):
+    print("====== Sensor Readings ======")
+    print("Light:", "ERROR" if r["light_lux"] is None else "{:.2f} lux".format(r["light_lux"]))
+    print("Soil moisture: approx = {:.1f}%".format(r["soil_moisture_percent"]))
+    if r["soil_temperature_c"] is not None:
+        print("Soil temperature (DS18B20): {:.2f} °C".format(r["soil_temperature_c"]))
+    else:
+        print("Soil temperature (DS18B20): ERROR")
+    if r["air_temperature_c"] is not None:
+        print("Air temperature (DHT22): {:.2f} °C".format(r["air_temperature_c"]))
+        print("Air humidity (DHT22): {:.2f}% RH".format(r["air_humidity_percent"]))
+    else:
+        print("Air temperature/humidity (DHT22): ERROR")
+
+
+async def upload(reading):
+    if TRANSPORT == "mqtt":
+        topic = "plants/{}/sensor".format(POT_NAME)
+        if TELEMETRY_FORMAT == "binary":
+            topic, payload = topic + "/bin", encode(reading, DEVICE_ID)
+        else:
+            payload = json.dumps(reading)
+        print("Publishing to", topic)
+        # one small packet on an open connection; short enough to run inline
+        return mqtt_publish(MQTT_BROKER, DEVICE_NAME, topic, payload)
+
+    if TELEMETRY_FORMAT == "binary":
+        print("Uploading binary frame...")
+        status = await post(SERVER_BIN_URL, encode(reading, DEVICE_ID), "application/octet-stream")
+        print("HTTP status:", status)
+        return status is not None and 200 <= status < 300
+    print("Uploading JSON...")
+    return await post_json(SERVER_JSON_URL, reading)
+
+
+async def sleep_until_next_cycle(elapsed_ms):
+    remaining = min(max(0, CYCLE_MS - elapsed_ms), CYCLE_MS)  # clamp: ticks_ms wraps around
+    if SLEEP_MODE == "none":
+        await sleep_ms(remaining)
+        return
+    import machine
+    if SLEEP_MODE == "light":
+        machine.lightsleep(remaining)
+    else:
+        machine.deepsleep(remaining)
+
+
+async def run(sensors, cycles=None, clock_ms=None):
+    """
+    Sampling loop. `cycles` limits the number of cycles (None = forever);
+    `clock_ms` returns a millisecond clock (time.ticks_ms on the board).
+    """
+    if clock_ms is None:
+        import time
+        clock_ms = time.ticks_ms
+    pending = None
+    n = 0
+    while cycles is None or n < cycles:
+        t0 = clock_ms()
+        reading = await sensors.sample()
+        reading["device"] = DEVICE_NAME
+        print_reading(reading)
+
+        # at most one upload in flight: if the previous one is still running, wait for it
+        if pending is not None:
+            await pending
+        pending = asyncio.create_task(upload(reading))
+
+        if SLEEP_MODE != "none":
+            # sleeping stops the CPU / radio, so finish the upload first
+            await pending
+            pending = None
+        n += 1
+        await sleep_until_next_cycle(clock_ms() - t0)
+
+    if pending is not None:
+        await pending
+
+
+async def run_all(sensors, pump):
+    if pump is not None:
+        asyncio.create_task(command_loop(pump, SERVER_BASE_URL, DEVICE_NAME))
+    await run(sensors, cycles=1 if SLEEP_MODE == "deep" else None)
+
 
-# ---------- BH1750 Driver ----------
-class BH1750:
-    PWR_OFF = 0x00
-    PWR_ON = 0x01
-    RESET = 0x07
-    CONT_H_RES_MODE = 0x10
-
-    def __init__(self, i2c, addr=0x23):
-        self.i2c = i2c
-        self.addr = addr
-        self.i2c.writeto(self.addr, bytes([self.PWR_ON]))
-        self.i2c.writeto(self.addr, bytes([self.RESET]))
-
-    def luminance(self):
-        self.i2c.writeto(self.addr, bytes([self.CONT_H_RES_MODE]))
-        time.sleep_ms(180)
-        data = self.i2c.readfrom(self.addr, 2)
-        raw = (data[0] << 8) | data[1]
-        return raw / 1.2  # lux
-
-
-# ---------- WiFi Helpers ----------
-def connect_wifi(ssid, password, timeout=15):
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    if not wlan.isconnected():
-        print("Connecting to WiFi...")
-        wlan.connect(ssid, password)
-        t0 = time.time()
-        while not wlan.isconnected():
-            if time.time() - t0 > timeout:
-                print("WiFi connection timeout")
-                return False
-            time.sleep(1)
-    print("WiFi connected:", wlan.ifconfig())
-    return True
-
-
-def http_post_json(url, data):
-    headers = {"Content-Type": "application/json"}
-    try:
-        resp = requests.post(url, data=json.dumps(data), headers=headers)
-        print("HTTP JSON status:", resp.status_code)
-        resp.close()
-        return True
-    except Exception as e:
-        print("HTTP JSON POST failed:", e)
-        return False
-
-
-# ---------- Sensor Init ----------
-i2c = I2C(0, scl=Pin(I2C_SCL_PIN), sda=Pin(I2C_SDA_PIN), freq=100_000)
-light_sensor = BH1750(i2c)
-
-soil_adc = ADC(Pin(SOIL_MOISTURE_PIN))
-soil_adc.atten(ADC.ATTN_11DB)
-soil_adc.width(ADC.WIDTH_12BIT)
-
-ow = onewire.OneWire(Pin(DS18B20_PIN))
-ds = ds18x20.DS18X20(ow)
-roms = ds.scan()
-print("DS18B20 devices:", roms)
-
-dht22 = dht.DHT22(Pin(DHT22_PIN))
-
-
-# ---------- Sensor Read Helpers ----------
-def read_light():
-    try:
-        return light_sensor.luminance()
-    except Exception as e:
-        print("BH1750 error:", e)
-        return None
-
-
-def read_soil_moisture():
-    raw = soil_adc.read()
-    percent = (raw / 4095) * 100
-    percent = max(0, min(100, percent))
-    return raw, percent
-
-
-def read_soil_temperature():
-    if not roms:
-        return None
-    try:
-        ds.convert_temp()
-        time.sleep_ms(750)
-        temp_c = ds.read_temp(roms[0])
-        return temp_c
-    except Exception as e:
-        print("DS18B20 error:", e)
-        return None
-
-
-def read_air_temp_hum():
-    try:
-        dht22.measure()
-        t = dht22.temperature()
-        h = dht22.humidity()
-        return t, h
-    except Exception as e:
-        print("DHT22 error:", e)
-        return None, None
-
-
-# ---------- Main Loop ----------
 def main():
     wifi_ok = connect_wifi(WIFI_SSID, WIFI_PASSWORD)
     if not wifi_ok:
         print("No WiFi, JSON upload will fail.")
 
-    while True:
-        print("====== Sensor Readings ======")
-
-        lux = read_light()
-        soil_raw, soil_percent = read_soil_moisture()
-        soil_temp = read_soil_temperature()
-        air_temp, air_hum = read_air_temp_hum()
-
-        if lux is not None:
-            print("Light: {:.2f} lux".format(lux))
-        else:
-            print("Light: ERROR")
-
-        print("Soil moisture: raw = {}  approx = {:.1f}%".format(
-            soil_raw, soil_percent
-        ))
-
-        if soil_temp is not None and -50 < soil_temp < 125:
-            print("Soil temperature (DS18B20): {:.2f} °C".format(soil_temp))
-        else:
-            print("Soil temperature (DS18B20): ERROR")
-
-        if air_temp is not None:
-            print("Air temperature (DHT22): {:.2f} °C".format(air_temp))
-            print("Air humidity (DHT22): {:.2f}% RH".format(air_hum))
-        else:
-            print("Air temperature/humidity (DHT22): ERROR")
-
-        payload = {
-            "light_lux": lux,
-            "soil_moisture_percent": soil_percent,
-            "soil_temperature_c": soil_temp,
-            "air_temperature_c": air_temp,
-            "air_humidity_percent": air_hum,
-            "device": "feather-esp32-v2",
-        }
-
-        print("Uploading JSON...")
-        http_post_json(SERVER_JSON_URL, payload)
-        print()
-        time.sleep(5)
+    sensors = make_sensors(I2C_SDA_PIN, I2C_SCL_PIN, SOIL_MOISTURE_PIN, DS18B20_PIN, DHT22_PIN)
+    pump = Pump(PUMP_PIN, PUMP_ACTIVE_HIGH) if PUMP_PIN is not None else None
+    if pump is not None and SLEEP_MODE != "none":
+        # a sleeping board cannot hold the long-poll open
+        print("Pump commands need SLEEP_MODE = 'none'; pump disabled.")
+        pump = None
+    asyncio.run(run_all(sensors, pump))
 
 
 if __name__ == "__main__":
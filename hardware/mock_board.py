@@ -0,0 +1,264 @@
+# mock_board.py - run the firmware loop on a PC (CPython 3.8+)
+# Installs fake `machine`, `network`, `onewire`, `ds18x20` and `dht` modules
+# with realistic conversion delays, starts a tiny HTTP server standing in for
+# Flask /upload, and runs a few cycles of main.run().
+#
+#   cd hardware && python mock_board.py --cycles 3 --upload-delay-ms 400
+#
+# Prints how long each cycle was awake sampling; with concurrent sampling
+# this is ~750 ms (DS18B20 conversion) instead of ~930 ms + upload.
+#
+#   cd hardware && python mock_board.py --pump --commands 5 --rtt-ms 60
+#
+# --pump runs pump.command_loop against a fake /api/pump server instead:
+# commands are queued at random moments while the board long-polls, and the
+# time from "queued" to the relay pin going high is printed per command.
+
+import sys
+import json
+import time
+import types
+import random
+import asyncio
+import argparse
+
+
+# ---------- Fake hardware modules ----------
+def install_fake_modules(lux=300.0, soil_raw=1800, soil_temp=21.5, air=(22.0, 55.0)):
+    machine = types.ModuleType("machine")
+
+    class Pin:
+        IN, OUT = 0, 1
+        changes = []   # (time.monotonic(), pin id, level) for every output write
+
+        def __init__(self, *args, **kwargs):
+            self.args = args
+            self.level = 0
+
+        def value(self, level=None):
+            if level is None:
+                return self.level
+            self.level = level
+            Pin.changes.append((time.monotonic(), self.args[0], level))
+
+    class I2C:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def writeto(self, addr, data):
+            pass
+
+        def readfrom(self, addr, n):
+            raw = int(lux * 1.2)
+            return bytes([(raw >> 8) & 0xFF, raw & 0xFF])
+
+    class ADC:
+        ATTN_11DB = 3
+        WIDTH_12BIT = 3
+
+        def __init__(self, pin):
+            pass
+
+        def atten(self, value):
+            pass
+
+        def width(self, value):
+            pass
+
+        def read(self):
+            return soil_raw
+
+    machine.Pin, machine.I2C, machine.ADC = Pin, I2C, ADC
+    machine.lightsleep = lambda ms: time.sleep(ms / 1000)
+    machine.deepsleep = lambda ms: print("deepsleep", ms)
+
+    network = types.ModuleType("network")
+    network.STA_IF = 0
+
+    class WLAN:
+        def __init__(self, interface):
+            pass
+
+        def active(self, flag):
+            pass
+
+        def isconnected(self):
+            return True
+
+        def ifconfig(self):
+            return ("127.0.0.1", "255.0.0.0", "127.0.0.1", "127.0.0.1")
+
+    network.WLAN = WLAN
+
+    onewire = types.ModuleType("onewire")
+    onewire.OneWire = lambda pin: object()
+
+    ds18x20 = types.ModuleType("ds18x20")
+
+    class DS18X20:
+        def __init__(self, ow):
+            pass
+
+        def scan(self):
+            return [b"\x28fake-rom"]
+
+        def convert_temp(self):
+            pass
+
+        def read_temp(self, rom):
+            return soil_temp
+
+    ds18x20.DS18X20 = DS18X20
+
+    dht = types.ModuleType("dht")
+
+    class DHT22:
+        def __init__(self, pin):
+            pass
+
+        def measure(self):
+            time.sleep(0.005)
+
+        def temperature(self):
+            return air[0]
+
+        def humidity(self):
+            return air[1]
+
+    dht.DHT22 = DHT22
+
+    for mod in (machine, network, onewire, ds18x20, dht):
+        sys.modules[mod.__name__] = mod
+
+
+# ---------- Fake /upload server ----------
+async def start_server(upload_delay_ms, received):
+    async def handle(reader, writer):
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        received.append(await reader.readexactly(length))
+        await asyncio.sleep(upload_delay_ms / 1000)
+        writer.write(b"HTTP/1.0 200 OK\r\nContent-Length: 0\r\n\r\n")
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def simulate(cycles, upload_delay_ms):
+    install_fake_modules()
+    import main
+
+    received = []
+    server = await start_server(upload_delay_ms, received)
+    port = server.sockets[0].getsockname()[1]
+    main.SERVER_JSON_URL = "http://127.0.0.1:{}/upload".format(port)
+    main.SERVER_BIN_URL = "http://127.0.0.1:{}/upload_bin".format(port)
+
+    sensors = main.make_sensors(main.I2C_SDA_PIN, main.I2C_SCL_PIN, main.SOIL_MOISTURE_PIN,
+                                main.DS18B20_PIN, main.DHT22_PIN)
+
+    awake = []
+    sample = sensors.sample
+
+    async def timed_sample():
+        t0 = time.perf_counter()
+        reading = await sample()
+        awake.append((time.perf_counter() - t0) * 1000)
+        return reading
+
+    sensors.sample = timed_sample
+    main.CYCLE_MS = 0  # back-to-back cycles: measure only the sampling itself
+    await main.run(sensors, cycles=cycles, clock_ms=lambda: int(time.monotonic() * 1000))
+    server.close()
+
+    for i, ms in enumerate(awake):
+        print("cycle {}: sampled in {:.0f} ms".format(i + 1, ms))
+    print("uploads received:", len(received), "bytes each:", [len(b) for b in received])
+
+
+# ---------- Fake /api/pump server ----------
+async def start_pump_server(rtt_ms, queue, log):
+    """Long-poll GET /api/pump/commands/<device>, POST /api/pump/ack and /api/report_watering."""
+    async def handle(reader, writer):
+        head = await reader.readuntil(b"\r\n\r\n")
+        method, path = head.split(b" ")[:2]
+        length = 0
+        for line in head.split(b"\r\n"):
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        body = json.loads(await reader.readexactly(length)) if length else None
+        await asyncio.sleep(rtt_ms / 2000)  # request leg
+
+        if method == b"GET" and path.startswith(b"/api/pump/commands/"):
+            wait_s = float(path.split(b"wait=")[1]) if b"wait=" in path else 0
+            try:
+                commands = [await asyncio.wait_for(queue.get(), wait_s)]
+            except asyncio.TimeoutError:
+                commands = []
+            except asyncio.CancelledError:  # simulation over while a poll was held
+                writer.close()
+                return
+            payload = {"status": "ok", "commands": commands}
+        else:
+            log.append((time.monotonic(), path.decode(), body))
+            payload = {"status": "ok"}
+
+        await asyncio.sleep(rtt_ms / 2000)  # response leg
+        data = json.dumps(payload).encode()
+        writer.write(b"HTTP/1.0 200 OK\r\nContent-Length: " + str(len(data)).encode() + b"\r\n\r\n" + data)
+        await writer.drain()
+        writer.close()
+
+    return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+
+async def simulate_pump(commands, rtt_ms, gap_s):
+    install_fake_modules()
+    import pump as pump_mod
+    import machine
+
+    pump_mod.POLL_WAIT_S = 2           # short holds: several re-polls happen between commands
+    pump_mod.FLOW_ML_PER_S = 1000.0    # 1 ml = 1 ms, keeps the run short
+    queue, log = asyncio.Queue(), []
+    server = await start_pump_server(rtt_ms, queue, log)
+    base_url = "http://127.0.0.1:{}".format(server.sockets[0].getsockname()[1])
+
+    pump = pump_mod.Pump(27, flow_ml_per_s=pump_mod.FLOW_ML_PER_S)
+    loop_task = asyncio.create_task(pump_mod.command_loop(pump, base_url, "mock-board"))
+
+    decided = {}
+    for i in range(commands):
+        await asyncio.sleep(random.uniform(0.5, 1.5) * gap_s)
+        cmd_id = "cmd{}".format(i)
+        decided[cmd_id] = time.monotonic()
+        queue.put_nowait({"id": cmd_id, "pot": "default", "water_ml": 50 + 10 * i})
+    await asyncio.sleep(1.0 + rtt_ms / 500)  # let the last command finish and report
+    loop_task.cancel()
+    server.close()
+
+    relay_on = [t for t, pin, level in machine.Pin.changes if pin == 27 and level == 1]
+    reports = [(t, body) for t, path, body in log if path == "/api/report_watering"]
+    acks = [body for t, path, body in log if path == "/api/pump/ack"]
+    for (cmd_id, t0), t_on in zip(sorted(decided.items(), key=lambda kv: kv[1]), relay_on):
+        print("{}: queued -> relay on {:.0f} ms".format(cmd_id, (t_on - t0) * 1000))
+    print("acks:", len(acks), "reports:", len(reports),
+          "ml reported:", [body["water_ml"] for _, body in reports])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="run the sensor loop with mock hardware")
+    parser.add_argument("--cycles", type=int, default=3)
+    parser.add_argument("--upload-delay-ms", type=int, default=400)
+    parser.add_argument("--pump", action="store_true", help="simulate the pump command channel instead")
+    parser.add_argument("--commands", type=int, default=5)
+    parser.add_argument("--rtt-ms", type=int, default=60, help="network round trip to the server")
+    parser.add_argument("--gap-s", type=float, default=3.0, help="mean time between commands")
+    args = parser.parse_args()
+    if args.pump:
+        asyncio.run(simulate_pump(args.commands, args.rtt_ms, args.gap_s))
+    else:
+        asyncio.run(simulate(args.cycles, args.upload_delay_ms))
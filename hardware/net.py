@@ -0,0 +1,109 @@
+# net.py - WiFi + non-blocking HTTP upload
+# post_json uses asyncio streams instead of urequests, so an upload can run
+# while the next round of sensors is sampling (and a pump long-poll can stay
+# open next to both).
+
+import json
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+
+def connect_wifi(ssid, password, timeout=15):
+    import time
+    import network
+
+    wlan = network.WLAN(network.STA_IF)
+    wlan.active(True)
+    if not wlan.isconnected():
+        print("Connecting to WiFi...")
+        wlan.connect(ssid, password)
+        t0 = time.time()
+        while not wlan.isconnected():
+            if time.time() - t0 > timeout:
+                print("WiFi connection timeout")
+                return False
+            time.sleep(1)
+    print("WiFi connected:", wlan.ifconfig())
+    return True
+
+
+def parse_url(url):
+    """"http://host:port/path" -> (host, port, path)"""
+    if url.startswith("http://"):
+        url = url[7:]
+    host, _, path = url.partition("/")
+    host, _, port = host.partition(":")
+    return host, int(port) if port else 80, "/" + path
+
+
+async def request(method, url, body=b"", content_type="application/json", timeout_s=10):
+    """One HTTP/1.0 exchange; returns (status, response body bytes), or (None, None) on failure."""
+    host, port, path = parse_url(url)
+    writer = None
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout_s)
+        head = "{} {} HTTP/1.0\r\nHost: {}\r\n".format(method, path, host)
+        if body:
+            head += "Content-Type: {}\r\nContent-Length: {}\r\n".format(content_type, len(body))
+        writer.write(head.encode() + b"\r\n" + body)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout_s)
+        # HTTP/1.0: the server closes the connection after the body
+        rest = await asyncio.wait_for(reader.read(-1), timeout_s)
+        return int(status_line.split()[1]), rest.partition(b"\r\n\r\n")[2]
+    except Exception as e:
+        print("HTTP {} failed:".format(method), e)
+        return None, None
+    finally:
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+async def post(url, body, content_type="application/json", timeout_s=10):
+    """POST raw bytes; returns the HTTP status code, or None on failure."""
+    status, _ = await request("POST", url, body, content_type, timeout_s)
+    return status
+
+
+async def get_json(url, timeout_s=10):
+    """GET a JSON document; returns (status, decoded object or None)."""
+    status, body = await request("GET", url, timeout_s=timeout_s)
+    if status is None or not 200 <= status < 300:
+        return status, None
+    try:
+        return status, json.loads(body)
+    except ValueError:
+        return status, None
+
+
+async def post_json(url, data, timeout_s=10):
+    status = await post(url, json.dumps(data).encode(), timeout_s=timeout_s)
+    print("HTTP JSON status:", status)
+    return status is not None and 200 <= status < 300
+
+
+# ---------- MQTT (optional transport) ----------
+_mqtt = None
+
+
+def mqtt_publish(broker, client_id, topic, payload):
+    """Publish one message with umqtt.simple, keeping the connection between cycles."""
+    global _mqtt
+    try:
+        if _mqtt is None:
+            from umqtt.simple import MQTTClient
+            _mqtt = MQTTClient(client_id, broker, keepalive=60)
+            _mqtt.connect()
+        _mqtt.publish(topic, payload)
+        return True
+    except Exception as e:
+        print("MQTT publish failed:", e)
+        _mqtt = None  # reconnect next time
+        return False
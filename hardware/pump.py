@@ -0,0 +1,85 @@
+# pump.py - relay-driven water pump + server command channel
+# The board long-polls GET /api/pump/commands/<device>?wait=25: the server
+# holds the request open until the scheduler (or a manual /api/pump/commands
+# POST) queues a command, so the pump starts one round trip after the
+# decision instead of up to a whole polling interval later.
+#
+# Per command: relay on -> ack "started" (sent while the water runs) ->
+# relay off after water_ml / FLOW_ML_PER_S -> POST /api/report_watering with
+# the command id, which closes the command on the server and logs the event.
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+from net import get_json, post_json
+from sensors import sleep_ms
+
+
+FLOW_ML_PER_S = 25.0     # calibrate: run the pump for 10 s into a measuring jug
+MAX_RUN_MS = 60000       # hard cap per command, whatever the server asks for
+POLL_WAIT_S = 25         # server-side hold time of one long-poll
+RETRY_MS = 5000          # back-off after a failed poll (server down / WiFi dropped)
+SEEN_IDS = 16            # remember recent command ids: a redelivered command runs once
+
+
+class Pump:
+    def __init__(self, pin_no, active_high=True, flow_ml_per_s=FLOW_ML_PER_S):
+        from machine import Pin
+        self.pin = Pin(pin_no, Pin.OUT)
+        self.on_level = 1 if active_high else 0
+        self.flow_ml_per_s = flow_ml_per_s
+        self.off()
+
+    def on(self):
+        self.pin.value(self.on_level)
+
+    def off(self):
+        self.pin.value(1 - self.on_level)
+
+    def run_ms(self, water_ml):
+        return max(0, min(int(water_ml * 1000 / self.flow_ml_per_s), MAX_RUN_MS))
+
+
+async def execute(pump, base_url, device, command):
+    """Run one command; returns the ml actually pumped."""
+    run_ms = pump.run_ms(command["water_ml"])
+    pump.on()
+    # the ack travels while the water is already flowing
+    ack = asyncio.create_task(post_json(base_url + "/api/pump/ack",
+                                        {"device": device, "id": command["id"], "status": "started"}))
+    try:
+        await sleep_ms(run_ms)
+    finally:
+        pump.off()
+    await ack
+    water_ml = round(run_ms * pump.flow_ml_per_s / 1000, 1)
+    await post_json(base_url + "/api/report_watering", {
+        "device": device,
+        "command_id": command["id"],
+        "pot": command.get("pot"),
+        "water_ml": water_ml,
+        "reason": "pump",
+    })
+    return water_ml
+
+
+async def command_loop(pump, base_url, device, rounds=None):
+    """Long-poll for commands forever (`rounds` limits the number of polls, for the mock board)."""
+    url = "{}/api/pump/commands/{}?wait={}".format(base_url, device, POLL_WAIT_S)
+    seen = []
+    n = 0
+    while rounds is None or n < rounds:
+        n += 1
+        status, body = await get_json(url, timeout_s=POLL_WAIT_S + 10)
+        if body is None:
+            print("Pump poll failed:", status)
+            await sleep_ms(RETRY_MS)
+            continue
+        for command in body.get("commands", []):
+            if command["id"] in seen or not command.get("water_ml"):
+                continue
+            seen = (seen + [command["id"]])[-SEEN_IDS:]
+            print("Pump command {}: {} ml".format(command["id"], command["water_ml"]))
+            await execute(pump, base_url, device, command)
@@ -0,0 +1,144 @@
+# sensors.py - sensor drivers for the Feather ESP32 V2 node
+# Each sensor exposes `async def read()`; slow conversions (BH1750, DS18B20)
+# yield to the event loop while waiting, so they run concurrently.
+#
+# Hardware modules (machine / onewire / ds18x20 / dht) are only touched by the
+# constructors, so on a PC these classes can be driven with mock modules
+# (see mock_board.py).
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    import asyncio
+
+
+async def sleep_ms(ms):
+    # uasyncio has sleep_ms, CPython asyncio only has sleep(seconds)
+    if hasattr(asyncio, "sleep_ms"):
+        await asyncio.sleep_ms(ms)
+    else:
+        await asyncio.sleep(ms / 1000)
+
+
+# ---------- BH1750 (I2C light sensor) ----------
+class BH1750:
+    PWR_ON = 0x01
+    RESET = 0x07
+    ONE_TIME_H_RES_MODE = 0x20   # measure once, then power down by itself
+    CONVERSION_MS = 180
+
+    def __init__(self, i2c, addr=0x23):
+        self.i2c = i2c
+        self.addr = addr
+        self.i2c.writeto(self.addr, bytes([self.PWR_ON]))
+        self.i2c.writeto(self.addr, bytes([self.RESET]))
+
+    async def read(self):
+        try:
+            self.i2c.writeto(self.addr, bytes([self.PWR_ON]))
+            self.i2c.writeto(self.addr, bytes([self.ONE_TIME_H_RES_MODE]))
+            await sleep_ms(self.CONVERSION_MS)
+            data = self.i2c.readfrom(self.addr, 2)
+            return ((data[0] << 8) | data[1]) / 1.2  # lux
+        except Exception as e:
+            print("BH1750 error:", e)
+            return None
+
+
+# ---------- Capacitive soil moisture (ADC) ----------
+class SoilMoisture:
+    def __init__(self, adc):
+        self.adc = adc
+
+    async def read(self):
+        raw = self.adc.read()
+        percent = (raw / 4095) * 100
+        return max(0, min(100, percent))
+
+
+# ---------- DS18B20 (1-Wire soil temperature) ----------
+class DS18B20:
+    CONVERSION_MS = 750
+
+    def __init__(self, ds):
+        self.ds = ds
+        self.roms = ds.scan()
+        print("DS18B20 devices:", self.roms)
+
+    async def read(self):
+        if not self.roms:
+            return None
+        try:
+            self.ds.convert_temp()
+            await sleep_ms(self.CONVERSION_MS)
+            temp_c = self.ds.read_temp(self.roms[0])
+        except Exception as e:
+            print("DS18B20 error:", e)
+            return None
+        # 85 = power-on value (conversion did not run), -127 = sensor disconnected
+        if temp_c in (85, -127) or not -55 <= temp_c <= 125:
+            print("DS18B20 invalid reading:", temp_c)
+            return None
+        return temp_c
+
+
+# ---------- DHT22 (air temperature / humidity) ----------
+class DHT22:
+    def __init__(self, sensor):
+        self.sensor = sensor
+
+    async def read(self):
+        # measure() bit-bangs for ~5 ms; short enough to run on the event loop
+        try:
+            self.sensor.measure()
+            return self.sensor.temperature(), self.sensor.humidity()
+        except Exception as e:
+            print("DHT22 error:", e)
+            return None, None
+
+
+# ---------- All sensors ----------
+class SensorSet:
+    def __init__(self, light, soil_moisture, soil_temp, air):
+        self.light = light
+        self.soil_moisture = soil_moisture
+        self.soil_temp = soil_temp
+        self.air = air
+
+    async def sample(self):
+        """Read every sensor concurrently; the cycle takes as long as the slowest one (DS18B20)."""
+        lux, soil_percent, soil_temp, (air_temp, air_hum) = await asyncio.gather(
+            self.light.read(),
+            self.soil_moisture.read(),
+            self.soil_temp.read(),
+            self.air.read(),
+        )
+        return {
+            "light_lux": lux,
+            "soil_moisture_percent": soil_percent,
+            "soil_temperature_c": soil_temp,
+            "air_temperature_c": air_temp,
+            "air_humidity_percent": air_hum,
+        }
+
+
+def make_sensors(i2c_sda, i2c_scl, soil_pin, ds18b20_pin, dht22_pin):
+    import machine
+    import onewire
+    import ds18x20
+    import dht
+
+    i2c = machine.I2C(0, scl=machine.Pin(i2c_scl), sda=machine.Pin(i2c_sda), freq=100_000)
+
+    adc = machine.ADC(machine.Pin(soil_pin))
+    adc.atten(machine.ADC.ATTN_11DB)
+    adc.width(machine.ADC.WIDTH_12BIT)
+
+    ow = onewire.OneWire(machine.Pin(ds18b20_pin))
+
+    return SensorSet(
+        light=BH1750(i2c),
+        soil_moisture=SoilMoisture(adc),
+        soil_temp=DS18B20(ds18x20.DS18X20(ow)),
+        air=DHT22(dht.DHT22(machine.Pin(dht22_pin))),
+    )
@@ -0,0 +1,43 @@
+# telemetry.py - compact binary encoding of one sensor reading
+# Must stay in sync with app/modules/telemetry.py (the server-side decoder).
+#
+# Frame (little-endian, 16 bytes):
+#   B  version (1)
+#   B  present  bit i set = field i present (None is sent as "absent")
+#   H  device id
+#   I  light_lux            x10
+#   H  soil_moisture_percent x100
+#   h  soil_temperature_c   x100
+#   h  air_temperature_c    x100
+#   H  air_humidity_percent x100
+# A request body may carry several frames back to back.
+
+try:
+    import ustruct as struct
+except ImportError:
+    import struct
+
+VERSION = 1
+FRAME = "<BBHIHhhH"
+
+# (field, scale), in frame order
+FIELDS = (
+    ("light_lux", 10),
+    ("soil_moisture_percent", 100),
+    ("soil_temperature_c", 100),
+    ("air_temperature_c", 100),
+    ("air_humidity_percent", 100),
+)
+
+
+def encode(reading, device_id):
+    present = 0
+    values = []
+    for i, (name, scale) in enumerate(FIELDS):
+        v = reading.get(name)
+        if v is None:
+            values.append(0)
+        else:
+            present |= 1 << i
+            values.append(int(round(v * scale)))
+    return struct.pack(FRAME, VERSION, present, device_id, *values)